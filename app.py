@@ -1,31 +1,43 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from flask_pymongo import PyMongo
-from flask_socketio import SocketIO, emit, join_room, leave_room
-from flask_mail import Mail, Message
+from flask import render_template, request, redirect, url_for, flash, session, jsonify
+from flask_socketio import emit, join_room, leave_room
+from flask_mail import Message
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
 from bson.objectid import ObjectId
+from bson.errors import InvalidId
+import atexit
 import os
-from datetime import datetime
-from dotenv import load_dotenv
+import re
+from datetime import datetime, timedelta
 import logging
-from apscheduler.schedulers.background import BackgroundScheduler
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from streaming import stream_json_array
+from ops_auth import ops_required
+from search_engine import (
+    CHAT_SEARCH_FIELDS, COMMENT_SEARCH_FIELDS, DEFAULT_LIMIT, MAX_LIMIT, PROJECT_SEARCH_FIELDS, TASK_SEARCH_FIELDS,
+    build_search_terms, build_term_filter, decode_cursor, ensure_search_indexes, has_task_filters, make_snippet,
+    paginate_results, parse_search_filters, search_discussions, search_user_content, task_matches_filters, task_progress
+)
+from search_index import SearchIndexCache, PROJECT_FIELDS, TASK_FIELDS
+from notification_repository import NOTIFICATION_MAX_PAGE_SIZE, NOTIFICATION_PAGE_SIZE
+from task_dates import ensure_due_date_index, format_due_date, parse_due_date
+from task_reminders import reminder_changes, reminder_fields
+from chat_history import ensure_chat_history_index, history_around, history_page
+from chat_buffer import RecentMessageBuffer
+from chat_writer import ChatWriter
+# Configuration, database, notification delivery and background jobs are shared with worker.py
+from core import (
+    app, chat_messages_collection, chat_retention, connection_methods, create_notification, emit_unread_count,
+    job_queue, job_run_log, mail, mongo, mongo_uri, notification_repository, serialize_notification, socketio,
+    start_background_jobs
+)
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
-
-app = Flask(__name__)
-socketio = SocketIO(app, cors_allowed_origins="*")
 # Configure CORS to support credentials (session cookies) for mobile app
-CORS(app, supports_credentials=True, origins=["*"], allow_headers=["Content-Type", "Authorization"])
-app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "default-secret-key")
+CORS(app, supports_credentials=True, origins=["*"], allow_headers=["Content-Type", "Authorization"], expose_headers=["X-Next-Cursor"])
 
 # Rate Limiting Configuration - Protect against brute force attacks
 limiter = Limiter(
@@ -36,185 +48,80 @@ limiter = Limiter(
 )
 logger.info("Rate limiting enabled - protecting against brute force attacks")
 
-# Flask-Mail Configuration
-app.config["MAIL_SERVER"] = os.environ.get("MAIL_SERVER")
-app.config["MAIL_PORT"] = int(os.environ.get("MAIL_PORT", 587))
-app.config["MAIL_USE_TLS"] = os.environ.get("MAIL_USE_TLS", "true").lower() == "true"
-app.config["MAIL_USERNAME"] = os.environ.get("MAIL_USERNAME")
-app.config["MAIL_PASSWORD"] = os.environ.get("MAIL_PASSWORD")
-app.config["MAIL_DEFAULT_SENDER"] = os.environ.get("MAIL_DEFAULT_SENDER")
-
-mail = Mail(app)
-
-# MongoDB Configuration
-mongo_uri = os.environ.get("MONGO_URI", "mongodb://localhost:27017/projectMngmt")
-logger.info(f"MongoDB URI: {mongo_uri}")
-
-# Fix the connection string - ensure proper database name
-if mongo_uri and "mongodb+srv://" in mongo_uri:
-    # Remove any existing parameters and ensure clean database name
-    base_uri = mongo_uri.split("?")[0]
-    # Remove any existing database name to avoid duplication
-    if "/projectMngmt" in base_uri:
-        base_uri = base_uri.replace("/projectMngmt", "")
-    mongo_uri = f"{base_uri}/projectMngmt?retryWrites=true&w=majority"
-
-app.config["MONGO_URI"] = mongo_uri
-
-# Initialize MongoDB connection with multiple fallback methods
-def initialize_mongodb():
-    """Initialize MongoDB connection with multiple fallback methods"""
-    import ssl
-    import certifi
-    from pymongo import MongoClient
-    
-    connection_methods = []
-    
-    # Method 1: Direct MongoClient with SSL disabled for certificate verification
-    try:
-        logger.info("Attempting Method 1: MongoClient with SSL CERT_NONE")
-        client = MongoClient(
-            mongo_uri,
-            tls=True,
-            tlsAllowInvalidCertificates=True,
-            serverSelectionTimeoutMS=30000,
-            connectTimeoutMS=30000
-        )
-        client.admin.command('ping')
-        logger.info("Method 1 SUCCESS: MongoClient with SSL CERT_NONE")
-        
-        # Create a custom PyMongo-like wrapper
-        class MongoWrapper:
-            def __init__(self, client, db_name):
-                self.cx = client
-                self.db = client[db_name]
-        
-        mongo_instance = MongoWrapper(client, 'projectMngmt')
-        mongo_instance.db.command('ping')
-        connection_methods.append("MongoClient with SSL CERT_NONE - SUCCESS")
-        return mongo_instance, connection_methods
-    except Exception as e1:
-        logger.error(f"Method 1 FAILED: {e1}")
-        connection_methods.append(f"MongoClient with SSL CERT_NONE - FAILED: {str(e1)}")
-    
-    # Method 2: MongoClient with certifi
-    try:
-        logger.info("Attempting Method 2: MongoClient with certifi SSL")
-        client = MongoClient(
-            mongo_uri,
-            tlsCAFile=certifi.where(),
-            serverSelectionTimeoutMS=30000,
-            connectTimeoutMS=30000
-        )
-        client.admin.command('ping')
-        
-        class MongoWrapper:
-            def __init__(self, client, db_name):
-                self.cx = client
-                self.db = client[db_name]
-        
-        mongo_instance = MongoWrapper(client, 'projectMngmt')
-        mongo_instance.db.command('ping')
-        logger.info("Method 2 SUCCESS: MongoClient with certifi SSL")
-        connection_methods.append("MongoClient with certifi SSL - SUCCESS")
-        return mongo_instance, connection_methods
-    except Exception as e2:
-        logger.error(f"Method 2 FAILED: {e2}")
-        connection_methods.append(f"MongoClient with certifi SSL - FAILED: {str(e2)}")
-    
-    # Method 3: Standard PyMongo with Flask-PyMongo
-    try:
-        logger.info("Attempting Method 3: Standard PyMongo")
-        app.config["MONGO_URI"] = mongo_uri + ("&" if "?" in mongo_uri else "?") + "tls=true&tlsAllowInvalidCertificates=true"
-        mongo_instance = PyMongo(app)
-        mongo_instance.db.command('ping')
-        logger.info("Method 3 SUCCESS: Standard PyMongo")
-        connection_methods.append("Standard PyMongo - SUCCESS")
-        return mongo_instance, connection_methods
-    except Exception as e3:
-        logger.error(f"Method 3 FAILED: {e3}")
-        connection_methods.append(f"Standard PyMongo - FAILED: {str(e3)}")
-    
-    logger.error("All MongoDB connection methods failed")
-    return None, connection_methods
-
-# Initialize MongoDB
-mongo, connection_methods = initialize_mongodb()
-
-if mongo is None:
-    logger.error(f"Connection attempts: {connection_methods}")
-else:
-    logger.info("MongoDB connection established successfully")
-
-# Initialize notifications collection
-notifications_collection = mongo.db.notifications
-
-# Initialize chat messages collection
-chat_messages_collection = mongo.db.chat_messages
-
-# Initialize scheduler
-scheduler = BackgroundScheduler()
-
-def check_due_dates():
-    with app.app_context():
-        logger.info("Running due date check...")
-        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        tomorrow = today + timedelta(days=1)
-
-        # Find tasks due tomorrow
-        tasks_due_tomorrow = mongo.db.tasks.find({
-            "due_date": {"$gte": today, "$lt": tomorrow},
-            "status": {"$ne": "Done"}
-        })
-
-        for task in tasks_due_tomorrow:
-            if task.get("assigned_to"):
-                assigned_user_id = str(task["assigned_to"])
-                project = mongo.db.projects.find_one({"_id": ObjectId(task["project_id"])})
-                if project:
-                    task_link = url_for('view_project', project_id=str(project['_id']), _external=True) + f'#task-{task["_id"]}'
-                    message = f"Reminder: The task '{task['title']}' is due tomorrow in project '{project['title']}'."
-                    create_notification(assigned_user_id, message, 'due_date_approaching', task_link)
-                else:
-                    logger.warning(f"Project not found for task {task['_id']}. Cannot send due date notification.")
-                logger.info(f"Due date notification sent for task {task['title']} to user {assigned_user_id}")
-
-# Add the job to the scheduler
-scheduler.add_job(check_due_dates, 'interval', hours=24)
-
-def clean_old_chat_messages():
-    with app.app_context():
-        logger.info("Running old chat messages cleanup...")
-        # Calculate the timestamp for 24 hours ago
-        time_threshold = datetime.utcnow() - timedelta(hours=24)
-        # Delete messages older than the threshold
-        result = chat_messages_collection.delete_many({"timestamp": {"$lt": time_threshold}})
-        logger.info(f"Deleted {result.deleted_count} old chat messages.")
-
-# Add the chat cleanup job to the scheduler
-scheduler.add_job(clean_old_chat_messages, 'interval', hours=24)
-
-def keep_alive_ping():
-    """Self-ping to keep Render free tier from sleeping (every 10 minutes)"""
-    import requests
-    try:
-        # Get the app's URL from environment or use default
-        app_url = os.environ.get('RENDER_EXTERNAL_URL', 'https://proj-management-mobile.onrender.com')
-        response = requests.get(f"{app_url}/health", timeout=30)
-        logger.info(f"Keep-alive ping: {response.status_code}")
-    except Exception as e:
-        logger.warning(f"Keep-alive ping failed: {e}")
-
-# Add keep-alive ping job (every 10 minutes to prevent Render free tier sleep)
-scheduler.add_job(keep_alive_ping, 'interval', minutes=10)
-
-
-# Start the scheduler
-scheduler.start()
+# Page sizes for paginated chat history (/chat?format=json&before=...|around=...)
+CHAT_PAGE_SIZE = 50
+CHAT_MAX_PAGE_SIZE = 200
+
+# Recent messages of active rooms, kept current by send_message (None when disabled)
+chat_buffer = None
+if app.config["CHAT_BUFFER"]:
+    chat_buffer = RecentMessageBuffer(
+        per_room=max(app.config["CHAT_BUFFER_PER_ROOM"], CHAT_PAGE_SIZE),
+        max_rooms=app.config["CHAT_BUFFER_MAX_ROOMS"],
+        max_messages=app.config["CHAT_BUFFER_MAX_MESSAGES"],
+        max_age=app.config["CHAT_BUFFER_MAX_AGE"]
+    )
 
-# Shut down the scheduler when exiting the app
-import atexit
-atexit.register(lambda: scheduler.shutdown())
+# Optional write-behind writers for team and global chat (None = insert before broadcasting)
+chat_message_writer = global_message_writer = None
+if app.config["CHAT_WRITE_BEHIND"]:
+    chat_message_writer = ChatWriter(chat_messages_collection,
+                                     flush_interval=app.config["CHAT_WRITE_BEHIND_INTERVAL_MS"] / 1000)
+    global_message_writer = ChatWriter(mongo.db.global_messages,
+                                       flush_interval=app.config["CHAT_WRITE_BEHIND_INTERVAL_MS"] / 1000)
+    for writer in (chat_message_writer, global_message_writer):
+        writer.start()
+        atexit.register(writer.stop)
+
+def persist_chat_message(writer, collection, message):
+    """Store a chat message, or queue it when write-behind is on; returns its _id"""
+    if writer is not None:
+        return writer.submit(message)
+    return collection.insert_one(message).inserted_id
+
+# (room_id, room_type, timestamp) serves paginated chat history
+try:
+    ensure_chat_history_index(chat_messages_collection)
+except Exception as e:
+    logger.warning(f"Could not create chat history index: {e}")
+
+# Create indexes backing /api/search token lookups
+try:
+    ensure_search_indexes(mongo.db)
+except Exception as e:
+    logger.warning(f"Could not create search indexes: {e}")
+
+# Due dates are canonical datetimes; (due_date, status) serves reminder and calendar range queries
+try:
+    ensure_due_date_index(mongo.db.tasks)
+except Exception as e:
+    logger.warning(f"Could not create due date index: {e}")
+
+# Render stored due dates as YYYY-MM-DD in templates
+app.add_template_filter(format_due_date, 'due_date')
+
+def load_user_search_documents(user_id):
+    """Load every project and task a user can access, for the in-memory search index"""
+    projects = list(mongo.db.projects.find(
+        {"$or": [{"created_by": user_id}, {"team_members": user_id}]},
+        {field: 1 for field in PROJECT_FIELDS}
+    ))
+    tasks = list(mongo.db.tasks.find(
+        {"project_id": {"$in": [str(project["_id"]) for project in projects]}},
+        {field: 1 for field in TASK_FIELDS}
+    ))
+    return projects, tasks
+
+# Initialize in-memory search index (None when disabled)
+search_index_cache = None
+if app.config["SEARCH_MEMORY_INDEX"]:
+    search_index_cache = SearchIndexCache(
+        load_user_search_documents,
+        max_users=app.config["SEARCH_INDEX_MAX_USERS"],
+        max_postings=app.config["SEARCH_INDEX_MAX_POSTINGS"],
+        max_age=app.config["SEARCH_INDEX_MAX_AGE"]
+    )
+    logger.info("In-memory search index enabled")
 
 # Initialize Login Manager
 login_manager = LoginManager()
@@ -222,179 +129,9 @@ login_manager = LoginManager()
 # Set to store currently connected user IDs
 connected_users = set()
 
-def send_email_notification(recipient_email, subject, body):
-    with app.app_context():
-        try:
-            msg = Message(subject, recipients=[recipient_email], body=body)
-            mail.send(msg)
-            logger.info(f"Email notification sent to {recipient_email} with subject: {subject}")
-        except Exception as e:
-            logger.error(f"Error sending email to {recipient_email}: {e}")
-
-def create_notification(user_id, message, notification_type, link=None):
-    try:
-        notification = {
-            "user_id": ObjectId(user_id),
-            "message": message,
-            "type": notification_type, # e.g., 'task_assigned', 'due_date_approaching', 'user_mentioned'
-            "link": link,
-            "read": False,
-            "timestamp": datetime.utcnow()
-        }
-        notifications_collection.insert_one(notification)
-        logger.info(f"Notification created for user {user_id}: {message}")
-
-        # Emit a Socket.IO event for real-time notification
-        socketio.emit('new_notification', {'user_id': str(user_id), 'message': message, 'link': link}, room=str(user_id))
-
-        # Send email notification if applicable
-        user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
-        if user and user.get('email'):
-            if notification_type == 'task_assigned':
-                subject = f"Task Assigned: {message.split(': ')[1].split(' in project')[0]}"
-                send_email_notification(user['email'], subject, message + f"\nView task: {link}")
-            elif notification_type == 'user_mentioned':
-                subject = f"You were mentioned in a comment: {message.split(': ')[1]}"
-                send_email_notification(user['email'], subject, message + f"\nView comment: {link}")
-            elif notification_type == 'due_date_approaching':
-                subject = f"Task Due Soon: {message.split(': ')[1].split(' is due tomorrow')[0]}"
-                send_email_notification(user['email'], subject, message + f"\nView task: {link}")
-        
-        # Send push notification
-        send_push_notification(user_id, message, notification_type, link)
-
-    except Exception as e:
-        logger.error(f"Error creating notification for user {user_id}: {e}")
-
-
-# Push Notification Helper Functions
-def send_push_notification(user_id, message, notification_type, link=None):
-    """Send push notification to user's device(s) via Expo Push API"""
-    import requests
-    
-    try:
-        # Get user's push tokens
-        push_tokens = list(mongo.db.push_tokens.find({"user_id": str(user_id)}))
-        
-        if not push_tokens:
-            logger.debug(f"No push tokens found for user {user_id}")
-            return
-        
-        # Prepare notification title based on type
-        title_map = {
-            'task_assigned': '📋 New Task Assigned',
-            'due_date_approaching': '⏰ Task Due Soon',
-            'project_invitation': '👥 Project Invitation',
-            'mentor_request': '🎓 Mentor Request',
-            'mentor_accepted': '✅ Mentor Request Accepted',
-            'team_message': '💬 Team Chat',
-        }
-        title = title_map.get(notification_type, '🔔 Notification')
-        
-        # Prepare Expo push messages
-        messages = []
-        for token_doc in push_tokens:
-            push_token = token_doc.get('token')
-            if push_token and push_token.startswith('ExponentPushToken'):
-                messages.append({
-                    'to': push_token,
-                    'title': title,
-                    'body': message[:200],  # Limit body length
-                    'data': {
-                        'type': notification_type,
-                        'link': link,
-                        'user_id': str(user_id)
-                    },
-                    'sound': 'default',
-                    'channelId': 'tasks' if 'task' in notification_type else 'default',
-                })
-        
-        if not messages:
-            return
-        
-        # Send to Expo Push API
-        response = requests.post(
-            'https://exp.host/--/api/v2/push/send',
-            json=messages,
-            headers={
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-            },
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            logger.info(f"Push notification sent to {len(messages)} device(s) for user {user_id}")
-        else:
-            logger.warning(f"Push notification failed: {response.status_code} - {response.text}")
-            
-    except Exception as e:
-        logger.error(f"Error sending push notification: {e}")
-
-
-def send_team_chat_push(project_id, sender_id, sender_name, message_text):
-    """Send push notification to all team members except sender for team chat messages"""
-    import requests
-    
-    try:
-        # Get project and team members
-        project = mongo.db.projects.find_one({"_id": ObjectId(project_id)})
-        if not project:
-            return
-        
-        # Collect all team member IDs (creator + team members)
-        team_member_ids = set()
-        if project.get('created_by'):
-            team_member_ids.add(str(project['created_by']))
-        for member in project.get('team_members', []):
-            if isinstance(member, dict):
-                team_member_ids.add(str(member.get('user_id', '')))
-            else:
-                team_member_ids.add(str(member))
-        
-        # Remove sender
-        team_member_ids.discard(str(sender_id))
-        
-        if not team_member_ids:
-            return
-        
-        # Get push tokens for all team members
-        tokens = list(mongo.db.push_tokens.find({"user_id": {"$in": list(team_member_ids)}}))
-        
-        if not tokens:
-            return
-        
-        # Prepare messages
-        messages = []
-        for token_doc in tokens:
-            push_token = token_doc.get('token')
-            if push_token and push_token.startswith('ExponentPushToken'):
-                messages.append({
-                    'to': push_token,
-                    'title': f"💬 {project.get('title', 'Team Chat')}",
-                    'body': f"{sender_name}: {message_text[:100]}",
-                    'data': {
-                        'type': 'team_message',
-                        'project_id': str(project_id),
-                    },
-                    'sound': 'default',
-                    'channelId': 'team-chat',
-                })
-        
-        if messages:
-            response = requests.post(
-                'https://exp.host/--/api/v2/push/send',
-                json=messages,
-                headers={
-                    'Accept': 'application/json',
-                    'Content-Type': 'application/json',
-                },
-                timeout=10
-            )
-            logger.info(f"Team chat push sent to {len(messages)} device(s)")
-            
-    except Exception as e:
-        logger.error(f"Error sending team chat push: {e}")
+# Scheduled and queued jobs run here unless a separate worker.py process handles them
+if app.config["RUN_BACKGROUND_JOBS"]:
+    start_background_jobs()
 
 login_manager.init_app(app)
 login_manager.login_view = "login"
@@ -1004,14 +741,18 @@ def delete_account():
         )
         
         # 5. Delete user's notifications
-        mongo.db.notifications.delete_many({"user_id": ObjectId(user_id)})
+        notification_repository.delete_for_user(user_id)
         
-        # 6. Delete user's chat messages
-        mongo.db.chat_messages.delete_many({"user_id": user_id})
+        # 6. Delete user's chat messages (stored with sender_id) and stop serving buffered copies
+        mongo.db.chat_messages.delete_many({"sender_id": user_id})
+        if chat_buffer is not None:
+            chat_buffer.invalidate_sender(user_id)
         
         # 7. Delete the user document from MongoDB
         mongo.db.users.delete_one({"_id": ObjectId(user_id)})
         logger.info(f"Deleted user document from MongoDB")
+        if search_index_cache is not None:
+            search_index_cache.clear()
         
         # 8. Logout the user if authenticated via session
         if current_user.is_authenticated:
@@ -1104,146 +845,297 @@ def dashboard():
         logger.error(f"Error in dashboard route: {e}")
         return "Error loading dashboard", 500
 
+def get_task_progress(project_ids):
+    """Return {project_id: (total_tasks, completed_tasks)} using one grouped aggregation"""
+    return task_progress(mongo.db, project_ids)
+
+def iter_projects_with_progress(projects_cursor, batch_size=100):
+    """Attach task progress to projects from a cursor, one aggregation per batch"""
+    batch = []
+    for project in projects_cursor:
+        batch.append(project)
+        if len(batch) >= batch_size:
+            yield from _attach_progress(batch)
+            batch = []
+    if batch:
+        yield from _attach_progress(batch)
+
+def _attach_progress(projects):
+    progress = get_task_progress([str(project["_id"]) for project in projects])
+    for project in projects:
+        project["total_tasks"], project["completed_tasks"] = progress[str(project["_id"])]
+        yield project
+
+def serialize_project_summary(project):
+    """Convert a project (with attached progress) to the JSON shape used by the mobile app"""
+    total_tasks = project.get("total_tasks", 0)
+    completed_tasks = project.get("completed_tasks", 0)
+    completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+
+    return {
+        "_id": str(project["_id"]),
+        "title": project.get("title", ""),
+        "description": project.get("description", ""),
+        "course": project.get("course", ""),
+        "deadline": project.get("deadline", ""),
+        "created_by": project.get("created_by", ""),
+        "team_members": project.get("team_members", []),
+        "completion_percentage": round(completion_percentage, 2),
+        "total_tasks": total_tasks,
+        "completed_tasks": completed_tasks,
+    }
+
 @app.route("/api/projects")
 @login_required
 def get_projects_api():
     """API endpoint for mobile app to get projects as JSON"""
     try:
-        # Get projects where the user is a member
-        user_projects = list(mongo.db.projects.find({"team_members": current_user.id}))
-        
-        # Get projects created by the user
-        created_projects = list(mongo.db.projects.find({"created_by": current_user.id}))
-        
-        # Combine and remove duplicates
-        all_projects = []
-        project_ids = set()
-        
-        for project in user_projects + created_projects:
-            if str(project["_id"]) not in project_ids:
-                project_ids.add(str(project["_id"]))
-                
-                # Calculate progress for each project
-                project_tasks = list(mongo.db.tasks.find({"project_id": str(project["_id"])}))
-                total_tasks = len(project_tasks)
-                completed_tasks = len([task for task in project_tasks if task["status"] == "Done"])
-                completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-                
-                # Convert ObjectId to string for JSON serialization
-                project_dict = {
-                    "_id": str(project["_id"]),
-                    "title": project.get("title", ""),
-                    "description": project.get("description", ""),
-                    "course": project.get("course", ""),
-                    "deadline": project.get("deadline", ""),
-                    "created_by": project.get("created_by", ""),
-                    "team_members": project.get("team_members", []),
-                    "completion_percentage": round(completion_percentage, 2),
-                    "total_tasks": total_tasks,
-                    "completed_tasks": completed_tasks,
-                }
-                all_projects.append(project_dict)
-        
-        return jsonify(all_projects)
+        # Projects where the user is a member or the creator (one query, no duplicates)
+        projects_cursor = mongo.db.projects.find({
+            "$or": [
+                {"team_members": current_user.id},
+                {"created_by": current_user.id}
+            ]
+        })
+        projects = iter_projects_with_progress(projects_cursor)
+
+        if app.config["STREAM_JSON_RESPONSES"]:
+            return stream_json_array(projects, serialize_project_summary)
+        return jsonify([serialize_project_summary(project) for project in projects])
     except Exception as e:
         logger.error(f"Error in get_projects_api route: {e}")
         return jsonify({"error": "Failed to fetch projects"}), 500
 
+def serialize_search_project(project, progress):
+    """Format a project search hit; progress is (total_tasks, completed_tasks)"""
+    total_tasks, completed_tasks = progress
+    completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+    return {
+        '_id': str(project['_id']),
+        'title': project.get('title', ''),
+        'description': project.get('description', ''),
+        'course': project.get('course', ''),
+        'deadline': project.get('deadline', ''),
+        'completion_percentage': round(completion_percentage, 2),
+        'total_tasks': total_tasks,
+        'completed_tasks': completed_tasks
+    }
+
+def serialize_search_task(task, project_title):
+    """Format a task search hit"""
+    return {
+        '_id': str(task['_id']),
+        'title': task.get('title', ''),
+        'description': task.get('description', ''),
+        'status': task.get('status', 'To-do'),
+        'due_date': format_due_date(task.get('due_date')),
+        'project_id': task.get('project_id', ''),
+        'project_title': project_title
+    }
+
 @app.route("/api/search")
 @login_required
 def api_search():
-    """Search across projects and tasks for the current user"""
+    """Search across projects and tasks for the current user.
+    
+    Results are ranked by relevance then recency and capped by `limit`; pass the
+    returned `next_cursor` as `cursor` to continue. Optional filters: status,
+    assignee, course, due_from and due_to (YYYY-MM-DD).
+
+    Only the SEARCH_CANDIDATE_LIMIT newest matching tasks are ranked. When more
+    matched, the response has `truncated: true` and `candidate_limit`, and a
+    narrower query or filter is needed to reach older tasks.
+    """
     try:
         query = request.args.get('q', '').strip()
         
         if not query or len(query) < 2:
-            return jsonify({'success': True, 'projects': [], 'tasks': []})
+            return jsonify({'success': True, 'projects': [], 'tasks': [], 'next_cursor': None, 'truncated': False})
+        
+        try:
+            limit = min(max(int(request.args.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+            filters = parse_search_filters(request.args)
+            cursor = request.args.get('cursor')
+            if cursor:
+                decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         user_id = current_user.id
         
-        # Create regex pattern for case-insensitive search
-        regex_pattern = {'$regex': query, '$options': 'i'}
+        # Serve from the in-memory index when this user's index is warm
+        if search_index_cache is not None:
+            index = search_index_cache.get(user_id)
+            if index is not None:
+                projects_by_id = index.projects
+                projects, tasks = index.search(query)
+                projects = [project for project in projects
+                            if 'course' not in filters or project.get('course') == filters['course']]
+                if has_task_filters(filters):
+                    projects = []
+                tasks = [task for task in tasks
+                         if task_matches_filters(task, filters, projects_by_id.get(task['project_id']))]
+                projects, tasks, next_cursor = paginate_results(projects, tasks, query, cursor, limit)
+                progress = get_task_progress([str(project['_id']) for project in projects])
+                return jsonify({
+                    'success': True,
+                    'projects': [serialize_search_project(project, progress[str(project['_id'])]) for project in projects],
+                    'tasks': [
+                        serialize_search_task(task, projects_by_id.get(task['project_id'], {}).get('title', 'Unknown Project'))
+                        for task in tasks
+                    ],
+                    'next_cursor': next_cursor,
+                    'truncated': False
+                })
+            # Cold: answer from Mongo while the index is built in the background
+            search_index_cache.build_async(user_id)
+        
+        # Constant number of queries: user's projects, matching tasks, progress aggregation
+        projects, tasks, projects_by_id, progress, next_cursor, truncated = search_user_content(
+            mongo.db, user_id, query,
+            engine=app.config["SEARCH_ENGINE"],
+            filters=filters,
+            limit=limit,
+            cursor=cursor,
+            candidate_limit=app.config["SEARCH_CANDIDATE_LIMIT"]
+        )
         
-        # Search projects where user is a member or creator
-        projects = list(mongo.db.projects.find({
-            '$and': [
-                {'$or': [
-                    {'created_by': user_id},
-                    {'team_members': user_id}
-                ]},
-                {'$or': [
-                    {'title': regex_pattern},
-                    {'description': regex_pattern},
-                    {'course': regex_pattern}
-                ]}
-            ]
-        }))
+        projects_data = [serialize_search_project(project, progress[str(project['_id'])]) for project in projects]
+        tasks_data = [
+            serialize_search_task(task, projects_by_id.get(task['project_id'], {}).get('title', 'Unknown Project'))
+            for task in tasks
+        ]
         
-        # Get project IDs for task search
-        user_project_ids = [str(p['_id']) for p in mongo.db.projects.find({
-            '$or': [
-                {'created_by': user_id},
-                {'team_members': user_id}
-            ]
-        })]
-        
-        # Search tasks in user's projects
-        tasks = list(mongo.db.tasks.find({
-            '$and': [
-                {'project_id': {'$in': user_project_ids}},
-                {'$or': [
-                    {'title': regex_pattern},
-                    {'description': regex_pattern}
-                ]}
-            ]
-        }))
+        response = {
+            'success': True,
+            'projects': projects_data,
+            'tasks': tasks_data,
+            'next_cursor': next_cursor,
+            'truncated': truncated
+        }
+        if truncated:
+            response['candidate_limit'] = app.config["SEARCH_CANDIDATE_LIMIT"]
+        return jsonify(response)
         
-        # Format projects for JSON response
-        projects_data = []
-        for project in projects:
-            project_tasks = list(mongo.db.tasks.find({"project_id": str(project["_id"])}))
-            total_tasks = len(project_tasks)
-            completed_tasks = len([t for t in project_tasks if t["status"] == "Done"])
-            completion_percentage = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-            
-            projects_data.append({
-                '_id': str(project['_id']),
-                'title': project.get('title', ''),
-                'description': project.get('description', ''),
-                'course': project.get('course', ''),
-                'deadline': project.get('deadline', ''),
-                'completion_percentage': round(completion_percentage, 2),
-                'total_tasks': total_tasks,
-                'completed_tasks': completed_tasks
-            })
+    except Exception as e:
+        logger.error(f"Error in api_search route: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route("/api/search/rebuild", methods=["POST"])
+@login_required
+def api_rebuild_search_index():
+    """Rebuild the current user's in-memory search index"""
+    try:
+        if search_index_cache is None:
+            return jsonify({'success': False, 'error': 'In-memory search index is disabled'}), 400
         
-        # Format tasks for JSON response
-        tasks_data = []
-        for task in tasks:
-            # Get project title for context
-            project = mongo.db.projects.find_one({'_id': ObjectId(task['project_id'])})
-            project_title = project.get('title', 'Unknown Project') if project else 'Unknown Project'
-            
-            tasks_data.append({
-                '_id': str(task['_id']),
-                'title': task.get('title', ''),
-                'description': task.get('description', ''),
-                'status': task.get('status', 'To-do'),
-                'due_date': task.get('due_date', ''),
-                'project_id': task.get('project_id', ''),
-                'project_title': project_title
-            })
+        index = search_index_cache.build(current_user.id)
+        return jsonify({
+            'success': True,
+            'projects': len(index.projects),
+            'tasks': len(index.tasks),
+            'cache': search_index_cache.stats()
+        })
+    except Exception as e:
+        logger.error(f"Error rebuilding search index: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route("/api/search/messages")
+@login_required
+def api_search_messages():
+    """Search team chat messages and task comments in the current user's projects.
+    
+    Hits are newest first and carry a snippet plus the ids needed to open the
+    surrounding history; pass `next_cursor` as `cursor` for more.
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        
+        if len(query) < 2 or build_term_filter(query) is None:
+            return jsonify({'success': True, 'messages': [], 'comments': [], 'next_cursor': None})
+        
+        try:
+            limit = min(max(int(request.args.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+            cursor = request.args.get('cursor')
+            if cursor:
+                decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        user_id = current_user.id
+        projects = list(mongo.db.projects.find(
+            {'$or': [{'created_by': user_id}, {'team_members': user_id}]},
+            {'title': 1}
+        ))
+        project_titles = {str(project['_id']): project.get('title', '') for project in projects}
+        
+        messages, comments, next_cursor = search_discussions(
+            mongo.db, list(project_titles), query, limit=limit, cursor=cursor)
+        
+        messages_data = [{
+            'message_id': str(message['_id']),
+            'room_id': message['room_id'],
+            'room_type': message.get('room_type', 'team'),
+            'project_title': project_titles.get(message['room_id'], ''),
+            'sender_username': message.get('sender_username', ''),
+            'timestamp': message['timestamp'].isoformat() if isinstance(message.get('timestamp'), datetime) else message.get('timestamp'),
+            'snippet': make_snippet(message.get('message'), query),
+            'history_url': url_for('chat', room_id=message['room_id'], room_type=message.get('room_type', 'team'),
+                                   around=str(message['_id']), format='json')
+        } for message in messages]
+        
+        comments_data = [{
+            'comment_id': str(comment['comment_id']),
+            'task_id': str(comment['task_id']),
+            'task_title': comment.get('task_title', ''),
+            'project_id': comment['project_id'],
+            'project_title': project_titles.get(comment['project_id'], ''),
+            'created_by': comment.get('created_by'),
+            'created_at': comment['created_at'].isoformat(),
+            'snippet': make_snippet(comment.get('text'), query),
+            'url': url_for('view_project', project_id=comment['project_id']) + f"#task-{comment['task_id']}"
+        } for comment in comments]
         
         return jsonify({
             'success': True,
-            'projects': projects_data,
-            'tasks': tasks_data
+            'messages': messages_data,
+            'comments': comments_data,
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
-        logger.error(f"Error in api_search route: {e}")
+        logger.error(f"Error in api_search_messages route: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route("/api/jobs/stats")
+@ops_required
+def get_job_queue_stats():
+    """Background job queue depth, dead-letter count and recent latency"""
+    try:
+        return jsonify(job_queue.stats())
+    except Exception as e:
+        logger.error(f"Error fetching job queue stats: {e}")
+        return jsonify({"error": "Failed to fetch job queue stats"}), 500
+
+@app.route("/api/jobs/runs")
+@ops_required
+def get_job_runs():
+    """Recent scheduled job runs, newest first; filter with `job` and `status` (e.g. missed)"""
+    try:
+        limit = min(max(int(request.args.get("limit", 50)), 1), 500)
+        runs = job_run_log.recent(request.args.get("job"), request.args.get("status"), limit=limit)
+        for run in runs:
+            run["_id"] = str(run["_id"])
+            for field in ("started_at", "finished_at", "scheduled_at"):
+                if isinstance(run.get(field), datetime):
+                    run[field] = run[field].isoformat()
+        return jsonify({"runs": runs})
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    except Exception as e:
+        logger.error(f"Error fetching job runs: {e}")
+        return jsonify({"error": "Failed to fetch job runs"}), 500
+
 @app.route("/api/dashboard/stats")
 @login_required
 def get_dashboard_stats():
@@ -1352,7 +1244,7 @@ def get_project_api(project_id):
                 "title": task.get("title", ""),
                 "description": task.get("description", ""),
                 "status": task.get("status", "To-do"),
-                "due_date": task.get("due_date", ""),
+                "due_date": format_due_date(task.get("due_date")),
                 "project_id": task.get("project_id", ""),
                 "created_by": task.get("created_by", ""),
                 "created_at": str(task.get("created_at", ""))
@@ -1416,8 +1308,11 @@ def create_project():
             "mentors": [],  # Array of mentor user IDs
             "tasks": []
         }
+        new_project["search_terms"] = build_search_terms(new_project, PROJECT_SEARCH_FIELDS)
         
         project_id = mongo.db.projects.insert_one(new_project).inserted_id
+        if search_index_cache is not None:
+            search_index_cache.upsert_project(new_project)
         
         # Update user's joined projects
         mongo.db.users.update_one(
@@ -1518,9 +1413,11 @@ def delete_project(project_id):
             
             # Delete all chat messages for this project
             mongo.db.chat_messages.delete_many({"room_id": project_id, "room_type": "team"})
+            if chat_buffer is not None:
+                chat_buffer.invalidate(project_id, "team")
             
             # Delete all notifications related to this project
-            mongo.db.notifications.delete_many({"project_id": project_id})
+            notification_repository.delete_for_project(project_id)
             
             # Remove project from all users' joined_projects
             mongo.db.users.update_many(
@@ -1530,6 +1427,8 @@ def delete_project(project_id):
             
             # Delete the project
             mongo.db.projects.delete_one({"_id": ObjectId(project_id)})
+            if search_index_cache is not None:
+                search_index_cache.remove_project(project_id)
             
             # For mobile app, return JSON
             if request.content_type and 'multipart/form-data' in request.content_type:
@@ -1601,6 +1500,9 @@ def leave_project(project_id):
             "invited_by": user_id
         })
         
+        if search_index_cache is not None:
+            search_index_cache.invalidate_user(user_id)
+        
         logger.info(f"User {user_id} left project {project_id}")
         
         return jsonify({
@@ -1714,18 +1616,15 @@ def api_invite_member(project_id):
         mongo.db.invitations.insert_one(invitation)
         
         # Create notification for the invited user
-        notification = {
-            "user_id": invited_user_id,
-            "type": "project_invitation",
-            "message": f"You have been invited to join the project '{project['title']}' by {current_user.name}",
-            "project_id": project_id,
-            "project_title": project["title"],
-            "invited_by": current_user.id,
-            "invited_by_name": current_user.name,
-            "read": False,
-            "created_at": datetime.utcnow()
-        }
-        mongo.db.notifications.insert_one(notification)
+        notification_repository.create(
+            invited_user_id,
+            "project_invitation",
+            f"You have been invited to join the project '{project['title']}' by {current_user.name}",
+            project_id=project_id,
+            project_title=project["title"],
+            invited_by=current_user.id,
+            invited_by_name=current_user.name
+        )
         
         logger.info(f"User {invited_user['name']} invited to project {project['title']} by {current_user.name}")
         
@@ -1800,18 +1699,15 @@ def api_request_mentor(project_id):
         mongo.db.invitations.insert_one(mentor_request)
         
         # Create notification for the mentor
-        notification = {
-            "user_id": mentor_user_id,
-            "type": "mentor_request",
-            "message": f"You have been invited to be a mentor for the project '{project['title']}' by {current_user.name}",
-            "project_id": project_id,
-            "project_title": project["title"],
-            "invited_by": current_user.id,
-            "invited_by_name": current_user.name,
-            "read": False,
-            "created_at": datetime.utcnow()
-        }
-        mongo.db.notifications.insert_one(notification)
+        notification_repository.create(
+            mentor_user_id,
+            "mentor_request",
+            f"You have been invited to be a mentor for the project '{project['title']}' by {current_user.name}",
+            project_id=project_id,
+            project_title=project["title"],
+            invited_by=current_user.id,
+            invited_by_name=current_user.name
+        )
         
         logger.info(f"Mentor request sent to {mentor_user['name']} for project {project['title']} by {current_user.name}")
         
@@ -1858,16 +1754,13 @@ def api_respond_mentor_request(request_id):
             # Notify project creator
             project = mongo.db.projects.find_one({"_id": ObjectId(mentor_request["project_id"])})
             if project:
-                notification = {
-                    "user_id": project["created_by"],
-                    "type": "mentor_accepted",
-                    "message": f"{current_user.name} has accepted to be a mentor for '{project['title']}'",
-                    "project_id": mentor_request["project_id"],
-                    "project_title": project["title"],
-                    "read": False,
-                    "created_at": datetime.utcnow()
-                }
-                mongo.db.notifications.insert_one(notification)
+                notification_repository.create(
+                    project["created_by"],
+                    "mentor_accepted",
+                    f"{current_user.name} has accepted to be a mentor for '{project['title']}'",
+                    project_id=mentor_request["project_id"],
+                    project_title=project["title"]
+                )
             
             logger.info(f"User {current_user.name} accepted mentor request for project {mentor_request['project_id']}")
             return jsonify({"success": True, "message": "You are now a mentor for this project"})
@@ -1958,6 +1851,9 @@ def api_respond_invitation(invitation_id):
                 {"$set": {"status": "accepted"}}
             )
             
+            if search_index_cache is not None:
+                search_index_cache.invalidate_user(current_user.id)
+            
             logger.info(f"User {current_user.name} accepted invitation to project {invitation['project_id']}")
             return jsonify({"success": True, "message": "Invitation accepted"})
             
@@ -2031,6 +1927,9 @@ def respond_to_invitation(invitation_id):
                 {"$set": {"status": "accepted"}}
             )
             
+            if search_index_cache is not None:
+                search_index_cache.invalidate_user(current_user.id)
+            
             flash("Invitation accepted. You are now a team member.")
             return redirect(url_for("view_project", project_id=invitation["project_id"]))
         else:
@@ -2065,7 +1964,11 @@ def create_task(project_id):
             title = request.form.get("title")
             description = request.form.get("description")
             assigned_to = request.form.get("assigned_to")
-            due_date = request.form.get("due_date")
+            try:
+                due_date = parse_due_date(request.form.get("due_date"))
+            except ValueError:
+                flash("Invalid due date.")
+                return redirect(url_for("create_task", project_id=project_id))
             
             logger.info(f"Creating task: title={title}, assigned_to={assigned_to}, project_id={project_id}")
             
@@ -2080,8 +1983,12 @@ def create_task(project_id):
                 "created_at": datetime.now(),
                 "comments": []
             }
+            new_task["search_terms"] = build_search_terms(new_task, TASK_SEARCH_FIELDS)
+            new_task.update(reminder_fields(new_task["due_date"], app.config["REMINDER_OFFSETS"]))
             
             task_id = mongo.db.tasks.insert_one(new_task).inserted_id
+            if search_index_cache is not None:
+                search_index_cache.upsert_task(new_task)
 
             # Create notification for assigned user if assigned_to is present
             if assigned_to:
@@ -2090,7 +1997,9 @@ def create_task(project_id):
                     project = mongo.db.projects.find_one({"_id": ObjectId(project_id)})
                     task_link = url_for('view_project', project_id=project_id, _external=True) + f'#task-{task_id}'
                     message = f"You have been assigned a new task: {title} in project {project['title']}."
-                    create_notification(assigned_to, message, 'task_assigned', task_link)
+                    create_notification(assigned_to, message, 'task_assigned', task_link,
+                                        coalesce_key=project_id,
+                                        summary=f"You have been assigned {{count}} new tasks in project {project['title']}.")
             
             # Update project's tasks list
             mongo.db.projects.update_one(
@@ -2134,11 +2043,15 @@ def update_task_status(task_id):
         new_status = request.json.get("status")
         if new_status not in ["To-do", "In Progress", "Done"]:
             return jsonify({"success": False, "message": "Invalid status"})
-        # Update task status
+        # Update task status (a reopened task gets its remaining reminders back)
+        update_fields = {"status": new_status}
+        update_fields.update(reminder_changes(task, update_fields, app.config["REMINDER_OFFSETS"]))
         mongo.db.tasks.update_one(
             {"_id": ObjectId(task_id)},
-            {"$set": {"status": new_status}}
+            {"$set": update_fields}
         )
+        if search_index_cache is not None:
+            search_index_cache.update_task(task_id, task["project_id"], {"status": new_status})
         
         # Create notification if task is completed
         if new_status == "Done":
@@ -2147,20 +2060,19 @@ def update_task_status(task_id):
             
             # Notify project creator
             if project and project.get("created_by") != current_user.id:
-                notification = {
-                    "user_id": project["created_by"],
-                    "type": "task_completed",
-                    "message": f"Task '{task['title']}' has been completed in project '{project['title']}'",
-                    "task_id": task_id,
-                    "task_title": task['title'],
-                    "project_id": task["project_id"],
-                    "project_title": project['title'],
-                    "completed_by": current_user.id,
-                    "completed_by_name": current_user.name,
-                    "read": False,
-                    "created_at": datetime.utcnow()
-                }
-                mongo.db.notifications.insert_one(notification)
+                notification_repository.create(
+                    project["created_by"],
+                    "task_completed",
+                    f"Task '{task['title']}' has been completed in project '{project['title']}'",
+                    coalesce_key=task["project_id"],
+                    summary=f"{{count}} tasks completed in project '{project['title']}'",
+                    task_id=task_id,
+                    task_title=task['title'],
+                    project_id=task["project_id"],
+                    project_title=project['title'],
+                    completed_by=current_user.id,
+                    completed_by_name=current_user.name
+                )
                 logger.info(f"Task '{task['title']}' completed by {current_user.name}")
         
         return jsonify({"success": True, "message": "Task status updated"})
@@ -2192,6 +2104,8 @@ def api_complete_task(task_id):
             {"_id": ObjectId(task_id)},
             {"$set": {"status": "Done"}}
         )
+        if search_index_cache is not None:
+            search_index_cache.update_task(task_id, task["project_id"], {"status": "Done"})
         
         # Get project details
         project = mongo.db.projects.find_one({"_id": ObjectId(task["project_id"])})
@@ -2207,20 +2121,19 @@ def api_complete_task(task_id):
         # Create notification for project creator
         if project.get("created_by") and project["created_by"] != current_user.id:
             user = mongo.db.users.find_one({"_id": ObjectId(current_user.id)})
-            notification = {
-                "user_id": project["created_by"],
-                "type": "task_completed",
-                "message": f"Team member {user.get('name', 'Unknown')} has completed task '{task['title']}'. Please review.",
-                "task_id": task_id,
-                "task_title": task['title'],
-                "project_id": task["project_id"],
-                "project_title": project['title'],
-                "completed_by": current_user.id,
-                "completed_by_name": user.get('name', 'Unknown'),
-                "read": False,
-                "created_at": datetime.utcnow()
-            }
-            mongo.db.notifications.insert_one(notification)
+            notification_repository.create(
+                project["created_by"],
+                "task_completed",
+                f"Team member {user.get('name', 'Unknown')} has completed task '{task['title']}'. Please review.",
+                coalesce_key=task["project_id"],
+                summary=f"{{count}} tasks completed in project '{project['title']}'. Please review.",
+                task_id=task_id,
+                task_title=task['title'],
+                project_id=task["project_id"],
+                project_title=project['title'],
+                completed_by=current_user.id,
+                completed_by_name=user.get('name', 'Unknown')
+            )
             logger.info(f"Task '{task['title']}' marked as complete by {user.get('name')}")
         
         return jsonify({
@@ -2262,6 +2175,8 @@ def api_delete_task(task_id):
         
         # Delete the task
         mongo.db.tasks.delete_one({"_id": ObjectId(task_id)})
+        if search_index_cache is not None:
+            search_index_cache.remove_task(task_id, task["project_id"])
         
         # Remove task from project's tasks list
         mongo.db.projects.update_one(
@@ -2401,10 +2316,12 @@ def add_comment(task_id):
             return redirect(url_for("view_project", project_id=task["project_id"]))
         
         comment = {
+            "_id": ObjectId(),
             "text": comment_text,
             "created_by": current_user.id,
             "created_at": datetime.now()
         }
+        comment["search_terms"] = build_search_terms(comment, COMMENT_SEARCH_FIELDS)
         
         mongo.db.tasks.update_one(
             {"_id": ObjectId(task_id)},
@@ -2448,8 +2365,12 @@ def edit_task(task_id):
             title = request.form.get("title")
             description = request.form.get("description")
             assigned_to = request.form.get("assigned_to")
-            due_date = request.form.get("due_date")
             status = request.form.get("status")
+            try:
+                due_date = parse_due_date(request.form.get("due_date"))
+            except ValueError:
+                flash("Invalid due date.")
+                return redirect(url_for("edit_task", task_id=task_id))
             
             # Get the existing task to compare assigned_to
             existing_task = mongo.db.tasks.find_one({"_id": ObjectId(task_id)})
@@ -2457,9 +2378,12 @@ def edit_task(task_id):
             update_fields = {
                 "title": title,
                 "description": description,
-                "due_date": datetime.strptime(due_date, "%Y-%m-%d") if due_date else None,
+                "due_date": due_date,
                 "status": status
             }
+            update_fields["search_terms"] = build_search_terms(update_fields, TASK_SEARCH_FIELDS)
+            # Reminders restart when the due date moves or the task is reopened
+            update_fields.update(reminder_changes(existing_task, update_fields, app.config["REMINDER_OFFSETS"]))
 
             # Handle assigned_to change and notification
             if assigned_to:
@@ -2470,7 +2394,9 @@ def edit_task(task_id):
                         project = mongo.db.projects.find_one({"_id": ObjectId(task["project_id"])})
                         task_link = url_for('view_project', project_id=task["project_id"], _external=True) + f'#task-{task_id}'
                         message = f"You have been assigned task: {title} in project {project['title']}."
-                        create_notification(assigned_to, message, 'task_assigned', task_link)
+                        create_notification(assigned_to, message, 'task_assigned', task_link,
+                                            coalesce_key=task["project_id"],
+                                            summary=f"You have been assigned {{count}} new tasks in project {project['title']}.")
             else:
                 update_fields["assigned_to"] = None
 
@@ -2478,6 +2404,8 @@ def edit_task(task_id):
                 {"_id": ObjectId(task_id)},
                 {"$set": update_fields}
             )
+            if search_index_cache is not None:
+                search_index_cache.update_task(task_id, task["project_id"], update_fields)
 
             flash("Task updated successfully!")
             return redirect(url_for("view_project", project_id=task["project_id"]))
@@ -2501,44 +2429,109 @@ def edit_task(task_id):
 @app.route("/api/notifications")
 @login_required
 def get_notifications():
+    """One page of the current user's notifications, newest first.
+    
+    Pass the X-Next-Cursor response header back as `before` for the next page.
+    """
     try:
-        # Get all notifications for the current user (both read and unread)
-        notifications = list(mongo.db.notifications.find({"user_id": current_user.id}).sort("created_at", -1))
-        
-        result = []
-        for notification in notifications:
-            notif_dict = {
-                "_id": str(notification["_id"]),
-                "user_id": notification.get("user_id"),
-                "type": notification.get("type", ""),
-                "message": notification.get("message", ""),
-                "read": notification.get("read", False),
-                "created_at": notification.get("created_at").isoformat() if notification.get("created_at") else "",
-                "project_id": notification.get("project_id", ""),
-                "task_id": notification.get("task_id", "")
-            }
-            result.append(notif_dict)
-        
-        logger.info(f"Fetched {len(result)} notifications for user {current_user.id}")
-        return jsonify(result)
+        try:
+            limit = min(max(int(request.args.get("limit", NOTIFICATION_PAGE_SIZE)), 1), NOTIFICATION_MAX_PAGE_SIZE)
+            notifications, next_cursor = notification_repository.find_page(
+                current_user.id, before=request.args.get("before"), limit=limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        response = jsonify([serialize_notification(notification) for notification in notifications])
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        logger.info(f"Fetched {len(notifications)} notifications for user {current_user.id}")
+        return response
     except Exception as e:
         logger.error(f"Error fetching notifications for user {current_user.id}: {e}")
         return jsonify({"error": "Error fetching notifications"}), 500
 
+@app.route("/api/notifications/unread_count")
+@login_required
+def get_unread_notification_count():
+    """Unread badge count, answered from the notifications index without reading documents"""
+    try:
+        return jsonify({"count": notification_repository.unread_count(current_user.id)})
+    except Exception as e:
+        logger.error(f"Error counting notifications for user {current_user.id}: {e}")
+        return jsonify({"error": "Error counting notifications"}), 500
+
 @app.route("/api/notifications/mark_read/<notification_id>", methods=["POST"])
 @login_required
 def mark_notification_read(notification_id):
     try:
-        mongo.db.notifications.update_one(
-            {"_id": ObjectId(notification_id), "user_id": current_user.id},
-            {"$set": {"read": True}}
-        )
+        notification_repository.mark_read(current_user.id, notification_id)
+        emit_unread_count(current_user.id)
         logger.info(f"Notification {notification_id} marked as read by user {current_user.id}")
         return jsonify({"success": True, "message": "Notification marked as read"})
     except Exception as e:
         logger.error(f"Error marking notification {notification_id} as read: {e}")
         return jsonify({"error": "Error marking notification as read"}), 500
 
+@app.route("/api/notifications/mark_read", methods=["POST"])
+@login_required
+def mark_notifications_read():
+    """Mark many notifications read in one update.
+    
+    Body: {"ids": [...]} or {"before": "<ISO timestamp>"} (everything up to and
+    including that time).
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            notification_ids = data.get("ids")
+            before = datetime.fromisoformat(data["before"].replace("Z", "")) if data.get("before") else None
+            if notification_ids is None and before is None:
+                raise ValueError("Provide ids or before")
+            if notification_ids is not None and not isinstance(notification_ids, list):
+                raise ValueError("ids must be a list")
+            result = notification_repository.mark_many_read(current_user.id, notification_ids=notification_ids, before=before)
+        except (ValueError, InvalidId) as e:
+            return jsonify({"error": str(e)}), 400
+
+        unread = emit_unread_count(current_user.id)
+        return jsonify({"success": True, "updated": result.modified_count, "unread_count": unread})
+    except Exception as e:
+        logger.error(f"Error marking notifications as read for user {current_user.id}: {e}")
+        return jsonify({"error": "Error marking notifications as read"}), 500
+
+@app.route("/api/notifications/mark_all_read", methods=["POST"])
+@login_required
+def mark_all_notifications_read():
+    try:
+        result = notification_repository.mark_all_read(current_user.id)
+        unread = emit_unread_count(current_user.id)
+        return jsonify({"success": True, "updated": result.modified_count, "unread_count": unread})
+    except Exception as e:
+        logger.error(f"Error marking all notifications as read for user {current_user.id}: {e}")
+        return jsonify({"error": "Error marking notifications as read"}), 500
+
+def serialize_chat_message(message):
+    """Convert a chat message document to a JSON-serializable dict"""
+    message.pop('search_terms', None)
+    message.pop('expires_at', None)
+    message['_id'] = str(message['_id'])
+    if 'timestamp' in message and isinstance(message['timestamp'], datetime):
+        message['timestamp'] = message['timestamp'].isoformat()
+    return message
+
+def get_chat_history_page(room_id, room_type, before=None, around=None, limit=CHAT_PAGE_SIZE):
+    """Return (messages oldest first, cursor for older messages or None) for one page of a room's history.
+
+    Without a position this is the newest page. `before` is a cursor from a
+    previous page; `around` centres the page on a message id, which is how
+    search hits jump into history.
+    """
+    if around:
+        return history_around(chat_messages_collection, room_id, room_type, ObjectId(around), limit=limit)
+    if before is None and chat_buffer is not None:
+        return chat_buffer.newest_page(chat_messages_collection, room_id, room_type, limit)
+    return history_page(chat_messages_collection, room_id, room_type, before=before, limit=limit)
+
 @app.route('/chat')
 @login_required
 def chat():
@@ -2552,24 +2545,28 @@ def chat():
             current_room_name = f'Team: {project["title"]}'
 
     # Mark chat notifications as read for the current user
-    notifications_collection.update_many(
-        {"user_id": ObjectId(current_user.id), "type": "chat_message", "read": False},
-        {"$set": {"read": True}}
-    )
-
-    import json
-    # Fetch historical messages for the specific room and type
-    historical_messages_cursor = chat_messages_collection.find({'room_id': room_id, 'room_type': room_type}).sort('timestamp', 1)
-    historical_messages = []
-    for message in historical_messages_cursor:
-        message['_id'] = str(message['_id'])
-        if 'timestamp' in message and isinstance(message['timestamp'], datetime):
-            message['timestamp'] = message['timestamp'].isoformat()
-        historical_messages.append(message)
+    if notification_repository.mark_all_read(current_user.id, "chat_message").modified_count:
+        emit_unread_count(current_user.id)
 
-    historical_messages_json = json.dumps(historical_messages)
+    # JSON clients page through history; pass next_cursor back as `before` for older messages
+    if request.args.get('format') == 'json':
+        try:
+            messages, next_cursor = get_chat_history_page(
+                room_id, room_type,
+                before=request.args.get('before'),
+                around=request.args.get('around'),
+                limit=min(max(int(request.args.get('limit', CHAT_PAGE_SIZE)), 1), CHAT_MAX_PAGE_SIZE)
+            )
+        except (ValueError, InvalidId):
+            return jsonify({'error': 'Invalid history position'}), 400
+        return jsonify({
+            'messages': [serialize_chat_message(message) for message in messages],
+            'has_older': next_cursor is not None,
+            'next_cursor': next_cursor
+        })
 
-    return render_template('chat.html', historical_messages_json=historical_messages_json, current_room_id=room_id, current_room_type=room_type, current_room_name=current_room_name)
+    # The page loads history over Socket.IO (join_room / load_older), so none is embedded here
+    return render_template('chat.html', current_room_id=room_id, current_room_type=room_type, current_room_name=current_room_name)
 
 
 @app.route("/api/updates_seen", methods=["POST"])
@@ -2741,6 +2738,33 @@ def handle_connect():
     else:
         print('Anonymous client connected')
 
+@socketio.on('sync_notifications')
+def handle_sync_notifications(data=None):
+    """Subscribe to live notifications and replay anything missed since `last_seen_id`.
+    
+    Without `last_seen_id` the newest page is sent. `has_more` means the gap
+    was larger than one replay; fetch the rest from /api/notifications.
+    """
+    if not current_user.is_authenticated:
+        return
+    user_id = str(current_user.get_id())
+    join_room(user_id)
+    last_seen_id = (data or {}).get('last_seen_id')
+    try:
+        if last_seen_id:
+            notifications, has_more = notification_repository.find_newer(user_id, last_seen_id)
+        else:
+            notifications, next_cursor = notification_repository.find_page(user_id)
+            has_more = next_cursor is not None
+    except InvalidId:
+        emit('error', {'message': 'Invalid last_seen_id'})
+        return
+    emit('notifications_replay', {
+        'notifications': [serialize_notification(notification) for notification in notifications],
+        'has_more': has_more,
+        'unread_count': notification_repository.unread_count(user_id)
+    })
+
 @socketio.on('disconnect')
 def handle_disconnect():
     if current_user.is_authenticated:
@@ -2774,10 +2798,14 @@ def handle_send_global_message(data):
             'room_type': 'global',
             'createdAt': datetime.utcnow().isoformat() + 'Z'  # ISO format with UTC indicator
         }
+        expires_at = chat_retention.expires_at('global')
+        if expires_at:
+            message['expiresAt'] = expires_at
         
-        # Save to database
-        result = mongo.db.global_messages.insert_one(message)
-        message['_id'] = str(result.inserted_id)
+        # Save to database (the stored document may still be queued, so broadcast a copy)
+        message_id = persist_chat_message(global_message_writer, mongo.db.global_messages, message)
+        message = {key: value for key, value in message.items() if key != 'expiresAt'}
+        message['_id'] = str(message_id)
         
         # Broadcast to all connected clients
         emit('new_global_message', message, broadcast=True)
@@ -2851,20 +2879,33 @@ def handle_send_message(data):
         timestamp = datetime.utcnow()
 
         # Save message to MongoDB
-        chat_messages_collection.insert_one({
+        chat_message = {
             'sender_id': user_id,
             'sender_username': username,
             'message': message_content,
             'timestamp': timestamp,
             'room_id': room_id,
             'room_type': room_type
-        })
+        }
+        chat_message['search_terms'] = build_search_terms(chat_message, CHAT_SEARCH_FIELDS)
+        expires_at = chat_retention.expires_at(room_type, timestamp)
+        if expires_at:
+            chat_message['expires_at'] = expires_at
+        persist_chat_message(chat_message_writer, chat_messages_collection, chat_message)
+        if chat_buffer is not None:
+            chat_buffer.append(room_id, room_type, {key: value for key, value in chat_message.items()
+                                                   if key not in ('search_terms', 'expires_at')})
         emit('receive_message', {'username': username, 'message': message_content, 'timestamp': str(timestamp), 'room_id': room_id}, room=room_id)
 
         # Send push notifications for TEAM chat only (not global chat)
         if room_type == 'team' or room_type == 'project':
             # room_id is the project ID for team chats
-            send_team_chat_push(room_id, user_id, username, message_content)
+            job_queue.enqueue('team_chat_push', {
+                'project_id': room_id,
+                'sender_id': user_id,
+                'sender_name': username,
+                'message': message_content
+            })
     else:
         print('Anonymous user tried to send a message.')
 
@@ -2879,15 +2920,29 @@ def handle_join_room(data):
         # Optionally, emit a message to the room that a user has joined
         emit('status_message', {'msg': f'{current_user.name} has joined the chat.'}, room=room_id)
 
-        # Fetch and emit historical messages for the joined room
-        historical_messages_cursor = chat_messages_collection.find({'room_id': room_id, 'room_type': room_type}).sort('timestamp', 1)
-        historical_messages = []
-        for message in historical_messages_cursor:
-            message['_id'] = str(message['_id'])
-            if 'timestamp' in message and isinstance(message['timestamp'], datetime):
-                message['timestamp'] = message['timestamp'].isoformat()
-            historical_messages.append(message)
-        emit('historical_messages', historical_messages, room=request.sid)
+        # Emit the newest page of history; older pages are fetched with load_older
+        messages, next_cursor = get_chat_history_page(room_id, room_type)
+        emit('historical_messages', [serialize_chat_message(message) for message in messages], room=request.sid)
+        emit('history_cursor', {'room_id': room_id, 'next_cursor': next_cursor}, room=request.sid)
+
+@socketio.on('load_older')
+def handle_load_older(data):
+    """Emit the page of a room's history before `before` (a cursor from history_cursor or a previous page)"""
+    if not current_user.is_authenticated:
+        return
+    room_id = data.get('room_id')
+    try:
+        limit = min(max(int(data.get('limit', CHAT_PAGE_SIZE)), 1), CHAT_MAX_PAGE_SIZE)
+        messages, next_cursor = get_chat_history_page(room_id, data.get('room_type', 'global'), before=data.get('before'),
+                                                     limit=limit)
+    except (ValueError, InvalidId):
+        emit('older_messages', {'room_id': room_id, 'error': 'Invalid history position'}, room=request.sid)
+        return
+    emit('older_messages', {
+        'room_id': room_id,
+        'messages': [serialize_chat_message(message) for message in messages],
+        'next_cursor': next_cursor
+    }, room=request.sid)
 
 @socketio.on('leave_room')
 def handle_leave_room(data):
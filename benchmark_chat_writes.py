@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark chat message persistence: one insert_one per message vs ChatWriter write-behind.
+
+Sends messages from several threads (like concurrent socket handlers) into a
+scratch database and reports the rate senders sustained, plus how long the
+write-behind mode took until every message was actually stored.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python benchmark_chat_writes.py [message_count] [senders]
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from pymongo import MongoClient
+
+from chat_writer import ChatWriter
+
+BENCH_DB = "projectMngmt_bench"
+ROOMS = 50
+
+
+def make_message(sender, i):
+    return {
+        "sender_id": f"bench-user-{sender}",
+        "username": f"user{sender}",
+        "message": f"message {i} from sender {sender}",
+        "room_id": f"room-{i % ROOMS}",
+        "room_type": "team",
+        "timestamp": datetime.utcnow(),
+    }
+
+
+def run_senders(send, message_count, senders):
+    """Call send() message_count times across `senders` threads; return elapsed seconds"""
+    per_sender = message_count // senders
+
+    def sender_loop(sender):
+        for i in range(per_sender):
+            send(make_message(sender, i))
+
+    threads = [threading.Thread(target=sender_loop, args=(sender,)) for sender in range(senders)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    senders = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    message_count -= message_count % senders
+    client = MongoClient(os.environ.get("MONGO_URI", "mongodb://localhost:27017"))
+    db = client[BENCH_DB]
+
+    print(f"{message_count} messages from {senders} senders\n")
+    print(f"{'mode':<14}{'send s':>9}{'msg/s':>11}{'stored s':>10}{'stored msg/s':>14}")
+    print("-" * 58)
+
+    db.chat_messages.drop()
+    elapsed = run_senders(db.chat_messages.insert_one, message_count, senders)
+    print(f"{'insert_one':<14}{elapsed:>9.2f}{message_count / elapsed:>11.0f}"
+          f"{elapsed:>10.2f}{message_count / elapsed:>14.0f}")
+
+    db.chat_messages.drop()
+    writer = ChatWriter(db.chat_messages)
+    writer.start()
+    start = time.perf_counter()
+    elapsed = run_senders(writer.submit, message_count, senders)
+    writer.stop()
+    stored = time.perf_counter() - start
+    assert db.chat_messages.count_documents({}) == message_count
+    print(f"{'write-behind':<14}{elapsed:>9.2f}{message_count / elapsed:>11.0f}"
+          f"{stored:>10.2f}{message_count / stored:>14.0f}")
+    print(f"\nwriter: {writer.stats()}")
+
+    client.drop_database(BENCH_DB)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/search query latency: legacy $regex scan vs search_terms token index.
+
+Seeds a scratch database with 100k tasks spread over a user's projects, then
+times the task query each engine issues for a handful of typical queries.
+With a message count it also seeds team chat, times /api/search/messages
+against its p95 target and explains each message query: complete words must
+be served without a blocking SORT stage, and prefix-only queries may only sort
+a few matches. It exits non-zero if any query misses either check.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python benchmark_search.py [task_count] [message_count]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+from pymongo import MongoClient
+
+from search_engine import (
+    CHAT_SEARCH_FIELDS, TASK_SEARCH_FIELDS, build_search_terms, build_term_filter, ensure_search_indexes,
+    message_search_cursor, parse_query, search_discussions
+)
+
+WORDS = (
+    "design review database schema login page report draft testing deploy "
+    "frontend backend api chart meeting slides research survey analysis budget "
+    "sprint bugfix refactor docs presentation prototype feedback release"
+).split()
+QUERIES = ["data", "design review", "slides", "prot", "budget analysis", "zzz", "deploy ", "sprint refactor "]
+PROJECT_COUNT = 200
+RUNS = 20
+BENCH_DB = "projectMngmt_bench"
+DISCUSSION_P95_TARGET_MS = 50
+# Most documents a prefix-only message query may pass through a blocking SORT
+PREFIX_SORT_MAX_DOCS = 1000
+
+
+def random_text(words):
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+
+def seed(db, task_count):
+    """Create projects and tasks in the scratch database"""
+    db.projects.drop()
+    db.tasks.drop()
+    project_ids = [str(pid) for pid in db.projects.insert_many([
+        {"title": random_text(3), "created_by": "bench-user", "team_members": ["bench-user"]}
+        for _ in range(PROJECT_COUNT)
+    ]).inserted_ids]
+
+    batch = []
+    for i in range(task_count):
+        task = {
+            "title": random_text(4),
+            "description": random_text(12),
+            "status": "To-do",
+            "project_id": random.choice(project_ids),
+        }
+        task["search_terms"] = build_search_terms(task, TASK_SEARCH_FIELDS)
+        batch.append(task)
+        if len(batch) == 5000:
+            db.tasks.insert_many(batch)
+            batch = []
+    if batch:
+        db.tasks.insert_many(batch)
+
+    ensure_search_indexes(db)
+    return project_ids
+
+
+def seed_messages(db, project_ids, message_count):
+    """Create team chat messages in the scratch database"""
+    db.chat_messages.drop()
+    batch = []
+    for i in range(message_count):
+        message = {
+            "sender_id": "bench-user",
+            "message": random_text(15),
+            "room_id": random.choice(project_ids),
+            "room_type": "team",
+        }
+        message["search_terms"] = build_search_terms(message, CHAT_SEARCH_FIELDS)
+        batch.append(message)
+        if len(batch) == 5000:
+            db.chat_messages.insert_many(batch)
+            batch = []
+    if batch:
+        db.chat_messages.insert_many(batch)
+    ensure_search_indexes(db)
+
+
+def time_discussion_search(db, project_ids, query):
+    """Return (median_ms, p95_ms, result_count) for one page of message search"""
+    timings = []
+    count = 0
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        messages, comments, _ = search_discussions(db, project_ids, query)
+        count = len(messages) + len(comments)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1], count
+
+
+def plan_stages(plan):
+    """Stage names in an explain() plan tree, classic or slot-based"""
+    stages = [plan["stage"]] if "stage" in plan else []
+    for key in ("inputStage", "queryPlan", "outerStage", "innerStage"):
+        if isinstance(plan.get(key), dict):
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+def check_message_plan(db, project_ids, query):
+    """Return (stages of the winning plan, problem or None) for the message search query"""
+    explained = message_search_cursor(db, project_ids, query).explain()
+    stages = plan_stages(explained["queryPlanner"]["winningPlan"])
+    if "SORT" not in stages:
+        return stages, None
+    stems, _ = parse_query(query)
+    if stems:
+        return stages, "blocking SORT for a complete word"
+    examined = explained.get("executionStats", {}).get("totalDocsExamined", 0)
+    if examined > PREFIX_SORT_MAX_DOCS:
+        return stages, f"SORT over {examined} documents"
+    return stages, None
+
+
+def time_query(collection, query_filter):
+    """Return (median_ms, p95_ms, result_count) for a query"""
+    timings = []
+    count = 0
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        count = len(list(collection.find(query_filter, {"_id": 1})))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1], count
+
+
+def main():
+    task_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    message_count = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    client = MongoClient(os.environ.get("MONGO_URI", "mongodb://localhost:27017"))
+    db = client[BENCH_DB]
+
+    print(f"Seeding {task_count} tasks across {PROJECT_COUNT} projects...")
+    project_ids = seed(db, task_count)
+
+    print(f"\n{'query':<18}{'engine':<8}{'median ms':>11}{'p95 ms':>10}{'hits':>9}")
+    print("-" * 56)
+    for query in QUERIES:
+        regex = {"$regex": re.escape(query), "$options": "i"}
+        regex_filter = {"$and": [
+            {"project_id": {"$in": project_ids}},
+            {"$or": [{"title": regex}, {"description": regex}]}
+        ]}
+        index_filter = {"$and": [
+            {"project_id": {"$in": project_ids}},
+            build_term_filter(query)
+        ]}
+        for engine, query_filter in (("regex", regex_filter), ("index", index_filter)):
+            median, p95, hits = time_query(db.tasks, query_filter)
+            print(f"{query:<18}{engine:<8}{median:>11.1f}{p95:>10.1f}{hits:>9}")
+
+    if message_count:
+        print(f"\nSeeding {message_count} chat messages...")
+        seed_messages(db, project_ids, message_count)
+        print(f"\n{'query':<18}{'source':<8}{'median ms':>11}{'p95 ms':>10}{'hits':>9}")
+        print("-" * 56)
+        slow = []
+        for query in QUERIES:
+            if build_term_filter(query) is None:
+                continue
+            median, p95, hits = time_discussion_search(db, project_ids, query)
+            stages, problem = check_message_plan(db, project_ids, query)
+            print(f"{query:<18}{'chat':<8}{median:>11.1f}{p95:>10.1f}{hits:>9}  {' <- '.join(stages)}")
+            if p95 > DISCUSSION_P95_TARGET_MS:
+                slow.append(f"{query!r} (p95 over {DISCUSSION_P95_TARGET_MS} ms)")
+            if problem:
+                slow.append(f"{query!r} ({problem})")
+        if slow:
+            print(f"\nMessage search checks failed for: {', '.join(slow)}")
+
+    client.drop_database(BENCH_DB)
+    if message_count and slow:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+In-memory ring buffer of each active chat room's newest messages.
+
+A room's buffer is primed from one history page the first time it is read
+and then kept current as messages are sent, so later joins are answered
+without a database read. Rooms are evicted least recently used once there are
+more than `max_rooms` or more than `max_messages` buffered in total, and a
+room is re-read after `max_age` seconds since messages sent through other
+processes do not reach this one. That staleness is why core.py only enables
+the buffer by default for a single web worker.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+from chat_history import history_cursor, history_page
+
+
+class _Room:
+    __slots__ = ('messages', 'has_older', 'primed_at')
+
+    def __init__(self, messages, has_older, size):
+        # Copies, so callers serializing their page in place cannot change what is buffered
+        self.messages = deque((dict(message) for message in messages), maxlen=size)
+        self.has_older = has_older
+        self.primed_at = time.monotonic()
+
+
+class RecentMessageBuffer:
+    """Newest `per_room` messages of up to `max_rooms` rooms, keyed by (room_id, room_type)"""
+
+    def __init__(self, per_room=100, max_rooms=500, max_messages=50000, max_age=60):
+        self.per_room = per_room
+        self.max_rooms = max_rooms
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self._rooms = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, room_id, room_type, limit):
+        """Return (messages oldest first, cursor for older messages) or None if the buffer cannot answer"""
+        key = (room_id, room_type)
+        with self._lock:
+            room = self._rooms.get(key)
+            if room is not None and time.monotonic() - room.primed_at > self.max_age:
+                self._drop(key)
+                room = None
+            if room is None or (len(room.messages) < limit and room.has_older):
+                self.misses += 1
+                return None
+            self._rooms.move_to_end(key)
+            self.hits += 1
+            messages = [dict(message) for message in list(room.messages)[-limit:]]
+            has_older = room.has_older or len(room.messages) > limit
+        return messages, history_cursor(messages[0]) if messages and has_older else None
+
+    def newest_page(self, collection, room_id, room_type, limit):
+        """The newest `limit` messages of a room, priming the buffer from `collection` on a miss"""
+        cached = self.get(room_id, room_type, limit)
+        if cached is not None:
+            return cached
+        messages, next_cursor = history_page(collection, room_id, room_type, limit=max(limit, self.per_room))
+        self.prime(room_id, room_type, messages, next_cursor)
+        page = messages[-limit:]
+        return page, history_cursor(page[0]) if page and (next_cursor or len(messages) > limit) else None
+
+    def prime(self, room_id, room_type, messages, next_cursor):
+        """Seed a room from its newest history page (oldest first)"""
+        key = (room_id, room_type)
+        with self._lock:
+            self._drop(key)
+            room = _Room(messages[-self.per_room:], next_cursor is not None or len(messages) > self.per_room,
+                         self.per_room)
+            self._rooms[key] = room
+            self._size += len(room.messages)
+            self._evict()
+
+    def append(self, room_id, room_type, message):
+        """Add a newly written message; rooms that are not buffered are left alone"""
+        key = (room_id, room_type)
+        with self._lock:
+            room = self._rooms.get(key)
+            if room is None:
+                return
+            if len(room.messages) == self.per_room:
+                room.has_older = True
+            else:
+                self._size += 1
+            room.messages.append(dict(message))
+            self._rooms.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, room_id, room_type):
+        with self._lock:
+            self._drop((room_id, room_type))
+
+    def invalidate_sender(self, sender_id):
+        """Drop every room holding a message from `sender_id`, e.g. after their messages are deleted"""
+        with self._lock:
+            for key, room in list(self._rooms.items()):
+                if any(message.get('sender_id') == sender_id for message in room.messages):
+                    self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            return {'rooms': len(self._rooms), 'messages': self._size, 'hits': self.hits, 'misses': self.misses}
+
+    def _drop(self, key):
+        room = self._rooms.pop(key, None)
+        if room is not None:
+            self._size -= len(room.messages)
+
+    def _evict(self):
+        while self._rooms and (len(self._rooms) > self.max_rooms or self._size > self.max_messages):
+            key = next(iter(self._rooms))
+            self._drop(key)
@@ -0,0 +1,71 @@
+"""
+Keyset-paginated chat room history.
+
+Rooms are read newest first through the (room_id, room_type, timestamp, _id)
+index, a page at a time. A page is returned oldest first for display, with a
+cursor ("<timestamp>_<id>" of its oldest message) for the page before it.
+"""
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+CHAT_HISTORY_INDEX = [('room_id', ASCENDING), ('room_type', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)]
+
+
+def ensure_chat_history_index(collection):
+    collection.create_index(CHAT_HISTORY_INDEX)
+
+
+def history_cursor(message):
+    """Keyset cursor pointing just before a message"""
+    return f"{message['timestamp'].isoformat()}_{message['_id']}"
+
+
+def parse_history_cursor(token, collection=None):
+    """Decode a history_cursor() token into (timestamp, _id); raises ValueError if malformed.
+
+    A bare message id (the older `before` format) is resolved through `collection`.
+    """
+    try:
+        if '_' not in token and collection is not None:
+            message = collection.find_one({'_id': ObjectId(token)}, {'timestamp': 1})
+            return message['timestamp'], message['_id']
+        timestamp, message_id = token.rsplit('_', 1)
+        return datetime.fromisoformat(timestamp), ObjectId(message_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def history_page(collection, room_id, room_type, before=None, limit=50):
+    """Return (messages oldest first, cursor for the previous page or None)"""
+    query = {'room_id': room_id, 'room_type': room_type}
+    if before:
+        timestamp, message_id = parse_history_cursor(before, collection)
+        query['$or'] = [
+            {'timestamp': {'$lt': timestamp}},
+            {'timestamp': timestamp, '_id': {'$lt': message_id}},
+        ]
+    messages = list(collection.find(query, {'search_terms': 0, 'expires_at': 0})
+                    .sort([('timestamp', DESCENDING), ('_id', DESCENDING)])
+                    .limit(limit + 1))
+    next_cursor = history_cursor(messages[limit - 1]) if len(messages) > limit else None
+    return messages[:limit][::-1], next_cursor
+
+
+def history_around(collection, room_id, room_type, around_id, limit=50):
+    """Return (messages oldest first, cursor for older messages or None) for a page centred on `around_id`.
+
+    The message itself and up to half the page after it come first; older
+    messages fill the rest, so a jump near the end of a room still gets a
+    full page and a page of one is just the message.
+    """
+    room_filter = {'room_id': room_id, 'room_type': room_type}
+    older = list(collection.find(dict(room_filter, _id={'$lt': around_id}), {'search_terms': 0, 'expires_at': 0})
+                 .sort('_id', DESCENDING).limit(limit + 1))
+    newer = list(collection.find(dict(room_filter, _id={'$gte': around_id}), {'search_terms': 0, 'expires_at': 0})
+                 .sort('_id', ASCENDING).limit(limit - limit // 2))
+    older_count = limit - len(newer)
+    messages = older[:older_count][::-1] + newer
+    has_older = len(older) > older_count
+    return messages, history_cursor(messages[0]) if messages and has_older else None
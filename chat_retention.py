@@ -0,0 +1,101 @@
+"""
+Chat retention policies per room type.
+
+New messages are stamped with an `expires_at` date from their room type's
+policy and removed by a TTL index, so MongoDB expires them gradually instead
+of one large delete. Messages written before the field existed are purged in
+small `_id`-ranged batches with a pause between them, which keeps the cleanup
+from competing with foreground chat traffic.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ASCENDING
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOM_TYPE = 'default'
+
+
+def parse_retention_policies(value, default_hours=24):
+    """Parse "global=24,team=168" into {room_type: hours}; 0 keeps messages forever.
+
+    A bare number sets the default for every room type.
+    """
+    policies = {DEFAULT_ROOM_TYPE: default_hours}
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        room_type, _, hours = part.rpartition('=')
+        policies[room_type.strip() or DEFAULT_ROOM_TYPE] = float(hours)
+    return policies
+
+
+class ChatRetention:
+    """Retention for chat_messages (by room_type) and the separate global_messages collection"""
+
+    def __init__(self, policies, batch_size=1000, pause=0.2):
+        self.policies = policies
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def retention(self, room_type):
+        """Retention for a room type as a timedelta, or None to keep messages forever"""
+        hours = self.policies.get(room_type, self.policies.get(DEFAULT_ROOM_TYPE, 0))
+        return timedelta(hours=hours) if hours else None
+
+    def expires_at(self, room_type, timestamp=None):
+        retention = self.retention(room_type)
+        if retention is None:
+            return None
+        return (timestamp or datetime.utcnow()) + retention
+
+    def ensure_indexes(self, chat_collection, global_collection=None):
+        chat_collection.create_index([('expires_at', ASCENDING)], expireAfterSeconds=0)
+        if global_collection is not None:
+            global_collection.create_index([('expiresAt', ASCENDING)], expireAfterSeconds=0)
+
+    def purge_legacy(self, collection, now=None):
+        """Delete messages without expires_at that are past their room type's retention.
+
+        Returns {room_type: deleted}. Ranges over the _id index (ObjectIds embed
+        their creation time), deleting at most `batch_size` messages per pause.
+        """
+        now = now or datetime.utcnow()
+        named_types = [room_type for room_type in self.policies if room_type != DEFAULT_ROOM_TYPE]
+        deleted = {}
+        for room_type in self.policies:
+            retention = self.retention(room_type)
+            if retention is None:
+                continue
+            type_filter = {'$nin': named_types} if room_type == DEFAULT_ROOM_TYPE else room_type
+            cutoff_id = ObjectId.from_datetime(now - retention)
+            deleted[room_type] = self._delete_in_batches(
+                collection, {'room_type': type_filter, 'expires_at': {'$exists': False}, '_id': {'$lt': cutoff_id}})
+        return deleted
+
+    def purge_global_legacy(self, collection, now=None):
+        """Delete global chat messages written without expiresAt once past the global retention"""
+        retention = self.retention('global')
+        if retention is None:
+            return 0
+        cutoff_id = ObjectId.from_datetime((now or datetime.utcnow()) - retention)
+        return self._delete_in_batches(collection, {'expiresAt': {'$exists': False}, '_id': {'$lt': cutoff_id}})
+
+    def _delete_in_batches(self, collection, query):
+        """Delete matches in _id order; each batch resumes after the last _id instead of rescanning the range"""
+        deleted = 0
+        id_range = dict(query.get('_id', {}))
+        while True:
+            ids = [doc['_id'] for doc in
+                   collection.find(dict(query, _id=id_range), {'_id': 1}).sort('_id', ASCENDING).limit(self.batch_size)]
+            if not ids:
+                return deleted
+            deleted += collection.delete_many({'_id': {'$in': ids}}).deleted_count
+            if len(ids) < self.batch_size:
+                return deleted
+            id_range = dict(id_range, **{'$gt': ids[-1]})
+            time.sleep(self.pause)
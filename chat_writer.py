@@ -0,0 +1,114 @@
+"""
+Write-behind persistence for chat messages.
+
+`submit` gives a message a client-generated ObjectId and queues it, so the
+sender can broadcast immediately; a background thread writes queued messages
+with one `insert_many` every `flush_interval` seconds. Because ids are set
+before the write, a retried batch cannot create duplicates. `stop` (registered
+at exit by the caller) writes whatever is still queued.
+"""
+import logging
+import threading
+from collections import deque
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class ChatWriter:
+    """Batches inserts into `collection`.
+
+    When `max_queue` messages are already waiting, `submit` writes the message
+    directly, which bounds memory and slows senders down instead of dropping.
+    """
+
+    def __init__(self, collection, flush_interval=0.005, max_batch=500, max_queue=20000, retry_delay=1.0):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.retry_delay = retry_delay
+        self._queue = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._counts = {'written': 0, 'batches': 0, 'errors': 0, 'direct': 0}
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='chat-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer thread and write everything still queued"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+        self.flush()
+        if self._queue:
+            logger.error(f"Chat writer stopped with {len(self._queue)} unwritten message(s)")
+
+    def submit(self, message):
+        """Queue a message for writing; sets and returns its _id"""
+        message.setdefault('_id', ObjectId())
+        if len(self._queue) >= self.max_queue:
+            self.collection.insert_one(message)
+            self._counts['direct'] += 1
+        else:
+            self._queue.append(message)
+            self._wake.set()
+        return message['_id']
+
+    def flush(self):
+        """Write every queued message now; return how many were written"""
+        written = 0
+        with self._flush_lock:
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.max_batch:
+                    batch.append(self._queue.popleft())
+                try:
+                    self._insert(batch)
+                except Exception:
+                    # Put the batch back in order for the next attempt
+                    self._queue.extendleft(reversed(batch))
+                    raise
+                written += len(batch)
+        return written
+
+    def stats(self):
+        return dict(self._counts, queued=len(self._queue))
+
+    def _insert(self, batch):
+        try:
+            self.collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Messages already written by an earlier attempt that failed midway are fine; other
+            # per-document errors would fail again on retry, so those messages are dropped
+            errors = [error for error in e.details.get('writeErrors', []) if error.get('code') != DUPLICATE_KEY]
+            if errors:
+                self._counts['errors'] += len(errors)
+                logger.error(f"Dropped {len(errors)} chat message(s) that could not be written: {errors[0].get('errmsg')}")
+        self._counts['written'] += len(batch)
+        self._counts['batches'] += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            # Let a few more messages arrive so they share one insert_many
+            if self._stop.wait(self.flush_interval):
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                self._counts['errors'] += 1
+                logger.error(f"Error writing chat messages ({len(self._queue)} queued): {e}")
+                self._stop.wait(self.retry_delay)
+                self._wake.set()
@@ -0,0 +1,747 @@
+"""
+Shared in-memory MongoDB stand-in for the unit tests (no MongoDB required).
+
+FakeCollection implements the subset of the pymongo collection API the app's
+modules use, with Mongo's semantics where they matter for correctness:
+documents are copied on insert and on every read (so callers cannot alias
+stored data), query operators traverse arrays and dotted paths, updates
+support the usual operators and pipeline updates, unique indexes and
+duplicate _ids raise DuplicateKeyError/BulkWriteError, and aggregate()
+runs the stages used here ($match, $sort, $skip, $limit, $project,
+$unwind, $group, $lookup).
+
+Every round trip is appended to `collection.calls` (and counted on the
+owning FakeDatabase) so tests can assert on query shapes and counts.
+"""
+import copy
+import re
+from datetime import datetime
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError
+
+_MISSING = object()
+
+
+# -- field access ---------------------------------------------------------
+
+def _values(doc, path):
+    """Every value at a dotted path, expanding arrays along the way"""
+    values = [doc]
+    for part in path.split('.'):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit():
+                    if int(part) < len(value):
+                        found.append(value[int(part)])
+                else:
+                    found.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        values = found
+    return values
+
+
+def _get(doc, path, default=None):
+    value = doc
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def _set(doc, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset(doc, path):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+# -- query matching -------------------------------------------------------
+
+_TYPES = {
+    'date': datetime, 'objectId': ObjectId, 'string': str, 'bool': bool,
+    'array': list, 'object': dict, 'null': type(None),
+}
+
+
+def _compare(left, right, op):
+    try:
+        return op(left, right)
+    except TypeError:
+        # Mongo only compares values of the same type bracket
+        return False
+
+
+def _candidates(values):
+    """A field matches if the value itself or any element of an array value matches"""
+    for value in values:
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+
+def _match_operator(values, operator, argument):
+    if operator == '$exists':
+        return bool(values) == bool(argument)
+    if operator == '$ne':
+        return not _match_operator(values, '$eq', argument)
+    if operator == '$nin':
+        return not _match_operator(values, '$in', argument)
+    if operator == '$not':
+        return not _match_condition(values, argument)
+    candidates = list(_candidates(values)) or [None]
+    if operator == '$eq':
+        return any(value == argument for value in candidates)
+    if operator == '$in':
+        return any(value == item or (isinstance(item, re.Pattern) and isinstance(value, str) and item.search(value))
+                   for value in candidates for item in argument)
+    if operator == '$all':
+        return all(_match_operator(values, '$eq', item) for item in argument)
+    if operator in ('$lt', '$lte', '$gt', '$gte'):
+        op = {'$lt': lambda a, b: a < b, '$lte': lambda a, b: a <= b,
+              '$gt': lambda a, b: a > b, '$gte': lambda a, b: a >= b}[operator]
+        return any(value is not None and _compare(value, argument, op) for value in candidates)
+    if operator == '$type':
+        expected = _TYPES[argument]
+        return any(isinstance(value, expected) and not (expected is not bool and isinstance(value, bool))
+                   for value in list(_candidates(values)))
+    if operator == '$size':
+        return any(isinstance(value, list) and len(value) == argument for value in values)
+    if operator == '$elemMatch':
+        return any(isinstance(value, list) and any(matches(item, argument) for item in value if isinstance(item, dict))
+                   for value in values)
+    raise NotImplementedError(f"FakeCollection does not support {operator}")
+
+
+def _match_condition(values, condition):
+    if isinstance(condition, re.Pattern):
+        return any(isinstance(value, str) and condition.search(value) for value in _candidates(values))
+    if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+        if '$regex' in condition:
+            flags = re.IGNORECASE if 'i' in condition.get('$options', '') else 0
+            pattern = re.compile(condition['$regex'], flags)
+            if not any(isinstance(value, str) and pattern.search(value) for value in _candidates(values)):
+                return False
+        return all(_match_operator(values, operator, argument) for operator, argument in condition.items()
+                   if operator not in ('$regex', '$options'))
+    if condition is None:
+        return not values or any(value is None for value in values)
+    return _match_operator(values, '$eq', condition)
+
+
+def matches(doc, query):
+    """Whether a document matches a Mongo query filter"""
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif key == '$nor':
+            if any(matches(doc, clause) for clause in condition):
+                return False
+        elif key == '$expr':
+            if not evaluate(condition, doc):
+                return False
+        elif not _match_condition(_values(doc, key), condition):
+            return False
+    return True
+
+
+# -- aggregation expressions ----------------------------------------------
+
+def _to_object_id(value):
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+
+def evaluate(expression, doc):
+    """Evaluate an aggregation expression against a document"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        return _get(doc, expression[1:])
+    if isinstance(expression, list):
+        return [evaluate(item, doc) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if len(expression) != 1 or not next(iter(expression)).startswith('$'):
+        return {key: evaluate(value, doc) for key, value in expression.items()}
+    operator, argument = next(iter(expression.items()))
+    if operator == '$literal':
+        return argument
+    if operator == '$convert':
+        value = evaluate(argument['input'], doc)
+        if value is None:
+            return argument.get('onNull')
+        try:
+            return {'objectId': _to_object_id, 'string': str, 'int': int, 'double': float}[argument['to']](value)
+        except Exception:
+            if 'onError' in argument:
+                return argument['onError']
+            raise
+    args = evaluate(argument, doc)
+    if operator == '$toString':
+        return None if args is None else (args.isoformat() if isinstance(args, datetime) else str(args))
+    if operator == '$toObjectId':
+        return None if args is None else _to_object_id(args)
+    if operator == '$add':
+        return sum(args)
+    if operator == '$subtract':
+        return args[0] - args[1]
+    if operator == '$ifNull':
+        return next((value for value in args[:-1] if value is not None), args[-1])
+    if operator == '$concat':
+        return None if any(value is None for value in args) else ''.join(args)
+    if operator == '$eq':
+        return args[0] == args[1]
+    if operator == '$ne':
+        return args[0] != args[1]
+    if operator in ('$lt', '$lte', '$gt', '$gte'):
+        return _match_operator([args[0]], operator, args[1])
+    if operator == '$in':
+        return args[0] in args[1]
+    if operator == '$cond':
+        if isinstance(argument, dict):
+            return evaluate(argument['then'] if evaluate(argument['if'], doc) else argument['else'], doc)
+        return args[1] if args[0] else args[2]
+    if operator == '$size':
+        return len(args)
+    raise NotImplementedError(f"FakeCollection does not support {operator}")
+
+
+# -- projections and sorting ----------------------------------------------
+
+def _include(source, target, parts):
+    """Copy one dotted path from source into target, projecting into arrays of subdocuments"""
+    head, rest = parts[0], parts[1:]
+    if not isinstance(source, dict) or head not in source:
+        return
+    value = source[head]
+    if not rest:
+        target[head] = copy.deepcopy(value)
+    elif isinstance(value, list):
+        items = target.setdefault(head, [{} for _ in value])
+        for item, projected in zip(value, items):
+            _include(item, projected, rest)
+    elif isinstance(value, dict):
+        _include(value, target.setdefault(head, {}), rest)
+
+
+def project(doc, projection):
+    """Apply a find()/$project projection to a document"""
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    fields = {key: value for key, value in projection.items() if key != '_id'}
+    including = any(not (value in (0, False)) for value in fields.values())
+    if including:
+        result = {}
+        if projection.get('_id', 1) not in (0, False) and '_id' in doc:
+            result['_id'] = doc['_id']
+        for key, value in fields.items():
+            if value in (1, True):
+                _include(doc, result, key.split('.'))
+            else:
+                _set(result, key, evaluate(value, doc))
+        return result
+    result = copy.deepcopy(doc)
+    for key, value in projection.items():
+        if value in (0, False):
+            _unset(result, key)
+    return result
+
+
+def _sort_key(value):
+    """Order values across types roughly the way Mongo does (null first)"""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (5, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, ObjectId):
+        return (4, value.binary)
+    if isinstance(value, datetime):
+        return (6, value)
+    return (3, str(value))
+
+
+def sort_documents(docs, keys):
+    """Stable multi-key sort; `keys` is [(field, direction), ...]"""
+    docs = list(docs)
+    for field, direction in reversed(keys):
+        docs.sort(key=lambda doc: _sort_key(_get(doc, field)), reverse=direction < 0)
+    return docs
+
+
+def _sort_spec(key, direction=None):
+    if isinstance(key, (list, tuple)):
+        return list(key)
+    if isinstance(key, dict):
+        return list(key.items())
+    return [(key, 1 if direction is None else direction)]
+
+
+# -- updates --------------------------------------------------------------
+
+def apply_update(doc, update, inserting=False):
+    """Apply an update document or update pipeline to `doc` in place"""
+    if isinstance(update, list):
+        for stage in update:
+            (operator, fields), = stage.items()
+            if operator in ('$set', '$addFields'):
+                values = {key: evaluate(value, doc) for key, value in fields.items()}
+                for key, value in values.items():
+                    _set(doc, key, value)
+            elif operator == '$unset':
+                for key in [fields] if isinstance(fields, str) else fields:
+                    _unset(doc, key)
+            else:
+                raise NotImplementedError(f"FakeCollection does not support pipeline stage {operator}")
+        return
+    for operator, fields in update.items():
+        for key, value in fields.items():
+            current = _get(doc, key, _MISSING)
+            if operator == '$set':
+                _set(doc, key, copy.deepcopy(value))
+            elif operator == '$setOnInsert':
+                if inserting:
+                    _set(doc, key, copy.deepcopy(value))
+            elif operator == '$unset':
+                _unset(doc, key)
+            elif operator == '$inc':
+                _set(doc, key, (0 if current is _MISSING else current) + value)
+            elif operator in ('$min', '$max'):
+                if current is _MISSING or (value < current if operator == '$min' else value > current):
+                    _set(doc, key, value)
+            elif operator in ('$push', '$addToSet'):
+                items = value['$each'] if isinstance(value, dict) and '$each' in value else [value]
+                array = [] if current is _MISSING else current
+                for item in items:
+                    if operator == '$push' or item not in array:
+                        array.append(copy.deepcopy(item))
+                if operator == '$push' and isinstance(value, dict) and '$slice' in value:
+                    limit = value['$slice']
+                    array = array[limit:] if limit < 0 else array[:limit]
+                _set(doc, key, array)
+            elif operator == '$pull':
+                if current is not _MISSING:
+                    _set(doc, key, [item for item in current if not (
+                        matches(item, value) if isinstance(value, dict) and isinstance(item, dict)
+                        else _match_condition([item], value))])
+            elif operator == '$currentDate':
+                _set(doc, key, datetime.utcnow())
+            else:
+                raise NotImplementedError(f"FakeCollection does not support {operator}")
+
+
+def _upsert_seed(query):
+    """The equality fields of a filter, which an upsert copies into the new document"""
+    seed = {}
+    for key, condition in query.items():
+        if key == '$and':
+            for clause in condition:
+                seed.update(_upsert_seed(clause))
+        elif not key.startswith('$') and not (isinstance(condition, dict)
+                                              and any(k.startswith('$') for k in condition)):
+            _set(seed, key, copy.deepcopy(condition))
+    return seed
+
+
+# -- collections ----------------------------------------------------------
+
+class FakeCursor:
+    """Lazy cursor: sort/skip/limit/projection are applied when iterated"""
+
+    def __init__(self, collection, query, projection=None):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self.hinted = None
+
+    def sort(self, key, direction=None):
+        self._sort = _sort_spec(key, direction)
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def hint(self, index):
+        self.hinted = index
+        return self
+
+    def _results(self):
+        docs = [doc for doc in self._collection.docs if matches(doc, self._query)]
+        if self._sort:
+            docs = sort_documents(docs, self._sort)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[:self._limit]
+        return [project(copy.deepcopy(doc), self._projection) for doc in docs]
+
+    def __iter__(self):
+        return iter(self._results())
+
+    def __next__(self):
+        raise TypeError("call iter() on a FakeCursor first")
+
+
+class FakeCollection:
+    """In-memory collection; `docs` holds the stored documents in insertion order"""
+
+    def __init__(self, docs=None, name='collection', database=None):
+        self.name = name
+        self.database = database
+        self.docs = []
+        self.indexes = []
+        self.calls = []
+        for doc in docs or []:
+            self._insert(doc)
+
+    # Reads
+
+    def _call(self, method, *args):
+        self.calls.append((method,) + args)
+        if self.database is not None:
+            self.database.round_trips += 1
+
+    def queries(self, method='find'):
+        """The filters passed to `method`, oldest first"""
+        return [call[1] for call in self.calls if call[0] == method]
+
+    def find(self, filter=None, projection=None, sort=None, limit=0, skip=0):
+        self._call('find', filter or {})
+        cursor = FakeCursor(self, filter or {}, projection)
+        if sort:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
+
+    def find_one(self, filter=None, projection=None, sort=None):
+        self._call('find_one', filter or {})
+        cursor = FakeCursor(self, filter or {}, projection).limit(1)
+        if sort:
+            cursor.sort(sort)
+        return next(iter(cursor), None)
+
+    def count_documents(self, filter, **kwargs):
+        self._call('count_documents', filter)
+        return sum(1 for doc in self.docs if matches(doc, filter))
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+    def distinct(self, key, filter=None):
+        self._call('distinct', filter or {})
+        values = []
+        for doc in self.docs:
+            if matches(doc, filter or {}):
+                for value in _candidates(_values(doc, key)):
+                    if not isinstance(value, list) and value not in values:
+                        values.append(value)
+        return values
+
+    def aggregate(self, pipeline, **kwargs):
+        self._call('aggregate', pipeline)
+        docs = [copy.deepcopy(doc) for doc in self.docs]
+        for stage in pipeline:
+            (operator, argument), = stage.items()
+            docs = self._stage(docs, operator, argument)
+        return iter(docs)
+
+    def _stage(self, docs, operator, argument):
+        if operator == '$match':
+            return [doc for doc in docs if matches(doc, argument)]
+        if operator == '$sort':
+            return sort_documents(docs, list(argument.items()))
+        if operator == '$skip':
+            return docs[argument:]
+        if operator == '$limit':
+            return docs[:argument]
+        if operator in ('$project', '$addFields', '$set'):
+            if operator == '$project':
+                return [project(doc, argument) for doc in docs]
+            for doc in docs:
+                values = {key: evaluate(value, doc) for key, value in argument.items()}
+                for key, value in values.items():
+                    _set(doc, key, value)
+            return docs
+        if operator == '$unwind':
+            path = argument if isinstance(argument, str) else argument['path']
+            field = path[1:]
+            unwound = []
+            for doc in docs:
+                for item in _get(doc, field) or []:
+                    unwound.append(dict(copy.deepcopy(doc), **{field: item}) if '.' not in field
+                                   else self._replace(doc, field, item))
+            return unwound
+        if operator == '$group':
+            groups = {}
+            for doc in docs:
+                key = evaluate(argument['_id'], doc)
+                group = groups.setdefault(repr(key), {'_id': key})
+                for name, accumulator in argument.items():
+                    if name == '_id':
+                        continue
+                    (op, expression), = accumulator.items()
+                    value = evaluate(expression, doc)
+                    if op == '$sum':
+                        group[name] = group.get(name, 0) + (value or 0)
+                    elif op == '$first':
+                        group.setdefault(name, value)
+                    elif op == '$last':
+                        group[name] = value
+                    elif op == '$push':
+                        group.setdefault(name, []).append(value)
+                    elif op in ('$min', '$max'):
+                        if name not in group or (value < group[name] if op == '$min' else value > group[name]):
+                            group[name] = value
+                    else:
+                        raise NotImplementedError(f"FakeCollection does not support {op}")
+            return list(groups.values())
+        if operator == '$lookup':
+            foreign = self.database[argument['from']]
+            for doc in docs:
+                local = _get(doc, argument['localField'])
+                locals_ = local if isinstance(local, list) else [local]
+                joined = [copy.deepcopy(other) for other in foreign.docs
+                          if any(value in locals_ for value in _candidates(_values(other, argument['foreignField'])))]
+                for stage in argument.get('pipeline', []):
+                    (stage_operator, stage_argument), = stage.items()
+                    joined = self._stage(joined, stage_operator, stage_argument)
+                doc[argument['as']] = joined
+            return docs
+        if operator == '$count':
+            return [{argument: len(docs)}]
+        raise NotImplementedError(f"FakeCollection does not support {operator}")
+
+    @staticmethod
+    def _replace(doc, field, value):
+        doc = copy.deepcopy(doc)
+        _set(doc, field, value)
+        return doc
+
+    # Writes
+
+    def _check_unique(self, doc, ignore=None, ids=None):
+        if ignore is None and doc['_id'] in (ids if ids is not None else {other['_id'] for other in self.docs}):
+            raise DuplicateKeyError(f"E11000 duplicate key error _id: {doc['_id']!r}")
+        if ignore is not None and doc['_id'] != ignore['_id']:
+            raise ValueError("_id is immutable")
+        for keys, options in self.indexes:
+            if not options.get('unique'):
+                continue
+            fields = [field for field, _ in keys]
+            value = tuple(_get(doc, field) for field in fields)
+            partial = options.get('partialFilterExpression')
+            if partial and not matches(doc, partial):
+                continue
+            for other in self.docs:
+                if other is not ignore and tuple(_get(other, field) for field in fields) == value \
+                        and (not partial or matches(other, partial)):
+                    raise DuplicateKeyError(f"E11000 duplicate key error {fields}: {value!r}")
+
+    def _insert(self, doc, ids=None):
+        doc.setdefault('_id', ObjectId())
+        stored = copy.deepcopy(doc)
+        self._check_unique(stored, ids=ids)
+        self.docs.append(stored)
+        if ids is not None:
+            ids.add(stored['_id'])
+        return doc['_id']
+
+    def insert_one(self, document):
+        self._call('insert_one', document)
+        return SimpleNamespace(inserted_id=self._insert(document), acknowledged=True)
+
+    def insert_many(self, documents, ordered=True):
+        documents = list(documents)
+        self._call('insert_many', documents)
+        inserted, errors = [], []
+        ids = {doc['_id'] for doc in self.docs}
+        for index, doc in enumerate(documents):
+            try:
+                inserted.append(self._insert(doc, ids))
+            except DuplicateKeyError as e:
+                errors.append({'index': index, 'code': 11000, 'errmsg': str(e), 'op': doc})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(inserted)})
+        return SimpleNamespace(inserted_ids=inserted, acknowledged=True)
+
+    def _update(self, filter, update, multi=False, upsert=False, sort=None):
+        targets = [doc for doc in self.docs if matches(doc, filter)]
+        if sort:
+            targets = sort_documents(targets, _sort_spec(sort))
+        if not multi:
+            targets = targets[:1]
+        modified = 0
+        for doc in targets:
+            before = copy.deepcopy(doc)
+            updated = copy.deepcopy(doc)
+            apply_update(updated, update)
+            self._check_unique(updated, ignore=doc)
+            doc.clear()
+            doc.update(updated)
+            modified += doc != before
+        upserted_id = None
+        if not targets and upsert:
+            doc = _upsert_seed(filter)
+            apply_update(doc, update, inserting=True)
+            upserted_id = self._insert(doc)
+            targets = [self.docs[-1]]
+        return targets, SimpleNamespace(matched_count=len(targets) if upserted_id is None else 0,
+                                        modified_count=modified, upserted_id=upserted_id, acknowledged=True)
+
+    def update_one(self, filter, update, upsert=False):
+        self._call('update_one', filter, update)
+        return self._update(filter, update, upsert=upsert)[1]
+
+    def update_many(self, filter, update, upsert=False):
+        self._call('update_many', filter, update)
+        return self._update(filter, update, multi=True, upsert=upsert)[1]
+
+    def replace_one(self, filter, replacement, upsert=False):
+        self._call('replace_one', filter, replacement)
+        for doc in self.docs:
+            if matches(doc, filter):
+                replaced = dict(copy.deepcopy(replacement), _id=doc['_id'])
+                self._check_unique(replaced, ignore=doc)
+                doc.clear()
+                doc.update(replaced)
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        upserted_id = self._insert(dict(replacement)) if upsert else None
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=upserted_id)
+
+    def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                            return_document=ReturnDocument.BEFORE):
+        self._call('find_one_and_update', filter, update)
+        matched = [doc for doc in self.docs if matches(doc, filter)]
+        if sort:
+            matched = sort_documents(matched, _sort_spec(sort))
+        before = copy.deepcopy(matched[0]) if matched else None
+        targets, result = self._update(filter, update, upsert=upsert, sort=sort)
+        if not targets:
+            return None
+        if return_document == ReturnDocument.AFTER:
+            return project(copy.deepcopy(targets[0]), projection)
+        return project(before, projection) if before is not None else None
+
+    def find_one_and_delete(self, filter, projection=None, sort=None):
+        self._call('find_one_and_delete', filter)
+        matched = [doc for doc in self.docs if matches(doc, filter)]
+        if sort:
+            matched = sort_documents(matched, _sort_spec(sort))
+        if not matched:
+            return None
+        self.docs = [doc for doc in self.docs if doc is not matched[0]]
+        return project(matched[0], projection)
+
+    def _delete(self, filter, multi):
+        deleted = 0
+        kept = []
+        for doc in self.docs:
+            if (multi or not deleted) and matches(doc, filter):
+                deleted += 1
+            else:
+                kept.append(doc)
+        self.docs = kept
+        return SimpleNamespace(deleted_count=deleted, acknowledged=True)
+
+    def delete_one(self, filter):
+        self._call('delete_one', filter)
+        return self._delete(filter, multi=False)
+
+    def delete_many(self, filter):
+        self._call('delete_many', filter)
+        return self._delete(filter, multi=True)
+
+    def bulk_write(self, requests, ordered=True):
+        self._call('bulk_write', requests)
+        result = SimpleNamespace(inserted_count=0, matched_count=0, modified_count=0, deleted_count=0,
+                                 upserted_count=0, acknowledged=True)
+        for request in requests:
+            kind = type(request).__name__
+            if kind == 'InsertOne':
+                self._insert(request._doc)
+                result.inserted_count += 1
+            elif kind in ('UpdateOne', 'UpdateMany'):
+                _, outcome = self._update(request._filter, request._doc, multi=kind == 'UpdateMany',
+                                          upsert=bool(request._upsert))
+                result.matched_count += outcome.matched_count
+                result.modified_count += outcome.modified_count
+                result.upserted_count += outcome.upserted_id is not None
+            elif kind in ('DeleteOne', 'DeleteMany'):
+                result.deleted_count += self._delete(request._filter, multi=kind == 'DeleteMany').deleted_count
+            elif kind == 'ReplaceOne':
+                outcome = self.replace_one(request._filter, request._doc, upsert=bool(request._upsert))
+                result.matched_count += outcome.matched_count
+                result.modified_count += outcome.modified_count
+            else:
+                raise NotImplementedError(f"FakeCollection does not support {kind}")
+        return result
+
+    # Indexes
+
+    def create_index(self, keys, **options):
+        keys = _sort_spec(keys)
+        if (keys, options) not in self.indexes:
+            self.indexes.append((keys, options))
+        return '_'.join(f"{field}_{direction}" for field, direction in keys)
+
+    def drop(self):
+        self.docs = []
+        self.indexes = []
+
+
+class FakeDatabase:
+    """Collections are created on first access, as attributes or items"""
+
+    def __init__(self):
+        self.collections = {}
+        self.options = {}
+        self.round_trips = 0
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name=name, database=self)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def create_collection(self, name, **options):
+        if name in self.collections:
+            raise CollectionInvalid(f"collection {name} already exists")
+        self.options[name] = options
+        return self[name]
+
+    def list_collection_names(self):
+        return list(self.collections)
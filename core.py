@@ -0,0 +1,588 @@
+"""
+Shared application core: configuration, database, notification delivery and
+background jobs.
+
+Both entry points import this module. app.py adds the web routes and Socket.IO
+events on top; worker.py runs only the scheduler and job queue workers, so the
+web tier can serve requests while background work scales separately.
+"""
+import atexit
+import logging
+import os
+import time
+
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+from apscheduler.schedulers.background import BackgroundScheduler
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from flask import Flask
+from flask_mail import Mail, Message
+from flask_pymongo import PyMongo
+from flask_socketio import SocketIO
+
+from email_outbox import EmailOutbox
+from chat_retention import ChatRetention, parse_retention_policies
+from job_queue import JobQueue
+from job_runs import JobRunLog
+from notification_repository import NotificationRepository
+from ops_auth import parse_admin_emails
+from push_dispatcher import EXPO_PUSH_URL, PushDispatcher
+from scheduler_lease import SchedulerLease
+from task_reminders import (
+    DEFAULT_REMINDER_OFFSETS, claim_due_reminders, describe_offset, ensure_reminder_index, parse_offsets
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+app = Flask(__name__)
+# With a message queue (e.g. redis://...), emits from the worker process reach web clients
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=os.environ.get("SOCKETIO_MESSAGE_QUEUE"))
+
+app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "default-secret-key")
+# Stream large list responses (notifications, projects, chat history) instead of buffering them
+app.config["STREAM_JSON_RESPONSES"] = os.environ.get("STREAM_JSON_RESPONSES", "true").lower() == "true"
+# Search backend for /api/search: "index" (token index) or "regex" (legacy collection scan)
+app.config["SEARCH_ENGINE"] = os.environ.get("SEARCH_ENGINE", "index").lower()
+# Number of newest matching tasks ranked per search request
+app.config["SEARCH_CANDIDATE_LIMIT"] = int(os.environ.get("SEARCH_CANDIDATE_LIMIT", 500))
+# Optional in-memory trigram index for instant search (per process, LRU-bounded)
+app.config["SEARCH_MEMORY_INDEX"] = os.environ.get("SEARCH_MEMORY_INDEX", "false").lower() == "true"
+app.config["SEARCH_INDEX_MAX_USERS"] = int(os.environ.get("SEARCH_INDEX_MAX_USERS", 500))
+app.config["SEARCH_INDEX_MAX_POSTINGS"] = int(os.environ.get("SEARCH_INDEX_MAX_POSTINGS", 2000000))
+app.config["SEARCH_INDEX_MAX_AGE"] = int(os.environ.get("SEARCH_INDEX_MAX_AGE", 300))
+# Background job queue for notification side effects (email, push); 0 workers = enqueue only
+app.config["JOB_QUEUE_WORKERS"] = int(os.environ.get("JOB_QUEUE_WORKERS", 2))
+app.config["JOB_MAX_ATTEMPTS"] = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+app.config["JOB_VISIBILITY_TIMEOUT"] = int(os.environ.get("JOB_VISIBILITY_TIMEOUT", 300))
+# Seconds before scheduled jobs fail over to another process when the leader dies
+app.config["SCHEDULER_LEASE_TTL"] = int(os.environ.get("SCHEDULER_LEASE_TTL", 60))
+# Operational endpoints (/api/jobs/*) need the X-Ops-Token header or a signed-in user listed in ADMIN_EMAILS
+app.config["OPS_TOKEN"] = os.environ.get("OPS_TOKEN")
+app.config["ADMIN_EMAILS"] = parse_admin_emails(os.environ.get("ADMIN_EMAILS"))
+# Run the scheduler and job queue workers in the web process; disable when worker.py runs them
+app.config["RUN_BACKGROUND_JOBS"] = os.environ.get("RUN_BACKGROUND_JOBS", "true").lower() == "true"
+# Public base URL for links built outside a request (reminder emails, keep-alive ping)
+app.config["APP_BASE_URL"] = os.environ.get(
+    "APP_BASE_URL", os.environ.get("RENDER_EXTERNAL_URL", "https://proj-management-mobile.onrender.com")).rstrip("/")
+
+# Flask-Mail Configuration
+app.config["MAIL_SERVER"] = os.environ.get("MAIL_SERVER")
+app.config["MAIL_PORT"] = int(os.environ.get("MAIL_PORT", 587))
+app.config["MAIL_USE_TLS"] = os.environ.get("MAIL_USE_TLS", "true").lower() == "true"
+app.config["MAIL_USERNAME"] = os.environ.get("MAIL_USERNAME")
+app.config["MAIL_PASSWORD"] = os.environ.get("MAIL_PASSWORD")
+app.config["MAIL_DEFAULT_SENDER"] = os.environ.get("MAIL_DEFAULT_SENDER")
+# Messages sent per SMTP connection before Flask-Mail reconnects (unset = no limit)
+app.config["MAIL_MAX_EMAILS"] = int(os.environ["MAIL_MAX_EMAILS"]) if os.environ.get("MAIL_MAX_EMAILS") else None
+# Seconds to collect a user's notification emails into one digest (0 = send each one)
+app.config["EMAIL_DIGEST_WINDOW"] = int(os.environ.get("EMAIL_DIGEST_WINDOW", 0))
+# Notification retention: read ones expire after N days, unread ones are archived after M days,
+# and each user keeps at most NOTIFICATION_USER_CAP (0 disables a rule)
+app.config["NOTIFICATION_READ_TTL_DAYS"] = int(os.environ.get("NOTIFICATION_READ_TTL_DAYS", 30))
+app.config["NOTIFICATION_ARCHIVE_DAYS"] = int(os.environ.get("NOTIFICATION_ARCHIVE_DAYS", 90))
+app.config["NOTIFICATION_USER_CAP"] = int(os.environ.get("NOTIFICATION_USER_CAP", 500))
+# Seconds within which same-type notifications for one recipient and project merge into one (0 = off)
+app.config["NOTIFICATION_COALESCE_WINDOW"] = int(os.environ.get("NOTIFICATION_COALESCE_WINDOW", 300))
+# Reminder lead times before a task's due date (d/h/m units) and how often due reminders are checked
+app.config["REMINDER_OFFSETS"] = parse_offsets(os.environ.get("REMINDER_OFFSETS", DEFAULT_REMINDER_OFFSETS))
+app.config["REMINDER_TICK_MINUTES"] = int(os.environ.get("REMINDER_TICK_MINUTES", 5))
+# Chat retention in hours per room type, e.g. "global=24,team=168" (a bare number is the default; 0 = keep)
+app.config["CHAT_RETENTION_HOURS"] = parse_retention_policies(os.environ.get("CHAT_RETENTION_HOURS"), default_hours=24)
+# Per-process ring buffer of recent messages per chat room, so joins usually skip the database.
+# Other workers' sends only show up after CHAT_BUFFER_MAX_AGE, so it defaults on only for one worker.
+app.config["WEB_CONCURRENCY"] = int(os.environ.get("WEB_CONCURRENCY", 1))
+app.config["CHAT_BUFFER"] = os.environ.get(
+    "CHAT_BUFFER", "true" if app.config["WEB_CONCURRENCY"] == 1 else "false").lower() == "true"
+app.config["CHAT_BUFFER_PER_ROOM"] = int(os.environ.get("CHAT_BUFFER_PER_ROOM", 100))
+app.config["CHAT_BUFFER_MAX_ROOMS"] = int(os.environ.get("CHAT_BUFFER_MAX_ROOMS", 500))
+app.config["CHAT_BUFFER_MAX_MESSAGES"] = int(os.environ.get("CHAT_BUFFER_MAX_MESSAGES", 50000))
+# Seconds before a room is re-read, bounding staleness from messages sent via other processes
+app.config["CHAT_BUFFER_MAX_AGE"] = int(os.environ.get("CHAT_BUFFER_MAX_AGE", 60))
+# Broadcast chat messages before they are stored and write them in micro-batches (flushed at exit)
+app.config["CHAT_WRITE_BEHIND"] = os.environ.get("CHAT_WRITE_BEHIND", "false").lower() == "true"
+app.config["CHAT_WRITE_BEHIND_INTERVAL_MS"] = int(os.environ.get("CHAT_WRITE_BEHIND_INTERVAL_MS", 5))
+# Expo push API base URL (override to point at a stand-in server)
+app.config["EXPO_PUSH_URL"] = os.environ.get("EXPO_PUSH_URL", EXPO_PUSH_URL)
+
+mail = Mail(app)
+
+# MongoDB Configuration
+mongo_uri = os.environ.get("MONGO_URI", "mongodb://localhost:27017/projectMngmt")
+logger.info(f"MongoDB URI: {mongo_uri}")
+
+# Fix the connection string - ensure proper database name
+if mongo_uri and "mongodb+srv://" in mongo_uri:
+    # Remove any existing parameters and ensure clean database name
+    base_uri = mongo_uri.split("?")[0]
+    # Remove any existing database name to avoid duplication
+    if "/projectMngmt" in base_uri:
+        base_uri = base_uri.replace("/projectMngmt", "")
+    mongo_uri = f"{base_uri}/projectMngmt?retryWrites=true&w=majority"
+
+app.config["MONGO_URI"] = mongo_uri
+
+# Initialize MongoDB connection with multiple fallback methods
+def initialize_mongodb():
+    """Initialize MongoDB connection with multiple fallback methods"""
+    import ssl
+    import certifi
+    from pymongo import MongoClient
+    
+    connection_methods = []
+    
+    # Method 1: Direct MongoClient with SSL disabled for certificate verification
+    try:
+        logger.info("Attempting Method 1: MongoClient with SSL CERT_NONE")
+        client = MongoClient(
+            mongo_uri,
+            tls=True,
+            tlsAllowInvalidCertificates=True,
+            serverSelectionTimeoutMS=30000,
+            connectTimeoutMS=30000
+        )
+        client.admin.command('ping')
+        logger.info("Method 1 SUCCESS: MongoClient with SSL CERT_NONE")
+        
+        # Create a custom PyMongo-like wrapper
+        class MongoWrapper:
+            def __init__(self, client, db_name):
+                self.cx = client
+                self.db = client[db_name]
+        
+        mongo_instance = MongoWrapper(client, 'projectMngmt')
+        mongo_instance.db.command('ping')
+        connection_methods.append("MongoClient with SSL CERT_NONE - SUCCESS")
+        return mongo_instance, connection_methods
+    except Exception as e1:
+        logger.error(f"Method 1 FAILED: {e1}")
+        connection_methods.append(f"MongoClient with SSL CERT_NONE - FAILED: {str(e1)}")
+    
+    # Method 2: MongoClient with certifi
+    try:
+        logger.info("Attempting Method 2: MongoClient with certifi SSL")
+        client = MongoClient(
+            mongo_uri,
+            tlsCAFile=certifi.where(),
+            serverSelectionTimeoutMS=30000,
+            connectTimeoutMS=30000
+        )
+        client.admin.command('ping')
+        
+        class MongoWrapper:
+            def __init__(self, client, db_name):
+                self.cx = client
+                self.db = client[db_name]
+        
+        mongo_instance = MongoWrapper(client, 'projectMngmt')
+        mongo_instance.db.command('ping')
+        logger.info("Method 2 SUCCESS: MongoClient with certifi SSL")
+        connection_methods.append("MongoClient with certifi SSL - SUCCESS")
+        return mongo_instance, connection_methods
+    except Exception as e2:
+        logger.error(f"Method 2 FAILED: {e2}")
+        connection_methods.append(f"MongoClient with certifi SSL - FAILED: {str(e2)}")
+    
+    # Method 3: Standard PyMongo with Flask-PyMongo
+    try:
+        logger.info("Attempting Method 3: Standard PyMongo")
+        app.config["MONGO_URI"] = mongo_uri + ("&" if "?" in mongo_uri else "?") + "tls=true&tlsAllowInvalidCertificates=true"
+        mongo_instance = PyMongo(app)
+        mongo_instance.db.command('ping')
+        logger.info("Method 3 SUCCESS: Standard PyMongo")
+        connection_methods.append("Standard PyMongo - SUCCESS")
+        return mongo_instance, connection_methods
+    except Exception as e3:
+        logger.error(f"Method 3 FAILED: {e3}")
+        connection_methods.append(f"Standard PyMongo - FAILED: {str(e3)}")
+    
+    logger.error("All MongoDB connection methods failed")
+    return None, connection_methods
+
+# Initialize MongoDB
+mongo, connection_methods = initialize_mongodb()
+
+if mongo is None:
+    logger.error(f"Connection attempts: {connection_methods}")
+else:
+    logger.info("MongoDB connection established successfully")
+
+# Initialize notifications collection
+notifications_collection = mongo.db.notifications
+# Every stored notification is published to the recipient's Socket.IO room
+notification_repository = NotificationRepository(
+    notifications_collection,
+    archive=mongo.db.notifications_archive,
+    on_publish=lambda notification: publish_notification(notification),
+    coalesce_window=app.config["NOTIFICATION_COALESCE_WINDOW"]
+)
+try:
+    notification_repository.ensure_indexes(read_ttl_days=app.config["NOTIFICATION_READ_TTL_DAYS"])
+except Exception as e:
+    logger.warning(f"Could not create notification indexes: {e}")
+
+# Initialize chat messages collection; messages carry expires_at and are removed by a TTL index
+chat_messages_collection = mongo.db.chat_messages
+chat_retention = ChatRetention(app.config["CHAT_RETENTION_HOURS"])
+try:
+    chat_retention.ensure_indexes(chat_messages_collection, mongo.db.global_messages)
+except Exception as e:
+    logger.warning(f"Could not create chat TTL indexes: {e}")
+
+
+# Initialize durable job queue (handlers are registered once they are defined below)
+job_queue = JobQueue(
+    mongo.db.jobs,
+    mongo.db.dead_jobs,
+    max_attempts=app.config["JOB_MAX_ATTEMPTS"],
+    visibility_timeout=app.config["JOB_VISIBILITY_TIMEOUT"]
+)
+email_outbox = EmailOutbox(mongo.db.email_outbox, mail, digest_window=app.config["EMAIL_DIGEST_WINDOW"])
+push_dispatcher = PushDispatcher(
+    mongo.db.push_outbox,
+    mongo.db.push_tokens,
+    mongo.db.push_receipts,
+    push_url=app.config["EXPO_PUSH_URL"]
+)
+try:
+    job_queue.ensure_indexes()
+    email_outbox.ensure_indexes()
+    push_dispatcher.ensure_indexes()
+except Exception as e:
+    logger.warning(f"Could not create job queue indexes: {e}")
+
+# Initialize scheduler; every process runs it, but jobs only run in the lease holder
+scheduler = BackgroundScheduler()
+scheduler_lease = SchedulerLease(
+    mongo.db.scheduler_leases,
+    ttl=app.config["SCHEDULER_LEASE_TTL"],
+    renew_interval=max(app.config["SCHEDULER_LEASE_TTL"] // 3, 1)
+)
+# Every scheduled run (and misfire) is recorded in the capped job_runs collection
+job_run_log = JobRunLog(mongo.db)
+try:
+    job_run_log.ensure_collection()
+except Exception as e:
+    logger.warning(f"Could not create job_runs collection: {e}")
+
+def schedule_job(func, trigger, **trigger_args):
+    """Add a scheduled job that only runs in the lease holder and records its run history"""
+    scheduler.add_job(scheduler_lease.leader_only(job_run_log.track(func)), trigger,
+                      id=func.__name__, name=func.__name__, **trigger_args)
+
+def record_missed_run(event):
+    # Every process's scheduler misses runs while it is busy; only the leader's count
+    if scheduler_lease.is_leader():
+        job_run_log.record_missed_event(event)
+
+scheduler.add_listener(record_missed_run, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+
+REMINDER_BATCH_SIZE = 1000
+try:
+    ensure_reminder_index(mongo.db.tasks)
+except Exception as e:
+    logger.warning(f"Could not create reminder index: {e}")
+
+def project_url(project_id):
+    """External link to a project page; usable without a request or the web routes"""
+    return f"{app.config['APP_BASE_URL']}/project/{project_id}"
+
+def send_due_date_reminders(tasks):
+    """Store reminders for a batch of joined tasks in one write and queue their email and push delivery"""
+    project_links = {}
+    notifications = []
+    for task in tasks:
+        project_id = str(task["project"]["_id"])
+        if project_id not in project_links:
+            project_links[project_id] = project_url(project_id)
+        notifications.append({
+            "user_id": task["assignee_id"],
+            "type": "due_date_approaching",
+            "message": f"Reminder: The task '{task['title']}' is due {describe_offset(task['offset'])} "
+                       f"in project '{task['project']['title']}'.",
+            "link": project_links[project_id] + f'#task-{task["_id"]}',
+        })
+    notification_repository.create_many(notifications)
+    email_outbox.add_many(notifications)
+    push_dispatcher.enqueue_many([{
+        "user_ids": [n["user_id"]],
+        "title": PUSH_TITLES['due_date_approaching'],
+        "body": n["message"][:200],
+        "data": {"type": n["type"], "link": n["link"], "user_id": n["user_id"]},
+        "channel_id": "tasks",
+    } for n in notifications])
+    return len(notifications)
+
+def check_due_dates():
+    """Send every reminder whose lead time has been reached, in batches"""
+    with app.app_context():
+        logger.info("Running due date check...")
+        started = time.monotonic()
+        offsets = app.config["REMINDER_OFFSETS"]
+        sent = 0
+        while True:
+            claimed, reminders = claim_due_reminders(mongo.db.tasks, offsets, limit=REMINDER_BATCH_SIZE)
+            if reminders:
+                sent += send_due_date_reminders(reminders)
+                logger.info(f"Due date check progress: {sent} reminder(s) queued")
+            # The tasks just claimed have moved on; a short batch means nothing else is due
+            if claimed < REMINDER_BATCH_SIZE:
+                break
+
+        if sent:
+            # Delivery runs on the job queue workers, email and push in parallel
+            job_queue.enqueue('email_flush', {}, delay=email_outbox.digest_window, unique=True)
+            schedule_push_flush()
+        logger.info(f"Due date check queued {sent} reminder(s) in {time.monotonic() - started:.2f}s")
+        return {"reminders": sent}
+
+# Ticks often so each lead time is hit within a few minutes; only due tasks are read
+schedule_job(check_due_dates, 'interval', minutes=app.config["REMINDER_TICK_MINUTES"])
+
+def clean_old_chat_messages():
+    """Purge messages written before expires_at existed; TTL indexes expire everything newer"""
+    with app.app_context():
+        logger.info("Running old chat messages cleanup...")
+        deleted = chat_retention.purge_legacy(chat_messages_collection)
+        deleted["global_messages"] = chat_retention.purge_global_legacy(mongo.db.global_messages)
+        logger.info(f"Deleted old chat messages: {deleted}")
+        return deleted
+
+# Add the chat cleanup job to the scheduler
+schedule_job(clean_old_chat_messages, 'interval', hours=24)
+
+def keep_alive_ping():
+    """Self-ping to keep Render free tier from sleeping (every 10 minutes)"""
+    import requests
+    try:
+        # Get the app's URL from environment or use default
+        response = requests.get(f"{app.config['APP_BASE_URL']}/health", timeout=30)
+        logger.info(f"Keep-alive ping: {response.status_code}")
+        return {"status_code": response.status_code}
+    except Exception as e:
+        logger.warning(f"Keep-alive ping failed: {e}")
+        return {"status_code": None}
+
+# Add keep-alive ping job (every 10 minutes to prevent Render free tier sleep)
+schedule_job(keep_alive_ping, 'interval', minutes=10)
+
+
+def create_notification(user_id, message, notification_type, link=None, coalesce_key=None, summary=None):
+    """Store a notification and emit it; email and push delivery run on the job queue.
+    
+    Notifications sharing a coalesce_key within the coalesce window merge into
+    one (see NotificationRepository.create) and are only delivered once.
+    """
+    try:
+        # notification_type e.g. 'task_assigned', 'due_date_approaching', 'user_mentioned'
+        notification = notification_repository.create(
+            user_id, notification_type, message, link, coalesce_key=coalesce_key, summary=summary)
+        if notification.get("count", 1) > 1:
+            logger.info(f"Notification coalesced for user {user_id}: {notification['message']}")
+            return
+        logger.info(f"Notification created for user {user_id}: {message}")
+
+        payload = {'user_id': str(user_id), 'message': message, 'type': notification_type, 'link': link}
+        if notification_type in NOTIFICATION_EMAIL_SUBJECTS:
+            queue_notification_email(payload)
+        send_push_notification(user_id, message, notification_type, link)
+
+    except Exception as e:
+        logger.error(f"Error creating notification for user {user_id}: {e}")
+
+# Email subject and link label per notification type
+NOTIFICATION_EMAIL_SUBJECTS = {
+    'task_assigned': (lambda message: f"Task Assigned: {message.split(': ')[1].split(' in project')[0]}", "View task"),
+    'user_mentioned': (lambda message: f"You were mentioned in a comment: {message.split(': ')[1]}", "View comment"),
+    'due_date_approaching': (lambda message: f"Task Due Soon: {message.split(': ')[1].split(' is due ')[0]}", "View task"),
+}
+
+def notification_email_subject(notification_type, message):
+    make_subject, _ = NOTIFICATION_EMAIL_SUBJECTS[notification_type]
+    try:
+        return make_subject(message)
+    except IndexError:
+        return message[:80]
+
+def build_notification_emails(recipient_email, entries, digest):
+    """Flask-Mail messages for one user's outbox entries: one digest, or one per entry"""
+    if not digest or len(entries) == 1:
+        return [
+            Message(notification_email_subject(entry['type'], entry['message']), recipients=[recipient_email],
+                    body=entry['message'] + f"\n{NOTIFICATION_EMAIL_SUBJECTS[entry['type']][1]}: {entry['link']}")
+            for entry in entries
+        ]
+    lines = [f"- {entry['message']}\n  {NOTIFICATION_EMAIL_SUBJECTS[entry['type']][1]}: {entry['link']}" for entry in entries]
+    return [Message(f"You have {len(entries)} new notifications", recipients=[recipient_email],
+                    body="Here is what happened since your last update:\n\n" + "\n\n".join(lines))]
+
+def load_notification_emails(user_ids):
+    users = mongo.db.users.find({"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}}, {"email": 1})
+    return {str(user["_id"]): user.get("email") for user in users}
+
+def queue_notification_email(payload):
+    """Put a notification email in the outbox and make sure a flush is scheduled"""
+    delay = email_outbox.add(payload['user_id'], payload['type'], payload['message'], payload['link'])
+    job_queue.enqueue('email_flush', {}, delay=delay, unique=True)
+
+def flush_email_outbox(payload):
+    """Job handler: send every due outbox email over pooled SMTP connections"""
+    with app.app_context():
+        sent = email_outbox.flush(load_notification_emails, build_notification_emails)
+    if sent:
+        logger.info(f"Sent {sent} notification email(s)")
+    next_due = email_outbox.next_due_in()
+    if next_due is not None:
+        job_queue.enqueue('email_flush', {}, delay=next_due, unique=True)
+
+def deliver_notification_push(payload):
+    """Job handler for push jobs queued before the push dispatcher existed"""
+    send_push_notification(payload['user_id'], payload['message'], payload['type'], payload['link'])
+
+
+# Push Notification Helper Functions
+PUSH_TITLES = {
+    'task_assigned': '📋 New Task Assigned',
+    'due_date_approaching': '⏰ Task Due Soon',
+    'project_invitation': '👥 Project Invitation',
+    'mentor_request': '🎓 Mentor Request',
+    'mentor_accepted': '✅ Mentor Request Accepted',
+    'team_message': '💬 Team Chat',
+}
+
+def schedule_push_flush():
+    job_queue.enqueue('push_flush', {}, unique=True)
+
+def send_push_notification(user_id, message, notification_type, link=None):
+    """Queue a push notification to the user's device(s); delivery is batched by the push dispatcher"""
+    push_dispatcher.enqueue(
+        [user_id],
+        PUSH_TITLES.get(notification_type, '🔔 Notification'),
+        message[:200],  # Limit body length
+        data={
+            'type': notification_type,
+            'link': link,
+            'user_id': str(user_id)
+        },
+        channel_id='tasks' if 'task' in notification_type else 'default'
+    )
+    schedule_push_flush()
+
+
+def send_team_chat_push(project_id, sender_id, sender_name, message_text):
+    """Queue a push notification to all team members except the sender for a team chat message"""
+    # Get project and team members
+    project = mongo.db.projects.find_one({"_id": ObjectId(project_id)}, {"title": 1, "created_by": 1, "team_members": 1})
+    if not project:
+        return
+    
+    # Collect all team member IDs (creator + team members)
+    team_member_ids = set()
+    if project.get('created_by'):
+        team_member_ids.add(str(project['created_by']))
+    for member in project.get('team_members', []):
+        if isinstance(member, dict):
+            team_member_ids.add(str(member.get('user_id', '')))
+        else:
+            team_member_ids.add(str(member))
+    
+    # Remove sender
+    team_member_ids.discard(str(sender_id))
+    
+    if not team_member_ids:
+        return
+    
+    push_dispatcher.enqueue(
+        team_member_ids,
+        f"💬 {project.get('title', 'Team Chat')}",
+        f"{sender_name}: {message_text[:100]}",
+        data={
+            'type': 'team_message',
+            'project_id': str(project_id),
+        },
+        channel_id='team-chat'
+    )
+    schedule_push_flush()
+
+def flush_push_outbox(payload):
+    """Job handler: send every queued push notification in Expo-sized chunks"""
+    push_dispatcher.flush()
+
+def check_push_receipts(payload):
+    """Job handler: process Expo receipts and prune unregistered tokens"""
+    push_dispatcher.check_receipts()
+
+def deliver_team_chat_push(payload):
+    """Job handler: push a team chat message to the rest of the team"""
+    send_team_chat_push(payload['project_id'], payload['sender_id'], payload['sender_name'], payload['message'])
+
+# Jobs queued before the outbox existed are moved into it
+job_queue.register('notification_email', queue_notification_email)
+job_queue.register('email_flush', flush_email_outbox)
+job_queue.register('notification_push', deliver_notification_push)
+job_queue.register('team_chat_push', deliver_team_chat_push)
+job_queue.register('push_flush', flush_push_outbox)
+job_queue.register('push_receipts', check_push_receipts)
+
+def enqueue_push_receipts_check():
+    job_queue.enqueue('push_receipts', {}, unique=True)
+
+schedule_job(enqueue_push_receipts_check, 'interval', minutes=15)
+
+def apply_notification_retention(payload):
+    """Job handler: archive stale unread notifications and trim users over the cap"""
+    result = notification_repository.apply_retention(
+        unread_archive_days=app.config["NOTIFICATION_ARCHIVE_DAYS"],
+        user_cap=app.config["NOTIFICATION_USER_CAP"]
+    )
+    logger.info(f"Notification retention: {result}")
+
+job_queue.register('notification_retention', apply_notification_retention)
+
+def enqueue_notification_retention():
+    job_queue.enqueue('notification_retention', {}, unique=True)
+
+schedule_job(enqueue_notification_retention, 'interval', hours=24)
+
+def serialize_notification(notification):
+    """Convert a notification document to its JSON representation"""
+    return {
+        "_id": str(notification["_id"]),
+        "user_id": notification.get("user_id"),
+        "type": notification.get("type", ""),
+        "message": notification.get("message", ""),
+        "read": notification.get("read", False),
+        "created_at": notification.get("created_at").isoformat() if notification.get("created_at") else "",
+        "project_id": notification.get("project_id", ""),
+        "task_id": notification.get("task_id", ""),
+        "link": notification.get("link")
+    }
+
+
+def publish_notification(notification):
+    """Emit a newly stored notification to the recipient's room"""
+    socketio.emit('new_notification', serialize_notification(notification), room=notification['user_id'])
+
+def emit_unread_count(user_id):
+    """Push the user's current unread count to their Socket.IO room and return it"""
+    count = notification_repository.unread_count(user_id)
+    socketio.emit('unread_count', {'count': count}, room=str(user_id))
+    return count
+
+
+def start_background_jobs(workers=None):
+    """Start the scheduler (jobs run only in the lease holder) and the job queue workers"""
+    workers = app.config["JOB_QUEUE_WORKERS"] if workers is None else workers
+    scheduler_lease.start()
+    scheduler.start()
+    # Shut down the scheduler when exiting, handing the lease to another process
+    atexit.register(lambda: scheduler.shutdown())
+    atexit.register(scheduler_lease.stop)
+    if workers > 0:
+        job_queue.start(workers)
+        atexit.register(job_queue.stop)
+    logger.info(f"Background jobs started with {workers} queue worker(s)")
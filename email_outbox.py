@@ -0,0 +1,125 @@
+"""
+Outbox for notification emails, sent in batches over pooled SMTP connections.
+
+Notifications that warrant an email are stored in the outbox instead of being
+sent one connection at a time. A flush claims every user whose oldest pending
+email is due, sends them all through a single `mail.connect()` connection
+(Flask-Mail reconnects every MAIL_MAX_EMAILS messages), and deletes what was
+sent. With a digest window, a user's emails wait up to that long and are
+combined into one message.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutbox:
+    """Pending notification emails stored in `collection`.
+
+    `digest_window` is in seconds; 0 sends every email on the next flush.
+    """
+
+    def __init__(self, collection, mail, digest_window=0, batch_size=200, claim_timeout=600):
+        self.collection = collection
+        self.mail = mail
+        self.digest_window = digest_window
+        self.batch_size = batch_size
+        self.claim_timeout = claim_timeout
+
+    def ensure_indexes(self):
+        self.collection.create_index([('send_after', ASCENDING)])
+        self.collection.create_index([('user_id', ASCENDING), ('created_at', ASCENDING)])
+
+    def add(self, user_id, notification_type, message, link=None):
+        """Queue an email and return the number of seconds until it is due"""
+        now = datetime.utcnow()
+        self.collection.insert_one({
+            'user_id': str(user_id),
+            'type': notification_type,
+            'message': message,
+            'link': link,
+            'created_at': now,
+            'send_after': now + timedelta(seconds=self.digest_window),
+            'claim': None,
+        })
+        return self.digest_window
+
+    def add_many(self, emails):
+        """Queue many emails ({user_id, type, message, link}) in one write; return seconds until due"""
+        if emails:
+            now = datetime.utcnow()
+            self.collection.insert_many([{
+                'user_id': str(email['user_id']),
+                'type': email['type'],
+                'message': email['message'],
+                'link': email.get('link'),
+                'created_at': now,
+                'send_after': now + timedelta(seconds=self.digest_window),
+                'claim': None,
+            } for email in emails], ordered=False)
+        return self.digest_window
+
+    def next_due_in(self):
+        """Seconds until the earliest pending email is due, or None if the outbox is empty"""
+        pending = self.collection.find_one({'claim': None}, {'send_after': 1}, sort=[('send_after', ASCENDING)])
+        if pending is None:
+            return None
+        return max((pending['send_after'] - datetime.utcnow()).total_seconds(), 0)
+
+    def _claim_due(self):
+        """Claim every pending email of users whose oldest email is due; return (claim, entries)"""
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.claim_timeout)
+        # Claims left behind by a crashed flush become pending again
+        self.collection.update_many({'claimed_at': {'$lt': stale}}, {'$set': {'claim': None}})
+
+        user_ids = self.collection.distinct('user_id', {'claim': None, 'send_after': {'$lte': now}})
+        if not user_ids:
+            return None, []
+        user_ids = user_ids[:self.batch_size]
+        claim = uuid.uuid4().hex
+        # Later emails for the same user ride along with the due one
+        self.collection.update_many(
+            {'user_id': {'$in': user_ids}, 'claim': None},
+            {'$set': {'claim': claim, 'claimed_at': now}}
+        )
+        entries = list(self.collection.find({'claim': claim}).sort('created_at', ASCENDING))
+        return claim, entries
+
+    def flush(self, load_emails, build_messages):
+        """Send all due emails over one SMTP connection; return the number of messages sent.
+
+        `load_emails(user_ids)` returns {user_id: address}; `build_messages(address,
+        entries, digest)` returns the Flask-Mail messages for one user's entries.
+        Raises if the connection fails so the caller can retry; anything already
+        sent has been removed from the outbox by then.
+        """
+        sent = 0
+        while True:
+            claim, entries = self._claim_due()
+            if not entries:
+                return sent
+
+            by_user = {}
+            for entry in entries:
+                by_user.setdefault(entry['user_id'], []).append(entry)
+            try:
+                addresses = load_emails(list(by_user))
+                with self.mail.connect() as connection:
+                    for user_id, user_entries in by_user.items():
+                        ids = [entry['_id'] for entry in user_entries]
+                        address = addresses.get(user_id)
+                        if address:
+                            for msg in build_messages(address, user_entries, self.digest_window > 0):
+                                connection.send(msg)
+                                sent += 1
+                        self.collection.delete_many({'_id': {'$in': ids}})
+            except Exception:
+                # Release what was not sent so the retry picks it up
+                self.collection.update_many({'claim': claim}, {'$set': {'claim': None}})
+                raise
+            logger.info(f"Email outbox flushed {len(entries)} notification(s) for {len(by_user)} user(s)")
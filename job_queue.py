@@ -0,0 +1,230 @@
+"""
+Durable MongoDB-backed job queue.
+
+Request handlers enqueue jobs; worker threads claim them one at a time with
+an atomic find_one_and_update and a visibility timeout, so a job whose worker
+dies is picked up again once its lock expires. Failed jobs are retried with
+exponential backoff and moved to a dead-letter collection after
+`max_attempts`.
+"""
+import logging
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+
+
+def backoff_delay(attempts, base_delay, max_delay):
+    """Seconds to wait before retrying a job that has failed `attempts` times"""
+    return min(base_delay * (2 ** (attempts - 1)), max_delay)
+
+
+class JobQueue:
+    """Queue of jobs stored in `collection`; handlers are registered by job name.
+
+    Handlers receive the job payload and signal failure by raising.
+    """
+
+    def __init__(self, collection, dead_letter_collection, max_attempts=5, visibility_timeout=300,
+                 base_delay=5, max_delay=3600, poll_interval=1.0):
+        self.collection = collection
+        self.dead_letter_collection = dead_letter_collection
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.handlers = {}
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        # Recent (wait_seconds, run_seconds) samples for latency stats
+        self._latencies = deque(maxlen=1000)
+        self._counts = {'completed': 0, 'retried': 0, 'dead': 0}
+        self._lock = threading.Lock()
+
+    def ensure_indexes(self):
+        self.collection.create_index([('status', ASCENDING), ('run_at', ASCENDING)])
+        self.collection.create_index([('status', ASCENDING), ('locked_until', ASCENDING)])
+        self.collection.create_index([('name', ASCENDING), ('status', ASCENDING)])
+        self.dead_letter_collection.create_index([('failed_at', ASCENDING)])
+
+    def register(self, name, handler):
+        self.handlers[name] = handler
+
+    def enqueue(self, name, payload, delay=0, unique=False):
+        """Persist a job and return its id; it runs once `delay` seconds have passed.
+
+        With `unique`, nothing is added while a job of the same name is still
+        pending, so bursts of enqueues collapse into one run.
+        """
+        now = datetime.utcnow()
+        job = {
+            'name': name,
+            'payload': payload,
+            'status': PENDING,
+            'attempts': 0,
+            'created_at': now,
+            'run_at': now + timedelta(seconds=delay),
+        }
+        if unique:
+            result = self.collection.find_one_and_update(
+                {'name': name, 'status': PENDING},
+                {'$setOnInsert': job},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            job_id = result['_id']
+        else:
+            job_id = self.collection.insert_one(job).inserted_id
+        self._wake.set()
+        return job_id
+
+    def claim(self, worker_id):
+        """Atomically lock the next due job (or one whose lock expired) and return it"""
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {'$or': [
+                {'status': PENDING, 'run_at': {'$lte': now}},
+                {'status': RUNNING, 'locked_until': {'$lte': now}},
+            ]},
+            {
+                '$set': {
+                    'status': RUNNING,
+                    'locked_by': worker_id,
+                    'lock_id': uuid.uuid4().hex,
+                    'locked_until': now + timedelta(seconds=self.visibility_timeout),
+                    'started_at': now,
+                },
+                '$inc': {'attempts': 1},
+            },
+            sort=[('run_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def run_once(self, worker_id='inline'):
+        """Claim and run a single job; return False if none was due"""
+        job = self.claim(worker_id)
+        if job is None:
+            return False
+
+        handler = self.handlers.get(job['name'])
+        if job['attempts'] > self.max_attempts:
+            # Its worker kept dying mid-run (lock expired every time)
+            self._dead_letter(job, 'Visibility timeout exceeded on every attempt')
+            return True
+        if handler is None:
+            self._dead_letter(job, f"No handler registered for job '{job['name']}'")
+            return True
+
+        started = time.monotonic()
+        try:
+            handler(job['payload'])
+        except Exception as e:
+            self._fail(job, e)
+            return True
+
+        # Only the worker still holding the lock may remove the job
+        self.collection.delete_one({'_id': job['_id'], 'lock_id': job['lock_id']})
+        with self._lock:
+            self._counts['completed'] += 1
+            self._latencies.append(((job['started_at'] - job['run_at']).total_seconds(),
+                                    time.monotonic() - started))
+        return True
+
+    def _fail(self, job, error):
+        if job['attempts'] >= self.max_attempts:
+            self._dead_letter(job, str(error))
+            return
+        delay = backoff_delay(job['attempts'], self.base_delay, self.max_delay)
+        self.collection.update_one(
+            {'_id': job['_id'], 'lock_id': job['lock_id']},
+            {
+                '$set': {
+                    'status': PENDING,
+                    'run_at': datetime.utcnow() + timedelta(seconds=delay),
+                    'last_error': str(error),
+                },
+                '$unset': {'locked_by': '', 'lock_id': '', 'locked_until': ''},
+            }
+        )
+        with self._lock:
+            self._counts['retried'] += 1
+        logger.warning(f"Job {job['name']} ({job['_id']}) failed on attempt {job['attempts']}, "
+                       f"retrying in {delay}s: {error}")
+
+    def _dead_letter(self, job, error):
+        job = dict(job, status='dead', last_error=error, failed_at=datetime.utcnow())
+        self.dead_letter_collection.insert_one(job)
+        self.collection.delete_one({'_id': job['_id'], 'lock_id': job['lock_id']})
+        with self._lock:
+            self._counts['dead'] += 1
+        logger.error(f"Job {job['name']} ({job['_id']}) moved to dead letter after "
+                     f"{job['attempts']} attempts: {error}")
+
+    def start(self, workers=2):
+        """Start worker threads that poll for jobs until stop() is called"""
+        prefix = f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, args=(f"{prefix}-{i}",), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Job queue started with {workers} worker(s)")
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _work(self, worker_id):
+        while not self._stop.is_set():
+            try:
+                if self.run_once(worker_id):
+                    continue
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} error: {e}")
+            # Nothing due: sleep until the next poll or a local enqueue
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def stats(self):
+        """Queue depth by status, dead-letter count and recent job latency"""
+        depth = {PENDING: 0, RUNNING: 0}
+        for row in self.collection.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]):
+            depth[row['_id']] = row['count']
+
+        oldest = self.collection.find_one({'status': PENDING}, {'run_at': 1}, sort=[('run_at', ASCENDING)])
+        oldest_age = 0
+        if oldest:
+            oldest_age = max((datetime.utcnow() - oldest['run_at']).total_seconds(), 0)
+
+        with self._lock:
+            waits = sorted(sample[0] for sample in self._latencies)
+            runs = sorted(sample[1] for sample in self._latencies)
+            counts = dict(self._counts)
+
+        def percentile(values, fraction):
+            if not values:
+                return None
+            return round(values[min(int(len(values) * fraction), len(values) - 1)], 3)
+
+        return {
+            'depth': depth,
+            'dead_letter': self.dead_letter_collection.count_documents({}),
+            'oldest_pending_seconds': round(oldest_age, 3),
+            'wait_seconds': {'p50': percentile(waits, 0.5), 'p95': percentile(waits, 0.95)},
+            'run_seconds': {'p50': percentile(runs, 0.5), 'p95': percentile(runs, 0.95)},
+            'workers': len(self._threads),
+            'processed': counts,
+        }
@@ -0,0 +1,102 @@
+"""
+Run history for scheduled jobs.
+
+`JobRunLog.track` wraps a scheduled job so every run records its start, end,
+duration, status, the counts the job returns and any error in a capped
+collection. Misfires (runs APScheduler skipped because they were too late or
+an earlier run was still going) are recorded there too.
+"""
+import functools
+import logging
+import time
+import traceback
+from datetime import datetime
+
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES
+from pymongo import DESCENDING
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+MISSED = 'missed'
+JOB_RUNS_SIZE = 16 * 1024 * 1024
+JOB_RUNS_MAX_DOCUMENTS = 20000
+
+
+class JobRunLog:
+    """Capped `name` collection in `database` holding one document per job run"""
+
+    def __init__(self, database, name='job_runs', size=JOB_RUNS_SIZE, max_documents=JOB_RUNS_MAX_DOCUMENTS):
+        self.database = database
+        self.name = name
+        self.size = size
+        self.max_documents = max_documents
+        self.collection = database[name]
+
+    def ensure_collection(self):
+        try:
+            self.database.create_collection(self.name, capped=True, size=self.size, max=self.max_documents)
+        except CollectionInvalid:
+            pass  # Already exists
+        self.collection.create_index([('job', 1), ('started_at', DESCENDING)])
+
+    def track(self, func, name=None):
+        """Wrap a job; it may return a dict (or a number) of processed counts to record"""
+        name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started_at = datetime.utcnow()
+            started = time.monotonic()
+            run = {'job': name, 'started_at': started_at, 'status': SUCCEEDED, 'counts': {}, 'error': None}
+            try:
+                result = func(*args, **kwargs)
+                if isinstance(result, dict):
+                    run['counts'] = result
+                elif isinstance(result, (int, float)) and not isinstance(result, bool):
+                    run['counts'] = {'processed': result}
+                return result
+            except Exception as e:
+                run['status'] = FAILED
+                run['error'] = f"{type(e).__name__}: {e}"
+                run['traceback'] = traceback.format_exc()[-4000:]
+                raise
+            finally:
+                run['finished_at'] = datetime.utcnow()
+                run['duration_seconds'] = round(time.monotonic() - started, 3)
+                self._record(run)
+        return wrapper
+
+    def record_misfire(self, name, scheduled_at, reason):
+        self._record({'job': name, 'status': MISSED, 'scheduled_at': scheduled_at, 'started_at': datetime.utcnow(),
+                      'reason': reason, 'counts': {}, 'error': None})
+
+    def record_missed_event(self, event):
+        """Record an APScheduler EVENT_JOB_MISSED or EVENT_JOB_MAX_INSTANCES event.
+
+        Max-instances events are submission events, which carry every skipped
+        run time in `scheduled_run_times`; misfires carry one `scheduled_run_time`.
+        """
+        if event.code == EVENT_JOB_MAX_INSTANCES:
+            for scheduled_at in event.scheduled_run_times:
+                self.record_misfire(event.job_id, scheduled_at, 'max_instances')
+        else:
+            self.record_misfire(event.job_id, event.scheduled_run_time, 'misfire')
+
+    def recent(self, name=None, status=None, limit=50):
+        """Newest runs first, optionally for one job or status"""
+        query = {}
+        if name:
+            query['job'] = name
+        if status:
+            query['status'] = status
+        return list(self.collection.find(query, {'traceback': 0}).sort('started_at', DESCENDING).limit(limit))
+
+    def _record(self, run):
+        try:
+            self.collection.insert_one(run)
+        except Exception as e:
+            # Losing a history entry must never fail the job itself
+            logger.error(f"Error recording run of job {run['job']}: {e}")
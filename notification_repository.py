@@ -0,0 +1,394 @@
+"""
+Single access point for the notifications collection.
+
+Every notification is stored in one canonical shape:
+
+    {user_id: str, type, message, link, read: bool, created_at: datetime, ...extra}
+
+and every reader goes through the compound (user_id, read, created_at) index.
+Run this module to migrate documents written in the older shape (ObjectId
+user_id and `timestamp` instead of `created_at`) and to compact the backlog
+under the retention policy.
+
+Retention: read notifications carry `read_at` and expire through a TTL index;
+unread ones past the archive age are moved to a compact archive collection;
+each user keeps at most a fixed number of notifications.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# _id breaks created_at ties so keyset pages are served from the index in order
+NOTIFICATION_INDEX = [('user_id', ASCENDING), ('read', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)]
+READ_TTL_INDEX = 'read_at_ttl'
+# Serves archive_unread's {read: False, created_at: {$lt: cutoff}} batches; read notifications are left out
+UNREAD_AGE_INDEX = 'unread_created_at'
+# Fields kept when an unread notification is archived
+ARCHIVE_FIELDS = ('user_id', 'type', 'message', 'link', 'project_id', 'task_id', 'created_at')
+NOTIFICATION_PAGE_SIZE = 50
+NOTIFICATION_MAX_PAGE_SIZE = 200
+# Matches documents still in the legacy shape
+LEGACY_FILTER = {'$or': [
+    {'user_id': {'$type': 'objectId'}},
+    {'created_at': {'$exists': False}},
+    {'read': {'$exists': False}},
+]}
+
+
+class NotificationRepository:
+    """`on_publish(notification)` is called after every insert or coalesced update,
+    e.g. to push it in real time; clients replace items they already have by _id.
+
+    `archive` is the cold collection that retention moves stale unread notifications to.
+    `coalesce_window` (seconds) bounds how far apart coalesced notifications may be.
+    """
+
+    def __init__(self, collection, archive=None, on_publish=None, coalesce_window=300):
+        self.collection = collection
+        self.archive = archive
+        self.on_publish = on_publish
+        self.coalesce_window = coalesce_window
+        # When the per-user cap was last enforced by this process; the first run checks every user
+        self._trimmed_at = None
+
+    def ensure_indexes(self, read_ttl_days=None):
+        self.collection.create_index(NOTIFICATION_INDEX)
+        self.collection.create_index([('project_id', ASCENDING)])
+        self.collection.create_index([('created_at', ASCENDING)], name=UNREAD_AGE_INDEX,
+                                     partialFilterExpression={'read': False})
+        if self.archive is not None:
+            self.archive.create_index([('user_id', ASCENDING), ('created_at', DESCENDING)])
+            self.archive.create_index([('project_id', ASCENDING)])
+        if read_ttl_days:
+            self.ensure_read_ttl(read_ttl_days)
+
+    def ensure_read_ttl(self, days):
+        """Expire read notifications `days` after they were read"""
+        seconds = int(days * 86400)
+        try:
+            self.collection.create_index([('read_at', ASCENDING)], name=READ_TTL_INDEX, expireAfterSeconds=seconds)
+        except OperationFailure:
+            # The TTL index exists with another expiry; change it in place
+            self.collection.database.command(
+                'collMod', self.collection.name,
+                index={'name': READ_TTL_INDEX, 'expireAfterSeconds': seconds}
+            )
+
+    def create(self, user_id, notification_type, message, link=None, coalesce_key=None, summary=None, **fields):
+        """Insert a notification in the canonical shape and return it.
+
+        With a `coalesce_key`, an unread notification of the same type and key
+        created within the coalesce window is updated instead: its `count` goes
+        up and its message becomes `summary` with {count} filled in. The
+        returned notification then has count > 1.
+        """
+        if coalesce_key and self.coalesce_window:
+            notification = self._coalesce(user_id, notification_type, coalesce_key, summary or message, link)
+            if notification is not None:
+                self._publish(notification)
+                return notification
+
+        notification = dict(fields)
+        notification.update({
+            'user_id': str(user_id),
+            'type': notification_type,
+            'message': message,
+            'link': link,
+            'read': False,
+            'created_at': datetime.utcnow(),
+        })
+        if coalesce_key:
+            notification.update({'coalesce_key': coalesce_key, 'count': 1})
+        self.collection.insert_one(notification)
+        self._publish(notification)
+        return notification
+
+    def create_many(self, notifications):
+        """Insert many notifications in one write; each is a dict with user_id, type, message and optional link/extras"""
+        if not notifications:
+            return []
+        now = datetime.utcnow()
+        documents = []
+        for notification in notifications:
+            document = dict(notification)
+            document.update({
+                'user_id': str(notification['user_id']),
+                'link': notification.get('link'),
+                'read': False,
+                'created_at': now,
+            })
+            documents.append(document)
+        self.collection.insert_many(documents, ordered=False)
+        for document in documents:
+            self._publish(document)
+        return documents
+
+    def _coalesce(self, user_id, notification_type, coalesce_key, summary, link):
+        now = datetime.utcnow()
+        prefix, _, suffix = summary.partition('{count}')
+        count = {'$add': [{'$ifNull': ['$count', 1]}, 1]}
+        return self.collection.find_one_and_update(
+            {
+                'user_id': str(user_id),
+                'read': False,
+                'created_at': {'$gte': now - timedelta(seconds=self.coalesce_window)},
+                'type': notification_type,
+                'coalesce_key': coalesce_key,
+            },
+            # Pipeline update so the message is rebuilt from the new count in the same write
+            [
+                {'$set': {'count': count, 'created_at': now, 'link': link}},
+                {'$set': {'message': {'$concat': [prefix, {'$toString': '$count'}, suffix]}}},
+            ],
+            sort=[('created_at', DESCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _publish(self, notification):
+        if self.on_publish:
+            try:
+                self.on_publish(notification)
+            except Exception as e:
+                logger.error(f"Error publishing notification {notification['_id']}: {e}")
+
+    def find_for_user(self, user_id, read=None):
+        """A user's notifications, newest first"""
+        # An explicit $in on `read` lets the planner merge both halves of the
+        # index in created_at order instead of sorting in memory
+        read_filter = {'$in': [False, True]} if read is None else read
+        return self.collection.find({'user_id': str(user_id), 'read': read_filter}).sort('created_at', DESCENDING)
+
+    def find_page(self, user_id, before=None, limit=NOTIFICATION_PAGE_SIZE):
+        """One page of a user's notifications, newest first.
+
+        `before` is a cursor from a previous page. Returns (notifications,
+        next_cursor); next_cursor is None on the last page.
+        """
+        query = {'user_id': str(user_id), 'read': {'$in': [False, True]}}
+        if before:
+            created_at, notification_id = parse_page_cursor(before)
+            query['$or'] = [
+                {'created_at': {'$lt': created_at}},
+                {'created_at': created_at, '_id': {'$lt': notification_id}},
+            ]
+        notifications = list(self.collection.find(query)
+                             .sort([('created_at', DESCENDING), ('_id', DESCENDING)])
+                             .limit(limit + 1))
+        if len(notifications) <= limit:
+            return notifications, None
+        notifications = notifications[:limit]
+        return notifications, page_cursor(notifications[-1])
+
+    def find_newer(self, user_id, last_seen_id, limit=NOTIFICATION_MAX_PAGE_SIZE):
+        """Notifications created after `last_seen_id`, oldest first; returns (notifications, has_more)"""
+        last_seen_id = ObjectId(last_seen_id)
+        last_seen = self.collection.find_one({'_id': last_seen_id, 'user_id': str(user_id)}, {'created_at': 1})
+        # The last seen item may have been deleted since; its id still carries a creation time
+        created_at = last_seen['created_at'] if last_seen else last_seen_id.generation_time.replace(tzinfo=None)
+        notifications = list(self.collection.find({
+            'user_id': str(user_id),
+            'read': {'$in': [False, True]},
+            '$or': [
+                {'created_at': {'$gt': created_at}},
+                {'created_at': created_at, '_id': {'$gt': last_seen_id}},
+            ]
+        }).sort([('created_at', ASCENDING), ('_id', ASCENDING)]).limit(limit + 1))
+        return notifications[:limit], len(notifications) > limit
+
+    def unread_count(self, user_id, cap=None):
+        """Number of unread notifications, counted from the index alone (optionally capped)"""
+        options = {'hint': NOTIFICATION_INDEX}
+        if cap:
+            options['limit'] = cap
+        return self.collection.count_documents({'user_id': str(user_id), 'read': False}, **options)
+
+    def mark_read(self, user_id, notification_id):
+        return self.collection.update_one(
+            {'_id': ObjectId(notification_id), 'user_id': str(user_id), 'read': False},
+            {'$set': {'read': True, 'read_at': datetime.utcnow()}}
+        )
+
+    def mark_many_read(self, user_id, notification_ids=None, before=None):
+        """Mark a list of notifications, or everything created up to `before`, read in one update"""
+        query = {'user_id': str(user_id), 'read': False}
+        if notification_ids is not None:
+            query['_id'] = {'$in': [ObjectId(notification_id) for notification_id in notification_ids]}
+        if before is not None:
+            query['created_at'] = {'$lte': before}
+        return self.collection.update_many(query, {'$set': {'read': True, 'read_at': datetime.utcnow()}})
+
+    def mark_all_read(self, user_id, notification_type=None):
+        query = {'user_id': str(user_id), 'read': False}
+        if notification_type:
+            query['type'] = notification_type
+        return self.collection.update_many(query, {'$set': {'read': True, 'read_at': datetime.utcnow()}})
+
+    def delete_for_user(self, user_id):
+        if self.archive is not None:
+            self.archive.delete_many({'user_id': str(user_id)})
+        return self.collection.delete_many({'user_id': str(user_id)})
+
+    def delete_for_project(self, project_id):
+        if self.archive is not None:
+            self.archive.delete_many({'project_id': str(project_id)})
+        return self.collection.delete_many({'project_id': str(project_id)})
+
+    def apply_retention(self, unread_archive_days=None, user_cap=None):
+        """Archive stale unread notifications and enforce the per-user cap"""
+        archived = 0
+        if unread_archive_days and self.archive is not None:
+            archived = archive_unread(self.collection, self.archive, unread_archive_days)
+        trimmed = 0
+        if user_cap:
+            started = datetime.utcnow()
+            trimmed = trim_per_user(self.collection, user_cap, since=self._trimmed_at)
+            self._trimmed_at = started
+        return {'archived': archived, 'trimmed': trimmed}
+
+
+def archive_unread(collection, archive, older_than_days, batch_size=1000):
+    """Move unread notifications older than the cutoff to `archive`; return how many moved"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = 0
+    while True:
+        batch = list(collection.find({'read': False, 'created_at': {'$lt': cutoff}}).limit(batch_size))
+        if not batch:
+            return moved
+        compact = [dict({field: doc[field] for field in ARCHIVE_FIELDS if doc.get(field) is not None}, _id=doc['_id'])
+                   for doc in batch]
+        try:
+            archive.insert_many(compact, ordered=False)
+        except BulkWriteError as e:
+            # Already archived by an interrupted run; anything else is a real failure
+            if any(error['code'] != 11000 for error in e.details['writeErrors']):
+                raise
+        collection.delete_many({'_id': {'$in': [doc['_id'] for doc in batch]}})
+        moved += len(batch)
+        logger.info(f"Archived {moved} unread notifications")
+
+
+def trim_per_user(collection, cap, batch_size=1000, since=None):
+    """Delete each user's oldest notifications beyond `cap`; return how many were removed.
+
+    With `since`, only users who received a notification after it can have
+    gone over the cap, so they are found on the _id index and counted one by
+    one on the user_id index instead of grouping the whole collection.
+    """
+    removed = 0
+    if since is None:
+        over_cap = [row['_id'] for row in collection.aggregate([
+            {'$group': {'_id': '$user_id', 'count': {'$sum': 1}}},
+            {'$match': {'count': {'$gt': cap}}},
+        ], allowDiskUse=True)]
+    else:
+        recent_users = collection.distinct('user_id', {'_id': {'$gte': ObjectId.from_datetime(since)}})
+        over_cap = [user_id for user_id in recent_users
+                    if collection.count_documents({'user_id': user_id}, limit=cap + 1) > cap]
+    for user_id in over_cap:
+        # The newest `cap` notifications are kept; delete from the oldest up
+        while True:
+            keep_from = collection.find({'user_id': user_id}, {'created_at': 1}) \
+                .sort([('created_at', DESCENDING), ('_id', DESCENDING)]).skip(cap - 1).limit(1)
+            keep_from = next(iter(keep_from), None)
+            if keep_from is None:
+                break
+            ids = [doc['_id'] for doc in collection.find({
+                'user_id': user_id,
+                '$or': [
+                    {'created_at': {'$lt': keep_from['created_at']}},
+                    {'created_at': keep_from['created_at'], '_id': {'$lt': keep_from['_id']}},
+                ]
+            }, {'_id': 1}).limit(batch_size)]
+            if not ids:
+                break
+            removed += collection.delete_many({'_id': {'$in': ids}}).deleted_count
+    if removed:
+        logger.info(f"Trimmed {removed} notifications from users over the cap of {cap}")
+    return removed
+
+
+def backfill_read_at(collection, batch_size=1000):
+    """Give read notifications from before read_at existed one, so the TTL index covers them.
+
+    Uses created_at, so read notifications already past the TTL expire right away.
+    """
+    updated = 0
+    while True:
+        ids = [doc['_id'] for doc in collection.find({'read': True, 'read_at': {'$exists': False}}, {'_id': 1}).limit(batch_size)]
+        if not ids:
+            return updated
+        updated += collection.update_many({'_id': {'$in': ids}}, [{'$set': {'read_at': '$created_at'}}]).modified_count
+        logger.info(f"Backfilled read_at on {updated} notifications")
+
+
+def page_cursor(notification):
+    """Keyset cursor pointing just past a notification"""
+    return f"{notification['created_at'].isoformat()}_{notification['_id']}"
+
+
+def parse_page_cursor(token):
+    """Decode a page_cursor() token into (created_at, _id); raises ValueError if malformed"""
+    try:
+        created_at, notification_id = token.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), ObjectId(notification_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def canonical_fields(notification):
+    """The $set/$unset that brings a legacy notification into the canonical shape"""
+    updates, removals = {}, {}
+    if isinstance(notification.get('user_id'), ObjectId):
+        updates['user_id'] = str(notification['user_id'])
+    if 'created_at' not in notification:
+        updates['created_at'] = notification.get('timestamp') or notification['_id'].generation_time.replace(tzinfo=None)
+    if 'timestamp' in notification:
+        removals['timestamp'] = ''
+    if 'read' not in notification:
+        updates['read'] = False
+    return updates, removals
+
+
+def migrate_notifications(collection, batch_size=500):
+    """Rewrite legacy notifications in batches; safe to interrupt and re-run"""
+    migrated = 0
+    while True:
+        batch = list(collection.find(LEGACY_FILTER).limit(batch_size))
+        if not batch:
+            break
+        requests = []
+        for notification in batch:
+            updates, removals = canonical_fields(notification)
+            update = {}
+            if updates:
+                update['$set'] = updates
+            if removals:
+                update['$unset'] = removals
+            requests.append(UpdateOne({'_id': notification['_id']}, update))
+        migrated += collection.bulk_write(requests, ordered=False).modified_count
+        logger.info(f"Migrated {migrated} notifications")
+    return migrated
+
+
+if __name__ == '__main__':
+    # Usage: MONGO_URI=... python notification_repository.py
+    # Retention comes from NOTIFICATION_READ_TTL_DAYS, NOTIFICATION_ARCHIVE_DAYS and NOTIFICATION_USER_CAP
+    import os
+    from pymongo import MongoClient
+
+    logging.basicConfig(level=logging.INFO)
+    client = MongoClient(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/projectMngmt'))
+    db = client.projectMngmt
+    repository = NotificationRepository(db.notifications, archive=db.notifications_archive)
+    repository.ensure_indexes(read_ttl_days=int(os.environ.get('NOTIFICATION_READ_TTL_DAYS', 30)))
+    migrate_notifications(db.notifications)
+    backfill_read_at(db.notifications)
+    repository.apply_retention(
+        unread_archive_days=int(os.environ.get('NOTIFICATION_ARCHIVE_DAYS', 90)),
+        user_cap=int(os.environ.get('NOTIFICATION_USER_CAP', 500))
+    )
@@ -0,0 +1,40 @@
+"""
+Access control for operational endpoints (job queue stats, scheduled run history).
+
+These expose queue depth, failed job payloads and run errors, so they are not
+open to every signed-in user. A request is allowed when it carries the
+`X-Ops-Token` header matching OPS_TOKEN (for monitoring scripts), or when the
+signed-in user's email is listed in ADMIN_EMAILS. With neither configured the
+endpoints are closed.
+"""
+import hmac
+from functools import wraps
+
+from flask import current_app, jsonify, request
+from flask_login import current_user
+
+OPS_TOKEN_HEADER = 'X-Ops-Token'
+
+
+def parse_admin_emails(value):
+    """Parse "a@x.com, b@y.com" into a lowercase set"""
+    return {email.strip().lower() for email in (value or '').split(',') if email.strip()}
+
+
+def is_ops_request(token, user, ops_token=None, admin_emails=()):
+    """True if `token` matches the configured ops token or `user` is an admin"""
+    if ops_token and token and hmac.compare_digest(token.encode(), ops_token.encode()):
+        return True
+    email = getattr(user, 'email', None) if getattr(user, 'is_authenticated', False) else None
+    return bool(email) and email.lower() in admin_emails
+
+
+def ops_required(view):
+    """Allow a view only for ops-token requests and admins; everyone else gets 403"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not is_ops_request(request.headers.get(OPS_TOKEN_HEADER), current_user,
+                              current_app.config.get('OPS_TOKEN'), current_app.config.get('ADMIN_EMAILS', ())):
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapped
@@ -0,0 +1,259 @@
+"""
+Batched Expo push delivery.
+
+Push notifications are queued in an outbox collection and flushed together:
+one token lookup for every recipient in the batch, then messages are sent in
+chunks of at most 100 (Expo's per-request limit) over a keep-alive session.
+Tickets are checked for errors, receipts are polled later, and tokens Expo
+reports as DeviceNotRegistered are deleted so they stop being retried. Each
+entry remembers the tokens already sent to, so a flush that fails midway
+never sends the same push twice. Entries Expo rejects outright (a 4xx other
+than 429) are dead-lettered in place, so one bad entry cannot block the
+outbox head on every flush.
+"""
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import requests
+from pymongo import ASCENDING, UpdateOne
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+EXPO_PUSH_URL = 'https://exp.host/--/api/v2/push'
+EXPO_CHUNK_SIZE = 100
+EXPO_RECEIPT_CHUNK_SIZE = 1000
+# Expo recommends waiting before fetching receipts
+RECEIPT_DELAY = timedelta(minutes=15)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# `claim` of entries Expo rejected; they are kept for inspection but never claimed again
+DEAD_LETTER = 'dead-letter'
+
+
+class PushRejected(requests.HTTPError):
+    """Expo refused a request with a status that retrying will not change"""
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class PushDispatcher:
+    """Outbox-backed Expo push sender.
+
+    `outbox`, `tokens` and `receipts` are Mongo collections; `tokens` is the
+    existing push_tokens collection ({user_id, token, ...}).
+    """
+
+    def __init__(self, outbox, tokens, receipts, push_url=EXPO_PUSH_URL, session=None,
+                 chunk_size=EXPO_CHUNK_SIZE, max_retries=3, backoff=0.5, timeout=10, batch_size=500,
+                 claim_timeout=600):
+        self.outbox = outbox
+        self.tokens = tokens
+        self.receipts = receipts
+        self.push_url = push_url.rstrip('/')
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.claim_timeout = claim_timeout
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            session.headers.update({
+                'Accept': 'application/json',
+                'Accept-Encoding': 'gzip, deflate',
+                'Content-Type': 'application/json',
+            })
+        self.session = session
+
+    def ensure_indexes(self):
+        self.outbox.create_index([('claim', ASCENDING), ('created_at', ASCENDING)])
+        self.receipts.create_index([('created_at', ASCENDING)])
+
+    def enqueue(self, user_ids, title, body, data=None, channel_id='default'):
+        """Queue one notification for a set of users"""
+        self.outbox.insert_one({
+            'user_ids': [str(user_id) for user_id in user_ids],
+            'title': title,
+            'body': body,
+            'data': data or {},
+            'channel_id': channel_id,
+            'created_at': datetime.utcnow(),
+            'claim': None,
+        })
+
+    def enqueue_many(self, notifications):
+        """Queue many notifications ({user_ids, title, body, data, channel_id}) in one write"""
+        if notifications:
+            now = datetime.utcnow()
+            self.outbox.insert_many([{
+                'user_ids': [str(user_id) for user_id in notification['user_ids']],
+                'title': notification['title'],
+                'body': notification['body'],
+                'data': notification.get('data') or {},
+                'channel_id': notification.get('channel_id', 'default'),
+                'created_at': now,
+                'claim': None,
+            } for notification in notifications], ordered=False)
+
+    def flush(self):
+        """Send everything in the outbox; return the number of messages sent.
+
+        Raises if Expo stays unavailable after retries; unsent entries are
+        released for the next flush, and the chunks already accepted by Expo
+        are recorded on their entries so they are not sent again. Entries
+        Expo rejects are dead-lettered and the rest of the batch goes out.
+        """
+        # Claims left behind by a crashed flush become pending again
+        stale = datetime.utcnow() - timedelta(seconds=self.claim_timeout)
+        self.outbox.update_many({'claim': {'$nin': [None, DEAD_LETTER]}, 'claimed_at': {'$lt': stale}},
+                                {'$set': {'claim': None}})
+
+        sent = 0
+        while True:
+            claim = uuid.uuid4().hex
+            ids = [entry['_id'] for entry in
+                   self.outbox.find({'claim': None}, {'_id': 1}).sort('created_at', ASCENDING).limit(self.batch_size)]
+            if not ids:
+                if sent:
+                    logger.info(f"Push notifications sent: {sent} message(s)")
+                return sent
+            self.outbox.update_many({'_id': {'$in': ids}, 'claim': None},
+                                    {'$set': {'claim': claim, 'claimed_at': datetime.utcnow()}})
+            entries = list(self.outbox.find({'claim': claim}))
+            dead = set()
+            try:
+                for chunk in chunked(self.build_messages(entries), self.chunk_size):
+                    sent += self._send_chunk([pair for pair in chunk if pair[0] not in dead], dead)
+            except Exception:
+                self.outbox.update_many({'claim': claim}, {'$set': {'claim': None}})
+                raise
+            self.outbox.delete_many({'claim': claim})
+
+    def _send_chunk(self, chunk, dead):
+        """Send one chunk of (entry _id, message) pairs; return the number sent.
+
+        If Expo rejects the chunk, each entry in it is retried on its own and
+        the ones still rejected are dead-lettered and added to `dead`.
+        """
+        if not chunk:
+            return 0
+        try:
+            sent = self.send([message for _, message in chunk])
+        except PushRejected as e:
+            by_entry = {}
+            for entry_id, message in chunk:
+                by_entry.setdefault(entry_id, []).append((entry_id, message))
+            if len(by_entry) > 1:
+                return sum(self._send_chunk(pairs, dead) for pairs in by_entry.values())
+            entry_id = chunk[0][0]
+            logger.error(f"Expo rejected push outbox entry {entry_id}; dead-lettered: {e}")
+            self.outbox.update_one({'_id': entry_id}, {'$set': {
+                'claim': DEAD_LETTER, 'error': str(e), 'failed_at': datetime.utcnow()}})
+            dead.add(entry_id)
+            return 0
+        self._mark_sent(chunk)
+        return sent
+
+    def _mark_sent(self, chunk):
+        """Record on each entry the tokens a chunk just delivered to"""
+        tokens_by_entry = {}
+        for entry_id, message in chunk:
+            tokens_by_entry.setdefault(entry_id, []).append(message['to'])
+        self.outbox.bulk_write([
+            UpdateOne({'_id': entry_id}, {'$addToSet': {'sent_tokens': {'$each': tokens}}})
+            for entry_id, tokens in tokens_by_entry.items()
+        ], ordered=False)
+
+    def build_messages(self, entries):
+        """Expand outbox entries into (entry _id, Expo message) pairs using one token lookup.
+
+        Tokens an entry was already sent to by an interrupted flush are skipped.
+        """
+        user_ids = {user_id for entry in entries for user_id in entry['user_ids']}
+        tokens_by_user = {}
+        for token_doc in self.tokens.find({'user_id': {'$in': list(user_ids)}}, {'user_id': 1, 'token': 1}):
+            token = token_doc.get('token')
+            if token and token.startswith('ExponentPushToken'):
+                tokens_by_user.setdefault(token_doc['user_id'], set()).add(token)
+
+        messages = []
+        for entry in entries:
+            tokens = set()
+            for user_id in entry['user_ids']:
+                tokens |= tokens_by_user.get(user_id, set())
+            for token in sorted(tokens - set(entry.get('sent_tokens') or [])):
+                messages.append((entry['_id'], {
+                    'to': token,
+                    'title': entry['title'],
+                    'body': entry['body'],
+                    'data': entry['data'],
+                    'sound': 'default',
+                    'channelId': entry['channel_id'],
+                }))
+        return messages
+
+    def send(self, messages):
+        """Send messages in chunks, record receipt ids and prune dead tokens"""
+        for chunk in chunked(messages, self.chunk_size):
+            result = self._post('/send', chunk)
+            tickets = result.get('data') or []
+            receipts = []
+            for message, ticket in zip(chunk, tickets):
+                if ticket.get('status') == 'ok' and ticket.get('id'):
+                    receipts.append({'_id': ticket['id'], 'token': message['to'], 'created_at': datetime.utcnow()})
+                elif ticket.get('details', {}).get('error') == 'DeviceNotRegistered':
+                    self.remove_token(message['to'])
+                else:
+                    logger.warning(f"Push ticket error for {message['to']}: {ticket.get('message')}")
+            if receipts:
+                self.receipts.insert_many(receipts)
+        return len(messages)
+
+    def check_receipts(self, now=None):
+        """Fetch receipts for tickets older than RECEIPT_DELAY; return the number processed"""
+        cutoff = (now or datetime.utcnow()) - RECEIPT_DELAY
+        processed = 0
+        while True:
+            pending = list(self.receipts.find({'created_at': {'$lte': cutoff}}).limit(EXPO_RECEIPT_CHUNK_SIZE))
+            if not pending:
+                return processed
+            tokens = {receipt['_id']: receipt['token'] for receipt in pending}
+            result = self._post('/getReceipts', {'ids': list(tokens)})
+            for receipt_id, receipt in (result.get('data') or {}).items():
+                if receipt.get('status') == 'error':
+                    if receipt.get('details', {}).get('error') == 'DeviceNotRegistered':
+                        self.remove_token(tokens.get(receipt_id))
+                    else:
+                        logger.warning(f"Push receipt error for {tokens.get(receipt_id)}: {receipt.get('message')}")
+            # Receipts Expo did not return have expired; drop them too
+            self.receipts.delete_many({'_id': {'$in': list(tokens)}})
+            processed += len(pending)
+
+    def remove_token(self, token):
+        if token:
+            result = self.tokens.delete_many({'token': token})
+            logger.info(f"Removed unregistered push token {token} ({result.deleted_count} record(s))")
+
+    def _post(self, path, payload):
+        """POST to Expo, retrying transient failures with exponential backoff"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(self.push_url + path, json=payload, timeout=self.timeout)
+                if 400 <= response.status_code < 500 and response.status_code not in RETRY_STATUSES:
+                    raise PushRejected(f"Expo returned {response.status_code}: {response.text[:200]}",
+                                       response=response)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+                error = requests.HTTPError(f"Expo returned {response.status_code}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * (2 ** attempt))
+        raise error
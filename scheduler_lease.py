@@ -0,0 +1,125 @@
+"""
+Leader election for scheduled jobs via a lease document in MongoDB.
+
+Every web process starts APScheduler, but scheduled jobs are wrapped with
+`SchedulerLease.leader_only` and only run in the process holding the lease.
+The holder renews the lease every `renew_interval` seconds; if it dies, the
+lease expires after `ttl` seconds and the next process to try takes it over.
+"""
+import functools
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerLease:
+    """Expiring lock named `name` in `collection` ({_id: name, holder, expires_at}).
+
+    `ttl` bounds how long jobs stop after the leader dies; keep it well above
+    `renew_interval` and any clock skew between hosts.
+    """
+
+    def __init__(self, collection, name='scheduler', ttl=60, renew_interval=20, holder=None):
+        self.collection = collection
+        self.name = name
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.expires_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def acquire(self, now=None):
+        """Take or renew the lease; return True if this process is the leader"""
+        now = now or datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        try:
+            lease = self.collection.find_one_and_update(
+                {'_id': self.name, '$or': [{'holder': self.holder}, {'expires_at': {'$lt': now}}]},
+                {'$set': {'holder': self.holder, 'expires_at': expires_at, 'renewed_at': now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another live process holds the lease, so the upsert collided with it
+            lease = None
+        was_leader = self.is_leader(now)
+        self.expires_at = expires_at if lease else None
+        if lease and not was_leader:
+            logger.info(f"Scheduler lease '{self.name}' acquired by {self.holder}")
+        elif was_leader and not lease:
+            logger.warning(f"Scheduler lease '{self.name}' lost by {self.holder}")
+        return lease is not None
+
+    def is_leader(self, now=None):
+        return self.expires_at is not None and (now or datetime.utcnow()) < self.expires_at
+
+    def release(self):
+        """Give up the lease so another process can take over immediately"""
+        if self.expires_at is not None:
+            self.collection.update_one({'_id': self.name, 'holder': self.holder},
+                                       {'$set': {'expires_at': datetime.utcnow()}})
+            self.expires_at = None
+            logger.info(f"Scheduler lease '{self.name}' released by {self.holder}")
+
+    def leader_only(self, func):
+        """Wrap a scheduled job so it only runs in the lease holder"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.is_leader():
+                logger.debug(f"Skipping {func.__name__}: {self.holder} is not the scheduler leader")
+                return None
+            return func(*args, **kwargs)
+        return wrapper
+
+    def start(self):
+        """Try for the lease now and keep renewing it in a daemon thread"""
+        self._stop.clear()
+        self._renew()
+        self._thread = threading.Thread(target=self._run, name=f'lease-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.release()
+
+    def _run(self):
+        while not self._stop.wait(self.renew_interval):
+            self._renew()
+
+    def _renew(self):
+        try:
+            self.acquire()
+        except Exception as e:
+            # Leadership lapses on its own once expires_at passes without a renewal
+            logger.error(f"Error renewing scheduler lease '{self.name}': {e}")
+
+
+if __name__ == '__main__':
+    # Usage: MONGO_URI=... python scheduler_lease.py
+    # Start several copies; exactly one reports leadership, and killing it hands over within the TTL.
+    import time
+    from pymongo import MongoClient
+
+    logging.basicConfig(level=logging.INFO)
+    client = MongoClient(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/projectMngmt'))
+    db = client.projectMngmt
+    lease = SchedulerLease(db.scheduler_leases, name='lease-demo', ttl=10, renew_interval=3)
+    lease.start()
+    tick = lease.leader_only(lambda: logger.info(f"{lease.holder} ran the scheduled job"))
+    try:
+        while True:
+            tick()
+            time.sleep(2)
+    except KeyboardInterrupt:
+        lease.stop()
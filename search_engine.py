@@ -0,0 +1,612 @@
+"""
+Token-index search for projects and tasks.
+
+Every searchable document stores a `search_terms` array holding the lowercase
+words of its text fields plus their English stems. A multikey index on that
+array serves both exact (stemmed) matches and anchored prefix matches, so a
+search never has to scan a collection with an unanchored regex.
+"""
+import base64
+import json
+import logging
+import re
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TERMS_FIELD = 'search_terms'
+
+# Searchable fields and their relevance weight
+PROJECT_SEARCH_FIELDS = {'title': 3, 'course': 2, 'description': 1}
+TASK_SEARCH_FIELDS = {'title': 3, 'description': 1}
+COMMENT_SEARCH_FIELDS = {'text': 1}
+CHAT_SEARCH_FIELDS = {'message': 1}
+
+SNIPPET_LENGTH = 120
+
+# Fields read for discussion hits; everything else (notably search_terms) stays on the server
+MESSAGE_RESULT_FIELDS = {'room_id': 1, 'room_type': 1, 'sender_username': 1, 'message': 1, 'timestamp': 1}
+COMMENT_RESULT_FIELDS = ('_id', 'text', 'created_by', 'created_at', SEARCH_TERMS_FIELD)
+
+# Message search walks one term's entries per room already in _id order, so
+# MongoDB merges the rooms instead of sorting every match in memory. History
+# pages (and prefix-only searches, see message_search_cursor) use room_id/_id.
+MESSAGE_SEARCH_INDEX = [('room_id', ASCENDING), (SEARCH_TERMS_FIELD, ASCENDING), ('_id', ASCENDING)]
+MESSAGE_HISTORY_INDEX = [('room_id', ASCENDING), ('_id', ASCENDING)]
+
+# Result paging: default and maximum page size, and how many of the newest
+# matching tasks are ranked per request
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+CANDIDATE_LIMIT = 500
+
+TASK_STATUSES = ('To-do', 'In Progress', 'Done')
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'was', 'with'
+}
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Ordered longest-first so the most specific suffix wins
+_SUFFIXES = (
+    ('ational', 'ate'), ('ization', 'ize'), ('fulness', 'ful'), ('iveness', 'ive'),
+    ('ousness', 'ous'), ('tional', 'tion'), ('ements', 'e'), ('ement', 'e'),
+    ('ments', ''), ('ment', ''), ('sses', 'ss'), ('ings', ''), ('ing', ''),
+    ('edly', ''), ('ies', 'y'), ('ied', 'y'), ('ers', ''), ('er', ''),
+    ('ed', ''), ('ly', ''), ('s', ''),
+)
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric words"""
+    if not text:
+        return []
+    return _WORD_RE.findall(str(text).lower())
+
+
+def _is_consonant(word, i):
+    if word[i] in 'aeiou':
+        return False
+    # "y" after a consonant is a vowel ("study"), otherwise a consonant ("deploy")
+    return word[i] != 'y' or i == 0 or not _is_consonant(word, i - 1)
+
+
+def _measure(word):
+    """Number of vowel-consonant sequences in a word ("not" 1, "updat" 2)"""
+    pattern = ''.join('c' if _is_consonant(word, i) else 'v' for i in range(len(word)))
+    return len(re.findall(r'v+c+', pattern))
+
+
+def _ends_cvc(word):
+    """A short syllable that lost an "e" before its suffix ("not" from "noted", but not "box")"""
+    n = len(word)
+    return (n >= 3 and _is_consonant(word, n - 3) and not _is_consonant(word, n - 2) and _is_consonant(word, n - 1)
+            and word[-1] not in 'wxy')
+
+
+def _has_vowel(word):
+    return any(not _is_consonant(word, i) for i in range(len(word)))
+
+
+def stem(word):
+    """Reduce an English word to a light stem ("designing" -> "design").
+
+    After "-ed" and "-ing" the silent "e" of a short root is restored and a
+    doubled consonant undone ("noted" -> "note", "planned" -> "plan"). A final
+    "e" is then dropped only from longer roots ("updates" -> "updat"), so every
+    inflection of a word shares one stem while "note" stays apart from "not".
+    """
+    if len(word) <= 3 or word.isdigit() or word.endswith(('ss', 'us', 'is')):
+        return word
+    base = word
+    for suffix, replacement in _SUFFIXES:
+        if not word.endswith(suffix):
+            continue
+        root = word[:-len(suffix)]
+        if suffix in ('ed', 'edly', 'ing', 'ings'):
+            if suffix == 'ed' and root.endswith('e'):
+                # "agreed" -> "agree", but "need" keeps its "ee"
+                base = root + 'e' if _measure(root[:-1]) > 0 else word
+                break
+            if not _has_vowel(root):
+                # "string", "shed"
+                continue
+            base = root
+            if base.endswith(('at', 'bl', 'iz')) or (len(base) == 2 and _ends_cvc('c' + base)):
+                # "created" -> "create", "enabled" -> "enable", "used" -> "use"
+                base += 'e'
+            elif len(base) > 2 and base[-1] == base[-2] and base[-1] not in 'aeioulsz':
+                # "planning" -> "plann" -> "plan"
+                base = base[:-1]
+            elif _measure(base) == 1 and _ends_cvc(base):
+                base += 'e'
+            break
+        if len(root) >= 3:
+            base = root + replacement
+            break
+        if suffix in ('ies', 'ied'):
+            # "tied" and "ties" -> "tie"
+            base = root + 'ie'
+            break
+    if base.endswith('e') and len(base) > 3:
+        root = base[:-1]
+        if _measure(root) > 1 or (_measure(root) == 1 and not _ends_cvc(root)):
+            base = root
+    return base
+
+
+def build_search_terms(doc, fields):
+    """Return the sorted search terms (words and stems) for a document"""
+    terms = set()
+    for field in fields:
+        for token in tokenize(doc.get(field)):
+            if token in STOP_WORDS:
+                continue
+            terms.add(token)
+            terms.add(stem(token))
+    return sorted(terms)
+
+
+def parse_query(query):
+    """Split a query into complete stems and a trailing prefix.
+
+    The last word is treated as still being typed unless the query ends
+    with whitespace, so "proj" matches "project".
+    """
+    tokens = [token for token in tokenize(query) if token not in STOP_WORDS]
+    if not tokens:
+        return [], None
+    if query[-1:].isspace():
+        return [stem(token) for token in tokens], None
+    return [stem(token) for token in tokens[:-1]], tokens[-1]
+
+
+def build_term_filter(query, field=SEARCH_TERMS_FIELD):
+    """Build the Mongo filter on `search_terms` for a query, or None if it has no terms"""
+    stems, prefix = parse_query(query)
+    clauses = []
+    if stems:
+        clauses.append({field: {'$all': stems}})
+    if prefix:
+        # Anchored, case-sensitive regex on lowercase terms is served by the index
+        clauses.append({field: {'$regex': '^' + re.escape(prefix)}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+
+def score_document(doc, query, fields):
+    """Relevance of a document: weighted exact/stem matches count double, prefix matches once"""
+    stems, prefix = parse_query(query)
+    score = 0
+    for field, weight in fields.items():
+        tokens = tokenize(doc.get(field))
+        if not tokens:
+            continue
+        field_stems = {stem(token) for token in tokens}
+        for query_stem in stems:
+            if query_stem in field_stems:
+                score += 2 * weight
+        if prefix:
+            if prefix in tokens or stem(prefix) in field_stems:
+                score += 2 * weight
+            elif any(token.startswith(prefix) for token in tokens):
+                score += weight
+    return score
+
+
+def rank_key(doc, query, fields):
+    """Sort key for ranking: relevance first, then recency (ObjectIds grow over time)"""
+    return score_document(doc, query, fields), doc['_id']
+
+
+def rank_documents(docs, query, fields):
+    """Order documents by relevance, newest first on ties"""
+    return sorted(docs, key=lambda doc: rank_key(doc, query, fields), reverse=True)
+
+
+def encode_cursor(position):
+    """Encode a continuation position as an opaque URL-safe token"""
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token from encode_cursor(); raises ValueError if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def paginate(docs, query, fields, after, limit):
+    """Return one page of ranked documents and the position to continue from.
+
+    `after` is None for the first page, 'end' once the list is exhausted, or
+    the [score, id] of the last document already returned.
+    """
+    if after == 'end':
+        return [], 'end'
+    ranked = sorted(((rank_key(doc, query, fields), doc) for doc in docs),
+                    key=lambda pair: pair[0], reverse=True)
+    if after is not None:
+        boundary = (after[0], ObjectId(after[1]))
+        ranked = [pair for pair in ranked if pair[0] < boundary]
+    page = ranked[:limit]
+    if len(ranked) <= limit:
+        return [doc for _, doc in page], 'end'
+    last_score, last_id = page[-1][0]
+    return [doc for _, doc in page], [last_score, str(last_id)]
+
+
+def paginate_results(projects, tasks, query, cursor, limit):
+    """Page both result lists from one cursor token.
+
+    Returns (projects, tasks, next_cursor); next_cursor is None once both
+    lists are exhausted.
+    """
+    position = decode_cursor(cursor) if cursor else {}
+    projects, project_position = paginate(projects, query, PROJECT_SEARCH_FIELDS, position.get('p'), limit)
+    tasks, task_position = paginate(tasks, query, TASK_SEARCH_FIELDS, position.get('t'), limit)
+    next_cursor = None
+    if project_position != 'end' or task_position != 'end':
+        next_cursor = encode_cursor({'p': project_position, 't': task_position})
+    return projects, tasks, next_cursor
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD request value; raises ValueError if malformed"""
+    return datetime.strptime(value, '%Y-%m-%d')
+
+
+def parse_search_filters(args):
+    """Validate the optional search filters from request args.
+
+    Supported: status, assignee (a user id), course, due_from and due_to
+    (inclusive YYYY-MM-DD dates).
+    """
+    filters = {}
+    status = args.get('status')
+    if status:
+        if status not in TASK_STATUSES:
+            raise ValueError(f"Invalid status: {status}")
+        filters['status'] = status
+    for name in ('assignee', 'course'):
+        if args.get(name):
+            filters[name] = args.get(name).strip()
+    if args.get('due_from'):
+        filters['due_from'] = parse_date(args.get('due_from'))
+    if args.get('due_to'):
+        filters['due_to'] = parse_date(args.get('due_to')) + timedelta(days=1)
+    return filters
+
+
+def has_task_filters(filters):
+    """Filters that only apply to tasks; projects are not returned when any is set"""
+    return any(name in filters for name in ('status', 'assignee', 'due_from', 'due_to'))
+
+
+def build_task_filter_clauses(filters):
+    """Mongo clauses for the task-level filters"""
+    clauses = []
+    if 'status' in filters:
+        clauses.append({'status': filters['status']})
+    if 'assignee' in filters:
+        # assigned_to is stored as a string by create_task and an ObjectId by edit_task
+        assignee_values = [filters['assignee']]
+        if ObjectId.is_valid(filters['assignee']):
+            assignee_values.append(ObjectId(filters['assignee']))
+        clauses.append({'assigned_to': {'$in': assignee_values}})
+    due_range = {}
+    if 'due_from' in filters:
+        due_range['$gte'] = filters['due_from']
+    if 'due_to' in filters:
+        due_range['$lt'] = filters['due_to']
+    if due_range:
+        clauses.append({'due_date': due_range})
+    return clauses
+
+
+def task_matches_filters(task, filters, project=None):
+    """Python equivalent of build_task_filter_clauses() plus the course filter"""
+    if 'course' in filters and (project or {}).get('course') != filters['course']:
+        return False
+    if 'status' in filters and task.get('status') != filters['status']:
+        return False
+    if 'assignee' in filters and str(task.get('assigned_to')) != filters['assignee']:
+        return False
+    due_date = task.get('due_date')
+    if 'due_from' in filters or 'due_to' in filters:
+        if not isinstance(due_date, datetime):
+            return False
+        if 'due_from' in filters and due_date < filters['due_from']:
+            return False
+        if 'due_to' in filters and due_date >= filters['due_to']:
+            return False
+    return True
+
+
+def matches_terms(terms, stems, prefix):
+    """Python equivalent of build_term_filter() for a document's search_terms"""
+    terms = terms or []
+    if not all(query_stem in terms for query_stem in stems):
+        return False
+    return prefix is None or any(term.startswith(prefix) for term in terms)
+
+
+def task_progress(db, project_ids):
+    """Return {project_id: (total_tasks, completed_tasks)} using one grouped aggregation"""
+    progress = {project_id: (0, 0) for project_id in project_ids}
+    if not progress:
+        return progress
+
+    pipeline = [
+        {'$match': {'project_id': {'$in': list(progress)}}},
+        {'$group': {
+            '_id': '$project_id',
+            'total': {'$sum': 1},
+            'completed': {'$sum': {'$cond': [{'$eq': ['$status', 'Done']}, 1, 0]}}
+        }}
+    ]
+    for row in db.tasks.aggregate(pipeline):
+        progress[row['_id']] = (row['total'], row['completed'])
+    return progress
+
+
+def search_user_content(db, user_id, query, engine='index', filters=None, limit=DEFAULT_LIMIT,
+                        cursor=None, candidate_limit=CANDIDATE_LIMIT):
+    """Search a user's projects and tasks with a constant number of queries.
+
+    Issues at most three round trips regardless of result size: one for the
+    user's project set (used for access scoping, project matching and task
+    title enrichment), one for matching tasks and one grouped aggregation
+    for project progress. Filters are pushed into the queries; only the
+    `candidate_limit` newest matching tasks are ranked.
+
+    Returns (projects, tasks, projects_by_id, progress, next_cursor,
+    truncated), where next_cursor is None once both result lists are
+    exhausted and truncated is True when more than `candidate_limit` tasks
+    matched, so older matches were left out of the ranking and the pages.
+    """
+    filters = filters or {}
+    term_filter = build_term_filter(query) if engine == 'index' else None
+
+    project_query = {'$or': [{'created_by': user_id}, {'team_members': user_id}]}
+    if 'course' in filters:
+        project_query = {'$and': [project_query, {'course': filters['course']}]}
+    user_projects = list(db.projects.find(
+        project_query,
+        {'title': 1, 'description': 1, 'course': 1, 'deadline': 1, SEARCH_TERMS_FIELD: 1}
+    ))
+    projects_by_id = {str(project['_id']): project for project in user_projects}
+
+    if term_filter is not None:
+        stems, prefix = parse_query(query)
+        projects = [project for project in user_projects
+                    if matches_terms(project.get(SEARCH_TERMS_FIELD), stems, prefix)]
+        task_match = term_filter
+    else:
+        # Legacy path: case-insensitive substring match
+        pattern = re.compile(re.escape(query), re.IGNORECASE)
+        projects = [project for project in user_projects
+                    if any(pattern.search(str(project.get(field) or '')) for field in PROJECT_SEARCH_FIELDS)]
+        regex = {'$regex': re.escape(query), '$options': 'i'}
+        task_match = {'$or': [{field: regex} for field in TASK_SEARCH_FIELDS]}
+
+    if has_task_filters(filters):
+        projects = []
+
+    tasks = list(db.tasks.find({
+        '$and': [
+            {'project_id': {'$in': list(projects_by_id)}},
+            task_match
+        ] + build_task_filter_clauses(filters)
+    }).sort('_id', DESCENDING).limit(candidate_limit + 1))
+    truncated = len(tasks) > candidate_limit
+    tasks = tasks[:candidate_limit]
+
+    projects, tasks, next_cursor = paginate_results(projects, tasks, query, cursor, limit)
+
+    progress = task_progress(db, [str(project['_id']) for project in projects])
+    return projects, tasks, projects_by_id, progress, next_cursor, truncated
+
+
+def make_snippet(text, query, length=SNIPPET_LENGTH):
+    """Return a window of text around the first word that matches the query"""
+    text = text or ''
+    if len(text) <= length:
+        return text
+    stems, prefix = parse_query(query)
+    if prefix:
+        stems = stems + [stem(prefix)]
+    start = 0
+    for match in _WORD_RE.finditer(text.lower()):
+        word = match.group()
+        if stem(word) in stems or (prefix and word.startswith(prefix)):
+            start = max(match.start() - length // 3, 0)
+            break
+    snippet = text[start:start + length]
+    return ('...' if start > 0 else '') + snippet + ('...' if start + length < len(text) else '')
+
+
+def message_search_cursor(db, project_ids, query, limit=DEFAULT_LIMIT, before_id=None):
+    """Cursor over team chat messages matching `query` in the given projects, newest first.
+
+    With a complete word the query is pinned to MESSAGE_SEARCH_INDEX with an
+    equality on that word's stem: every (room, stem) range is already ordered
+    by _id, so the plan is a SORT_MERGE with no blocking SORT stage (MongoDB
+    explodes up to 200 rooms this way). A query that is only a prefix has no
+    single index key to pin, so the planner picks between walking the rooms'
+    history newest first and sorting the (then few) prefix matches.
+    """
+    stems, _ = parse_query(query)
+    clauses = [{'room_id': {'$in': list(project_ids)}}, build_term_filter(query)]
+    if stems:
+        clauses.insert(1, {SEARCH_TERMS_FIELD: stems[0]})
+    if before_id is not None:
+        clauses.append({'_id': {'$lt': before_id}})
+    found = db.chat_messages.find({'$and': clauses}, MESSAGE_RESULT_FIELDS).sort('_id', DESCENDING).limit(limit + 1)
+    return found.hint(MESSAGE_SEARCH_INDEX) if stems else found
+
+
+def search_discussions(db, project_ids, query, limit=DEFAULT_LIMIT, cursor=None):
+    """Search team chat messages and task comments in the given projects, newest first.
+
+    Uses one query per source: team rooms are keyed by project id (see
+    message_search_cursor), and comments are unwound from their tasks inside
+    a single aggregation over the (project_id, comments.search_terms) index.
+    Both are limited to one page (plus one row to detect more) and projected
+    down to the displayed fields by MongoDB.
+    Returns (messages, comments, next_cursor); each comment row carries
+    task_id, task_title, project_id and the comment fields.
+    """
+    position = decode_cursor(cursor) if cursor else {}
+    messages, comments = [], []
+    message_position = comment_position = 'end'
+
+    if position.get('m') != 'end':
+        before_id = ObjectId(position['m']) if position.get('m') else None
+        messages = list(message_search_cursor(db, project_ids, query, limit, before_id))
+        if len(messages) > limit:
+            messages = messages[:limit]
+            message_position = str(messages[-1]['_id'])
+
+    if position.get('c') != 'end':
+        comment_filter = build_term_filter(query, field='comments.' + SEARCH_TERMS_FIELD)
+        after_comment = []
+        if position.get('c'):
+            before_time, before_id = datetime.fromisoformat(position['c'][0]), ObjectId(position['c'][1])
+            after_comment = [{'$match': {'$or': [
+                {'comments.created_at': {'$lt': before_time}},
+                {'comments.created_at': before_time, 'comments._id': {'$lt': before_id}}
+            ]}}]
+        pipeline = [
+            {'$match': {'$and': [{'project_id': {'$in': list(project_ids)}}, comment_filter]}},
+            {'$project': dict({'title': 1, 'project_id': 1},
+                              **{'comments.' + field: 1 for field in COMMENT_RESULT_FIELDS})},
+            {'$unwind': '$comments'},
+            {'$match': comment_filter},
+        ] + after_comment + [
+            {'$sort': {'comments.created_at': -1, 'comments._id': -1}},
+            {'$limit': limit + 1},
+            {'$project': {
+                '_id': 0, 'task_id': '$_id', 'task_title': '$title', 'project_id': 1,
+                'comment_id': '$comments._id', 'text': '$comments.text',
+                'created_by': '$comments.created_by', 'created_at': '$comments.created_at'
+            }}
+        ]
+        comments = list(db.tasks.aggregate(pipeline))
+        if len(comments) > limit:
+            comments = comments[:limit]
+            comment_position = [comments[-1]['created_at'].isoformat(), str(comments[-1]['comment_id'])]
+
+    next_cursor = None
+    if message_position != 'end' or comment_position != 'end':
+        next_cursor = encode_cursor({'m': message_position, 'c': comment_position})
+    return messages, comments, next_cursor
+
+
+def ensure_search_indexes(db):
+    """Create the multikey indexes that serve token searches"""
+    db.projects.create_index([(SEARCH_TERMS_FIELD, ASCENDING)])
+    db.tasks.create_index([('project_id', ASCENDING), (SEARCH_TERMS_FIELD, ASCENDING)])
+    db.tasks.create_index([('project_id', ASCENDING), ('comments.' + SEARCH_TERMS_FIELD, ASCENDING)])
+    db.chat_messages.create_index(MESSAGE_SEARCH_INDEX)
+    # History pages that message hits link into are keyed by room and _id
+    db.chat_messages.create_index(MESSAGE_HISTORY_INDEX)
+
+
+def backfill_search_terms(collection, fields, batch_size=500, rebuild=False):
+    """Populate `search_terms` on documents written before the token index existed.
+
+    Safe to interrupt and re-run: only documents still missing the field are
+    read. With `rebuild`, every document's terms are recomputed (needed after
+    the stemming rules change), paging through the collection by _id.
+    """
+    updated = 0
+    last_id = None
+    projection = {field: 1 for field in fields}
+    while True:
+        if rebuild:
+            query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+            batch = list(collection.find(query, projection).sort('_id', ASCENDING).limit(batch_size))
+        else:
+            batch = list(collection.find({SEARCH_TERMS_FIELD: {'$exists': False}}, projection).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]['_id']
+        collection.bulk_write([
+            UpdateOne({'_id': doc['_id']}, {'$set': {SEARCH_TERMS_FIELD: build_search_terms(doc, fields)}})
+            for doc in batch
+        ], ordered=False)
+        updated += len(batch)
+        logger.info(f"Backfilled search terms for {updated} documents in {collection.name}")
+    return updated
+
+
+def backfill_comment_search_terms(tasks_collection, batch_size=200, rebuild=False):
+    """Give comments written before comment search existed an _id and search terms.
+
+    Safe to interrupt and re-run: only tasks with an unindexed comment are
+    read, or with `rebuild` every task with comments, paged by _id.
+    """
+    updated = 0
+    last_id = None
+    unindexed = {'comments': {'$elemMatch': {SEARCH_TERMS_FIELD: {'$exists': False}}}}
+    while True:
+        if rebuild:
+            query = {'comments.0': {'$exists': True}}
+            if last_id is not None:
+                query['_id'] = {'$gt': last_id}
+            batch = list(tasks_collection.find(query, {'comments': 1}).sort('_id', ASCENDING).limit(batch_size))
+        else:
+            batch = list(tasks_collection.find(unindexed, {'comments': 1}).limit(batch_size))
+        if not batch:
+            break
+        requests = []
+        for task in batch:
+            comments = []
+            for comment in task['comments']:
+                comment.setdefault('_id', ObjectId())
+                comment[SEARCH_TERMS_FIELD] = build_search_terms(comment, COMMENT_SEARCH_FIELDS)
+                comments.append(comment)
+            # Only replace the array if no comment was added since it was read
+            requests.append(UpdateOne(
+                {'_id': task['_id'], 'comments': {'$size': len(comments)}},
+                {'$set': {'comments': comments}}
+            ))
+        result = tasks_collection.bulk_write(requests, ordered=False)
+        if rebuild:
+            last_id = batch[-1]['_id']
+        elif result.modified_count == 0:
+            # Every task in the batch changed underneath us; re-read it
+            continue
+        updated += result.modified_count
+        logger.info(f"Backfilled comment search terms for {updated} tasks")
+    return updated
+
+
+if __name__ == '__main__':
+    # Usage: MONGO_URI=... python search_engine.py [--rebuild]
+    # --rebuild recomputes every document's terms, e.g. after the stemming rules change
+    import os
+    import sys
+    from pymongo import MongoClient
+
+    logging.basicConfig(level=logging.INFO)
+    client = MongoClient(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/projectMngmt'))
+    db = client.projectMngmt
+    rebuild = '--rebuild' in sys.argv[1:]
+    ensure_search_indexes(db)
+    backfill_search_terms(db.projects, PROJECT_SEARCH_FIELDS, rebuild=rebuild)
+    backfill_search_terms(db.tasks, TASK_SEARCH_FIELDS, rebuild=rebuild)
+    backfill_comment_search_terms(db.tasks, rebuild=rebuild)
+    backfill_search_terms(db.chat_messages, CHAT_SEARCH_FIELDS, rebuild=rebuild)
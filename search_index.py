@@ -0,0 +1,286 @@
+"""
+In-process trigram search index for instant, as-you-type search.
+
+Each user gets an inverted index (trigram -> documents) over the titles and
+descriptions of the projects they can access and the tasks in them. Indexes
+are built lazily on a user's first search, patched incrementally by the
+project and task write routes, and evicted least-recently-used first when
+the cache exceeds its user or posting budget.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from search_engine import PROJECT_SEARCH_FIELDS, TASK_SEARCH_FIELDS, rank_documents, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Fields kept per document so search results can be served without Mongo
+PROJECT_FIELDS = ('_id', 'title', 'description', 'course', 'deadline', 'created_by', 'team_members')
+TASK_FIELDS = ('_id', 'title', 'description', 'status', 'due_date', 'project_id', 'assigned_to')
+
+
+def trigrams(text):
+    """Return the set of trigrams of every word in text (short words are kept whole)"""
+    grams = set()
+    for token in tokenize(text):
+        if len(token) < 3:
+            grams.add(token)
+            continue
+        for i in range(len(token) - 2):
+            grams.add(token[i:i + 3])
+    return grams
+
+
+def project_member_ids(project):
+    """User ids with access to a project (creator and team members)"""
+    members = {str(member) for member in project.get('team_members', [])}
+    if project.get('created_by'):
+        members.add(str(project['created_by']))
+    return members
+
+
+class UserSearchIndex:
+    """Trigram inverted index over one user's accessible projects and tasks"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.built_at = time.monotonic()
+        self.projects = {}
+        self.tasks = {}
+        self.postings = defaultdict(set)
+        self.posting_count = 0
+
+    def _index(self, key, doc, fields):
+        for field in fields:
+            for gram in trigrams(doc.get(field)):
+                if key not in self.postings[gram]:
+                    self.postings[gram].add(key)
+                    self.posting_count += 1
+
+    def _unindex(self, key, doc, fields):
+        for field in fields:
+            for gram in trigrams(doc.get(field)):
+                keys = self.postings.get(gram)
+                if keys and key in keys:
+                    keys.discard(key)
+                    self.posting_count -= 1
+                    if not keys:
+                        del self.postings[gram]
+
+    def add_project(self, project):
+        project = {field: project.get(field) for field in PROJECT_FIELDS}
+        project_id = str(project['_id'])
+        self.remove_project(project_id, keep_tasks=True)
+        self.projects[project_id] = project
+        self._index(('project', project_id), project, PROJECT_SEARCH_FIELDS)
+
+    def remove_project(self, project_id, keep_tasks=False):
+        project = self.projects.pop(project_id, None)
+        if project:
+            self._unindex(('project', project_id), project, PROJECT_SEARCH_FIELDS)
+        if not keep_tasks:
+            for task_id in [tid for tid, task in self.tasks.items() if task.get('project_id') == project_id]:
+                self.remove_task(task_id)
+
+    def add_task(self, task):
+        task = {field: task.get(field) for field in TASK_FIELDS}
+        task_id = str(task['_id'])
+        self.remove_task(task_id)
+        self.tasks[task_id] = task
+        self._index(('task', task_id), task, TASK_SEARCH_FIELDS)
+
+    def remove_task(self, task_id):
+        task = self.tasks.pop(task_id, None)
+        if task:
+            self._unindex(('task', task_id), task, TASK_SEARCH_FIELDS)
+
+    def update_task(self, task_id, fields):
+        task = self.tasks.get(task_id)
+        if task:
+            self.add_task(dict(task, **fields))
+
+    def search(self, query):
+        """Return (projects, tasks) containing every query word, ranked by relevance.
+
+        Words of three or more characters are looked up by trigram and match
+        anywhere in the text; shorter words have no trigrams, so they match
+        word prefixes, checked by scanning the candidates (every indexed
+        document when the query has only short words).
+        """
+        words = tokenize(query)
+        if not words:
+            return [], []
+        long_words = [word for word in words if len(word) >= 3]
+        short_words = [word for word in words if len(word) < 3]
+
+        candidates = None
+        for word in long_words:
+            for gram in trigrams(word):
+                keys = self.postings.get(gram, set())
+                candidates = set(keys) if candidates is None else candidates & keys
+                if not candidates:
+                    return [], []
+        if candidates is None:
+            candidates = {('project', doc_id) for doc_id in self.projects} | {('task', doc_id) for doc_id in self.tasks}
+
+        projects, tasks = [], []
+        for kind, doc_id in candidates:
+            if kind == 'project':
+                doc, fields = self.projects[doc_id], PROJECT_SEARCH_FIELDS
+            else:
+                doc, fields = self.tasks[doc_id], TASK_SEARCH_FIELDS
+            # Trigrams over-match; confirm every word occurs in the text
+            text = ' '.join(str(doc.get(field) or '') for field in fields).lower()
+            if not all(word in text for word in long_words):
+                continue
+            if short_words:
+                tokens = tokenize(text)
+                if not all(any(token.startswith(word) for token in tokens) for word in short_words):
+                    continue
+            (projects if kind == 'project' else tasks).append(doc)
+
+        return (rank_documents(projects, query, PROJECT_SEARCH_FIELDS),
+                rank_documents(tasks, query, TASK_SEARCH_FIELDS))
+
+
+class SearchIndexCache:
+    """LRU cache of per-user search indexes with a bounded posting budget.
+
+    `loader(user_id)` must return (projects, tasks) for everything the user
+    can access; it is called from a background thread when an index is built.
+    """
+
+    def __init__(self, loader, max_users=500, max_postings=2000000, max_age=300):
+        self.loader = loader
+        self.max_users = max_users
+        self.max_postings = max_postings
+        self.max_age = max_age
+        self._indexes = OrderedDict()
+        self._project_users = defaultdict(set)
+        self._building = set()
+        self._lock = threading.RLock()
+
+    def get(self, user_id):
+        """Return the user's warm index, or None if it is missing or stale"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return None
+            if time.monotonic() - index.built_at > self.max_age:
+                # Writes from other processes are not seen here; rebuild periodically
+                self._drop(user_id)
+                return None
+            self._indexes.move_to_end(user_id)
+            return index
+
+    def build(self, user_id):
+        """Build (or rebuild) a user's index synchronously"""
+        projects, tasks = self.loader(user_id)
+        index = UserSearchIndex(user_id)
+        for project in projects:
+            index.add_project(project)
+        for task in tasks:
+            if str(task.get('project_id')) in index.projects:
+                index.add_task(task)
+
+        with self._lock:
+            self._drop(user_id)
+            self._indexes[user_id] = index
+            for project_id in index.projects:
+                self._project_users[project_id].add(user_id)
+            self._evict()
+        logger.info(f"Search index built for user {user_id}: {len(index.projects)} projects, "
+                    f"{len(index.tasks)} tasks, {index.posting_count} postings")
+        return index
+
+    def build_async(self, user_id):
+        """Start building a user's index in the background unless already in progress"""
+        with self._lock:
+            if user_id in self._building:
+                return
+            self._building.add(user_id)
+
+        def run():
+            try:
+                self.build(user_id)
+            except Exception as e:
+                logger.error(f"Error building search index for user {user_id}: {e}")
+            finally:
+                with self._lock:
+                    self._building.discard(user_id)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def invalidate_user(self, user_id):
+        """Forget a user's index, e.g. after their project membership changed"""
+        with self._lock:
+            self._drop(str(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._project_users.clear()
+
+    def upsert_project(self, project):
+        project_id = str(project['_id'])
+        with self._lock:
+            for user_id in project_member_ids(project):
+                index = self._indexes.get(user_id)
+                if index is not None:
+                    index.add_project(project)
+                    self._project_users[project_id].add(user_id)
+            self._evict()
+
+    def remove_project(self, project_id):
+        project_id = str(project_id)
+        with self._lock:
+            for user_id in self._project_users.pop(project_id, set()):
+                index = self._indexes.get(user_id)
+                if index is not None:
+                    index.remove_project(project_id)
+
+    def upsert_task(self, task):
+        with self._lock:
+            for user_id in self._project_users.get(str(task.get('project_id')), ()):
+                self._indexes[user_id].add_task(task)
+            self._evict()
+
+    def update_task(self, task_id, project_id, fields):
+        with self._lock:
+            for user_id in self._project_users.get(str(project_id), ()):
+                self._indexes[user_id].update_task(str(task_id), fields)
+
+    def remove_task(self, task_id, project_id):
+        with self._lock:
+            for user_id in self._project_users.get(str(project_id), ()):
+                self._indexes[user_id].remove_task(str(task_id))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._indexes),
+                "postings": sum(index.posting_count for index in self._indexes.values()),
+                "max_users": self.max_users,
+                "max_postings": self.max_postings,
+            }
+
+    def _drop(self, user_id):
+        index = self._indexes.pop(user_id, None)
+        if index is None:
+            return
+        for project_id in index.projects:
+            users = self._project_users.get(project_id)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._project_users[project_id]
+
+    def _evict(self):
+        total = sum(index.posting_count for index in self._indexes.values())
+        while self._indexes and (len(self._indexes) > self.max_users or total > self.max_postings):
+            user_id = next(iter(self._indexes))
+            total -= self._indexes[user_id].posting_count
+            self._drop(user_id)
+            logger.info(f"Evicted search index for user {user_id}")
@@ -0,0 +1,56 @@
+"""
+Streaming JSON helpers for large list endpoints.
+Writes a JSON array element by element while a Mongo cursor is iterated,
+so the full result set is never held in memory at once.
+
+Headers and a 200 status are already sent by the time a failing cursor or
+serializer raises, so an error mid-stream is logged and re-raised. The server
+then drops the connection before the terminating chunk, and clients see a
+network error instead of a short array they would take for the full result.
+"""
+import logging
+
+from flask import Response, json, stream_with_context
+
+logger = logging.getLogger(__name__)
+
+# Number of documents pulled from MongoDB per getMore round trip
+DEFAULT_BATCH_SIZE = 100
+
+
+def iter_json_array(items, serialize, chunk_size=DEFAULT_BATCH_SIZE):
+    """Yield a JSON array as text chunks, one chunk per `chunk_size` elements.
+
+    If iterating or serializing raises, the error is logged and re-raised
+    without closing the array, so the response is aborted rather than ended.
+    """
+    yield '['
+    buffer = []
+    count = 0
+    try:
+        for item in items:
+            encoded = json.dumps(serialize(item))
+            buffer.append(encoded if not count else ',' + encoded)
+            count += 1
+            if len(buffer) >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+    except Exception:
+        logger.exception("Streaming JSON response aborted after %d element(s)", count)
+        raise
+    if buffer:
+        yield ''.join(buffer)
+    yield ']'
+
+
+def stream_json_array(cursor, serialize, batch_size=DEFAULT_BATCH_SIZE, headers=None):
+    """Return a streamed application/json response for a Mongo cursor.
+
+    `serialize` converts one document into a JSON-serializable dict. The
+    cursor is read in batches of `batch_size`, and each batch is flushed to
+    the client as soon as it has been encoded.
+    """
+    if hasattr(cursor, 'batch_size'):
+        cursor = cursor.batch_size(batch_size)
+    body = iter_json_array(cursor, serialize, chunk_size=batch_size)
+    return Response(stream_with_context(body), mimetype='application/json', headers=headers)
@@ -0,0 +1,87 @@
+"""
+Canonical task due dates.
+
+Tasks store `due_date` as a midnight UTC datetime, or None when unset, so
+reminder, overdue and calendar queries are range scans on the
+(due_date, status) index. Older tasks created through the web form stored the
+raw YYYY-MM-DD string; `backfill_due_dates` converts them in batches.
+"""
+import logging
+from datetime import datetime
+
+from pymongo import ASCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+DUE_DATE_FORMAT = '%Y-%m-%d'
+# Formats seen in legacy string due dates, tried in order
+LEGACY_DUE_DATE_FORMATS = (DUE_DATE_FORMAT, '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y')
+DUE_DATE_INDEX = [('due_date', ASCENDING), ('status', ASCENDING)]
+
+
+def parse_due_date(value):
+    """Canonical due date for a form or legacy value; None if empty, ValueError if malformed"""
+    if value is None or isinstance(value, datetime):
+        return value
+    value = value.strip()
+    if not value:
+        return None
+    for date_format in LEGACY_DUE_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).replace(hour=0, minute=0, second=0)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised due date: {value!r}")
+
+
+def format_due_date(value):
+    """YYYY-MM-DD for API responses and date inputs; '' when unset"""
+    if isinstance(value, datetime):
+        return value.strftime(DUE_DATE_FORMAT)
+    return value or ''
+
+
+def ensure_due_date_index(tasks_collection):
+    tasks_collection.create_index(DUE_DATE_INDEX)
+
+
+def backfill_due_dates(tasks_collection, batch_size=500):
+    """Convert string due dates to datetimes in batches; safe to interrupt and re-run.
+
+    Unparseable values are logged and left as they are.
+    """
+    converted = 0
+    last_id = None
+    while True:
+        query = {'due_date': {'$type': 'string'}}
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        batch = list(tasks_collection.find(query, {'due_date': 1}).sort('_id', ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]['_id']
+        requests = []
+        for task in batch:
+            try:
+                due_date = parse_due_date(task['due_date'])
+            except ValueError:
+                logger.warning(f"Leaving unparseable due date on task {task['_id']}: {task['due_date']!r}")
+                continue
+            requests.append(UpdateOne({'_id': task['_id'], 'due_date': task['due_date']},
+                                      {'$set': {'due_date': due_date}}))
+        if requests:
+            converted += tasks_collection.bulk_write(requests, ordered=False).modified_count
+        logger.info(f"Converted {converted} task due dates")
+    return converted
+
+
+if __name__ == '__main__':
+    # Usage: MONGO_URI=... python task_dates.py
+    import os
+    from pymongo import MongoClient
+
+    logging.basicConfig(level=logging.INFO)
+    client = MongoClient(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/projectMngmt'))
+    db = client.projectMngmt
+    ensure_due_date_index(db.tasks)
+    backfill_due_dates(db.tasks)
@@ -0,0 +1,190 @@
+"""
+Due-date reminders at several lead times.
+
+Each task carries `next_reminder_at`, the next moment one of the configured
+lead times (e.g. 3 days and 1 day before `due_date`) is reached, and
+`reminders_sent`, the lead times already handled. A frequent tick reads only
+tasks whose `next_reminder_at` has passed, through an index on that field,
+marks them before notifying so a restart never repeats a reminder, and moves
+`next_reminder_at` on to the next lead time.
+
+Due dates entered as plain dates are stored at midnight, so lead times
+shorter than a day are skipped for them (a "2 hours" reminder would fire at
+10pm the evening before). The web form only sets dates, which is why the
+default has no sub-day lead time.
+"""
+import logging
+import re
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REMINDER_OFFSETS = '3d,1d'
+DAY_MINUTES = 24 * 60
+OFFSET_UNITS = {'d': 'days', 'h': 'hours', 'm': 'minutes'}
+
+
+def parse_offsets(value):
+    """Parse "3d,1d,2h" into lead times in minutes, longest first"""
+    offsets = set()
+    for part in (value or '').split(','):
+        part = part.strip().lower()
+        if not part:
+            continue
+        match = re.fullmatch(r'(\d+)\s*([dhm])', part)
+        if not match:
+            raise ValueError(f"Invalid reminder offset: {part!r}")
+        offsets.add(int(timedelta(**{OFFSET_UNITS[match.group(2)]: int(match.group(1))}).total_seconds() // 60))
+    return sorted(offsets, reverse=True)
+
+
+def describe_offset(minutes):
+    """Human lead time for reminder messages"""
+    if minutes == 24 * 60:
+        return 'tomorrow'
+    if minutes % (24 * 60) == 0:
+        return f"in {minutes // (24 * 60)} days"
+    if minutes % 60 == 0:
+        hours = minutes // 60
+        return f"in {hours} hour{'s' if hours != 1 else ''}"
+    return f"in {minutes} minutes"
+
+
+def is_date_only(due_date):
+    """Due dates without a time of day are stored at midnight"""
+    return due_date.time() == datetime.min.time()
+
+
+def plan_reminders(due_date, offsets, sent=(), now=None):
+    """Return (offset due now or None, offsets to mark as handled, next_reminder_at).
+
+    When several lead times have passed (a task created or rescheduled close
+    to its due date), only the shortest is sent and the longer ones are marked
+    as handled without a message.
+    """
+    now = now or datetime.utcnow()
+    if not isinstance(due_date, datetime) or due_date <= now:
+        return None, [], None
+    pending = [offset for offset in offsets if offset not in sent]
+    if is_date_only(due_date):
+        pending = [offset for offset in pending if offset >= DAY_MINUTES]
+    passed = [offset for offset in pending if due_date - timedelta(minutes=offset) <= now]
+    upcoming = [due_date - timedelta(minutes=offset) for offset in pending if offset not in passed]
+    return (min(passed) if passed else None), passed, (min(upcoming) if upcoming else None)
+
+
+def reminder_fields(due_date, offsets, now=None):
+    """Reminder fields for a task whose due date was just set.
+
+    If lead times have already passed (a task due tomorrow), the nearest one
+    is left due so the next tick sends it once; longer ones are skipped.
+    """
+    offset, handled, next_at = plan_reminders(due_date, offsets, now=now)
+    if offset is not None:
+        handled = [passed for passed in handled if passed != offset]
+        next_at = due_date - timedelta(minutes=offset)
+    return {'next_reminder_at': next_at, 'reminders_sent': handled}
+
+
+def reminder_changes(task, update, offsets, now=None):
+    """Reminder fields to $set along with `update` to an existing task, or {} if they stand.
+
+    Reminders restart when the due date moves or a completed task is
+    reopened; claim_due_reminders() clears them for tasks that are Done.
+    """
+    status = update.get('status', task.get('status'))
+    moved = 'due_date' in update and update['due_date'] != task.get('due_date')
+    reopened = task.get('status') == 'Done' and status != 'Done'
+    if status == 'Done' or not (moved or reopened):
+        return {}
+    return reminder_fields(update.get('due_date', task.get('due_date')), offsets, now)
+
+
+def ensure_reminder_index(tasks_collection):
+    tasks_collection.create_index(
+        [('next_reminder_at', ASCENDING)],
+        partialFilterExpression={'next_reminder_at': {'$type': 'date'}}
+    )
+
+
+def due_reminders_pipeline(now, limit):
+    """Tasks whose next reminder is due, joined to their project and assignee in one aggregation"""
+    return [
+        {"$match": {"next_reminder_at": {"$lte": now}}},
+        {"$sort": {"next_reminder_at": 1}},
+        {"$limit": limit},
+        {"$project": {
+            "title": 1, "status": 1, "due_date": 1, "reminders_sent": 1, "next_reminder_at": 1,
+            "assignee_id": {"$toString": "$assigned_to"},
+            "project_oid": {"$convert": {"input": "$project_id", "to": "objectId", "onError": None, "onNull": None}},
+            "assignee_oid": {"$convert": {"input": "$assigned_to", "to": "objectId", "onError": None, "onNull": None}},
+        }},
+        {"$lookup": {"from": "projects", "localField": "project_oid", "foreignField": "_id",
+                     "pipeline": [{"$project": {"title": 1}}], "as": "project"}},
+        {"$lookup": {"from": "users", "localField": "assignee_oid", "foreignField": "_id",
+                     "pipeline": [{"$project": {"_id": 1}}], "as": "assignee"}},
+    ]
+
+
+def claim_due_reminders(tasks_collection, offsets, now=None, limit=1000):
+    """Advance up to `limit` due tasks; return (tasks advanced, reminders to send).
+
+    Each reminder is the joined task with `offset` set. Tasks are updated
+    before anything is sent, so a crash can drop a reminder but never repeat it.
+    """
+    now = now or datetime.utcnow()
+    tasks = list(tasks_collection.aggregate(due_reminders_pipeline(now, limit)))
+    updates = []
+    reminders = []
+    for task in tasks:
+        if task.get('status') == 'Done':
+            offset, handled, next_at = None, [], None
+        else:
+            offset, handled, next_at = plan_reminders(task.get('due_date'), offsets, task.get('reminders_sent') or [], now)
+        update = {'$set': {'next_reminder_at': next_at}}
+        if handled:
+            update['$addToSet'] = {'reminders_sent': {'$each': handled}}
+        # Matching the old next_reminder_at keeps a concurrent edit from being overwritten
+        updates.append(UpdateOne({'_id': task['_id'], 'next_reminder_at': task['next_reminder_at']}, update))
+        if offset is not None and task['project'] and task['assignee']:
+            task['offset'] = offset
+            task['project'] = task['project'][0]
+            reminders.append(task)
+    if updates:
+        tasks_collection.bulk_write(updates, ordered=False)
+    return len(tasks), reminders
+
+
+def backfill_reminders(tasks_collection, offsets, batch_size=500, now=None):
+    """Set reminder fields on open tasks with a future due date that lack them; safe to re-run"""
+    now = now or datetime.utcnow()
+    updated = 0
+    last_id = None
+    while True:
+        query = {'next_reminder_at': {'$exists': False}, 'due_date': {'$gt': now}, 'status': {'$ne': 'Done'}}
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+        batch = list(tasks_collection.find(query, {'due_date': 1}).sort('_id', ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]['_id']
+        updated += tasks_collection.bulk_write([
+            UpdateOne({'_id': task['_id']}, {'$set': reminder_fields(task['due_date'], offsets, now)})
+            for task in batch
+        ], ordered=False).modified_count
+        logger.info(f"Scheduled reminders for {updated} tasks")
+    return updated
+
+
+if __name__ == '__main__':
+    # Usage: MONGO_URI=... python task_reminders.py (after task_dates.py has normalised due dates)
+    import os
+    from pymongo import MongoClient
+
+    logging.basicConfig(level=logging.INFO)
+    client = MongoClient(os.environ.get('MONGO_URI', 'mongodb://localhost:27017/projectMngmt'))
+    db = client.projectMngmt
+    ensure_reminder_index(db.tasks)
+    backfill_reminders(db.tasks, parse_offsets(os.environ.get('REMINDER_OFFSETS', DEFAULT_REMINDER_OFFSETS)))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for chat_buffer.py (no MongoDB required)
+"""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from chat_buffer import RecentMessageBuffer
+from conftest import FakeCollection
+
+
+def messages(count, start=0):
+    base = datetime(2026, 1, 1)
+    return [{'_id': ObjectId(), 'message': str(i), 'timestamp': base + timedelta(seconds=i)}
+            for i in range(start, start + count)]
+
+
+def test_joins_are_served_from_the_buffer_once_primed():
+    buffer = RecentMessageBuffer(per_room=5)
+    assert buffer.get('p1', 'team', 3) is None
+    buffer.prime('p1', 'team', messages(2), next_cursor=None)
+
+    page, cursor = buffer.get('p1', 'team', 3)
+    assert [m['message'] for m in page] == ['0', '1'] and cursor is None
+
+    for message in messages(4, start=2):
+        buffer.append('p1', 'team', message)
+    page, cursor = buffer.get('p1', 'team', 3)
+    assert [m['message'] for m in page] == ['3', '4', '5'] and cursor is not None
+    # The ring dropped message 0, so a page bigger than the buffer goes to the database
+    assert buffer.get('p1', 'team', 10) is None
+    # Callers get copies they can serialize in place
+    page[0]['_id'] = 'changed'
+    assert buffer.get('p1', 'team', 3)[0][0]['_id'] != 'changed'
+
+
+def test_idle_rooms_are_evicted_under_the_caps():
+    buffer = RecentMessageBuffer(per_room=10, max_rooms=2, max_messages=12)
+    buffer.prime('a', 'team', messages(5), None)
+    buffer.prime('b', 'team', messages(5), None)
+    buffer.get('a', 'team', 1)
+    buffer.prime('c', 'team', messages(5), None)
+    assert buffer.get('b', 'team', 1) is None
+    assert buffer.stats()['rooms'] == 2 and buffer.stats()['messages'] == 10
+
+    buffer.append('a', 'team', messages(1, start=5)[0])
+    buffer.append('a', 'team', messages(1, start=6)[0])
+    buffer.append('a', 'team', messages(1, start=7)[0])
+    assert buffer.get('c', 'team', 1) is None
+    assert buffer.stats()['messages'] == 8
+
+
+def test_stale_rooms_are_reread():
+    buffer = RecentMessageBuffer(max_age=-1)
+    buffer.prime('a', 'team', messages(1), None)
+    assert buffer.get('a', 'team', 1) is None
+
+
+def serialize(message):
+    """What the chat handlers do to each message before emitting it"""
+    message['_id'] = str(message['_id'])
+    message['timestamp'] = message['timestamp'].isoformat()
+    return message
+
+
+def test_repeated_joins_survive_callers_serializing_in_place():
+    collection = FakeCollection([dict(message, room_id='p1', room_type='team') for message in messages(8)])
+    buffer = RecentMessageBuffer(per_room=5)
+    for _ in range(3):
+        page, cursor = buffer.newest_page(collection, 'p1', 'team', 3)
+        assert [m['message'] for m in page] == ['5', '6', '7'] and cursor is not None
+        [serialize(message) for message in page]
+    assert buffer.stats()['hits'] == 2
+
+    sent = dict(messages(1, start=8)[0], room_id='p1', room_type='team')
+    buffer.append('p1', 'team', sent)
+    serialize(sent)
+    page, cursor = buffer.newest_page(collection, 'p1', 'team', 3)
+    assert [m['message'] for m in page] == ['6', '7', '8'] and isinstance(page[-1]['timestamp'], datetime)
+
+
+def test_pages_larger_than_the_ring_are_read_in_full():
+    collection = FakeCollection([dict(message, room_id='p1', room_type='team') for message in messages(8)])
+    buffer = RecentMessageBuffer(per_room=3)
+    page, cursor = buffer.newest_page(collection, 'p1', 'team', 6)
+    assert [m['message'] for m in page] == ['2', '3', '4', '5', '6', '7'] and cursor is not None
+    assert buffer.newest_page(collection, 'p1', 'team', 2)[0][0]['message'] == '6'
+
+
+def test_deleting_a_senders_messages_drops_the_rooms_that_hold_them():
+    buffer = RecentMessageBuffer(per_room=5)
+    buffer.prime('p1', 'team', [dict(m, sender_id='u1') for m in messages(2)], next_cursor=None)
+    buffer.prime('p2', 'team', [dict(m, sender_id='u2') for m in messages(2)], next_cursor=None)
+    buffer.append('p2', 'team', dict(messages(1, start=5)[0], sender_id='u2'))
+
+    buffer.invalidate_sender('u1')
+    assert buffer.get('p1', 'team', 2) is None
+    assert len(buffer.get('p2', 'team', 3)[0]) == 3
+    assert buffer.stats()['messages'] == 3
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for chat_history.py keyset pagination (no MongoDB required)
+"""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from chat_history import history_around, history_cursor, history_page, parse_history_cursor
+from conftest import FakeCollection
+
+
+def test_pages_walk_back_through_a_room():
+    start = datetime(2026, 1, 1)
+    docs = [{'_id': ObjectId(), 'room_id': 'p1', 'room_type': 'team', 'message': str(i),
+             'timestamp': start + timedelta(seconds=i // 2)} for i in range(7)]
+    docs.append({'_id': ObjectId(), 'room_id': 'other', 'room_type': 'team', 'message': 'x', 'timestamp': start})
+    collection = FakeCollection(docs)
+
+    page, cursor = history_page(collection, 'p1', 'team', limit=3)
+    assert [m['message'] for m in page] == ['4', '5', '6']
+    assert parse_history_cursor(cursor) == (page[0]['timestamp'], page[0]['_id'])
+
+    page, cursor = history_page(collection, 'p1', 'team', before=cursor, limit=3)
+    assert [m['message'] for m in page] == ['1', '2', '3']
+    page, cursor = history_page(collection, 'p1', 'team', before=cursor, limit=3)
+    assert [m['message'] for m in page] == ['0'] and cursor is None
+
+
+def test_bare_message_ids_are_still_accepted():
+    doc = {'_id': ObjectId(), 'timestamp': datetime(2026, 1, 1, 12)}
+    assert parse_history_cursor(str(doc['_id']), FakeCollection([doc])) == (doc['timestamp'], doc['_id'])
+    assert parse_history_cursor(history_cursor(doc)) == (doc['timestamp'], doc['_id'])
+
+
+def test_pages_around_a_message_never_come_back_empty():
+    start = datetime(2026, 1, 1)
+    docs = [{'_id': ObjectId.from_datetime(start + timedelta(seconds=i)), 'room_id': 'p1', 'room_type': 'team',
+             'message': str(i), 'timestamp': start + timedelta(seconds=i)} for i in range(6)]
+    collection = FakeCollection(docs)
+
+    messages, cursor = history_around(collection, 'p1', 'team', docs[3]['_id'], limit=4)
+    assert [m['message'] for m in messages] == ['1', '2', '3', '4'] and cursor == history_cursor(docs[1])
+
+    # A page of one is the message itself, with older messages still reachable
+    messages, cursor = history_around(collection, 'p1', 'team', docs[3]['_id'], limit=1)
+    assert [m['message'] for m in messages] == ['3'] and cursor == history_cursor(docs[3])
+
+    # Nothing at or after the id (e.g. it expired): older messages fill the page
+    gone = ObjectId.from_datetime(start + timedelta(minutes=5))
+    messages, cursor = history_around(collection, 'p1', 'team', gone, limit=1)
+    assert [m['message'] for m in messages] == ['5'] and cursor == history_cursor(docs[5])
+    messages, cursor = history_around(collection, 'p1', 'team', gone, limit=10)
+    assert len(messages) == 6 and cursor is None
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests for chat_retention.py policies and batched purges (no MongoDB required)
+"""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from chat_retention import ChatRetention, parse_retention_policies
+from conftest import FakeCollection
+
+
+def message(room_type, age_hours, **fields):
+    return dict(_id=ObjectId.from_datetime(datetime.utcnow() - timedelta(hours=age_hours)), room_type=room_type, **fields)
+
+
+def test_policies_are_per_room_type():
+    retention = ChatRetention(parse_retention_policies('global=24,team=0,project=168'))
+    now = datetime(2026, 1, 1)
+    assert retention.expires_at('global', now) == now + timedelta(hours=24)
+    assert retention.expires_at('team', now) is None
+    assert retention.expires_at('project', now) == now + timedelta(days=7)
+    assert retention.expires_at('unknown', now) == now + timedelta(hours=24)
+    assert parse_retention_policies('48') == {'default': 48.0}
+
+
+def test_legacy_messages_are_purged_in_batches():
+    docs = [message('global', 30 + i) for i in range(5)] + [
+        message('global', 1), message('team', 40), message('project', 41), message('global', 42, expires_at=1)]
+    collection = FakeCollection(docs)
+    retention = ChatRetention(parse_retention_policies('team=0,project=168'), batch_size=2, pause=0)
+
+    assert retention.purge_legacy(collection) == {'default': 5, 'project': 0}
+    assert len(collection.queries('delete_many')) == 3
+    # Each batch after the first starts past the last _id it deleted
+    finds = collection.queries('find')
+    default_ranges = [query['_id'] for query in finds if query['room_type'] != 'project']
+    assert '$gt' not in default_ranges[0]
+    assert [id_range['$gt'] for id_range in default_ranges[1:]] == sorted(doc['_id'] for doc in docs[:5])[1::2]
+    assert all('$lt' in id_range for id_range in default_ranges)
+    assert sorted(doc['room_type'] for doc in collection.docs) == ['global', 'global', 'project', 'team']
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for chat_writer.py (no MongoDB required)
+"""
+
+import time
+
+from pymongo.errors import AutoReconnect
+
+from chat_writer import ChatWriter
+from conftest import FakeCollection
+
+
+class FlakyCollection(FakeCollection):
+    """Drops the connection after writing the first document of the next `fail` batches"""
+
+    def __init__(self, fail=0):
+        super().__init__()
+        self.fail = fail
+
+    def insert_many(self, documents, ordered=True):
+        if self.fail:
+            self.fail -= 1
+            self.insert_one(documents[0])
+            raise AutoReconnect('connection reset')
+        return super().insert_many(documents, ordered=ordered)
+
+
+def test_messages_get_ids_up_front_and_are_written_in_batches():
+    collection = FakeCollection()
+    writer = ChatWriter(collection, max_batch=3)
+    ids = [writer.submit({'message': str(i)}) for i in range(7)]
+    assert len(set(ids)) == 7 and not collection.docs
+
+    assert writer.flush() == 7
+    assert [len(call[1]) for call in collection.calls] == [3, 3, 1]
+    assert [doc['_id'] for doc in collection.docs] == ids
+
+
+def test_failed_batch_is_retried_without_duplicates():
+    collection = FlakyCollection(fail=1)
+    writer = ChatWriter(collection)
+    for i in range(4):
+        writer.submit({'message': str(i)})
+    try:
+        writer.flush()
+    except AutoReconnect:
+        pass
+    assert writer.stats()['queued'] == 4
+
+    # The retry reports the already written message as a duplicate, which is ignored
+    assert writer.flush() == 4
+    assert len(collection.docs) == 4 and writer.stats()['errors'] == 0
+
+
+def test_background_thread_flushes_and_stop_writes_the_rest():
+    collection = FakeCollection()
+    writer = ChatWriter(collection, flush_interval=0.001)
+    writer.start()
+    writer.submit({'message': 'first'})
+    deadline = time.monotonic() + 2
+    while not collection.docs and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert len(collection.docs) == 1
+
+    writer.stop()
+    writer.submit({'message': 'after stop'})
+    writer.stop()
+    assert len(collection.docs) == 2 and writer.stats()['queued'] == 0
+
+
+def test_full_queue_falls_back_to_direct_inserts():
+    collection = FakeCollection()
+    writer = ChatWriter(collection, max_queue=2)
+    for i in range(3):
+        writer.submit({'message': str(i)})
+    assert len(collection.docs) == 1 and writer.stats() == dict(writer.stats(), direct=1, queued=2)
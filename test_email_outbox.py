@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for batched notification emails in email_outbox.py (no MongoDB or SMTP required)
+"""
+
+from datetime import datetime, timedelta
+
+from conftest import FakeCollection
+from email_outbox import EmailOutbox
+
+
+class FakeConnection:
+    def __init__(self, mail):
+        self.mail = mail
+
+    def __enter__(self):
+        self.mail.connections += 1
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def send(self, msg):
+        if self.mail.fail:
+            raise ConnectionError('smtp down')
+        self.mail.sent.append(msg)
+
+
+class FakeMail:
+    def __init__(self):
+        self.connections = 0
+        self.sent = []
+        self.fail = False
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+def build_messages(address, entries, digest):
+    if digest:
+        return [(address, [entry['message'] for entry in entries])]
+    return [(address, entry['message']) for entry in entries]
+
+
+def load_emails(user_ids):
+    return {user_id: f'{user_id}@example.com' for user_id in user_ids}
+
+
+def test_flush_sends_everything_over_one_connection():
+    mail = FakeMail()
+    outbox = EmailOutbox(FakeCollection(), mail)
+    for i in range(300):
+        outbox.add(f'user{i % 30}', 'due_date_approaching', f'due {i}')
+    sent = outbox.flush(load_emails, build_messages)
+    assert sent == 300
+    # batch_size users per connection: 30 users fit in one
+    assert mail.connections == 1
+    assert outbox.collection.docs == []
+    assert outbox.next_due_in() is None
+
+
+def test_digest_groups_a_users_emails_once_the_window_passes():
+    mail = FakeMail()
+    outbox = EmailOutbox(FakeCollection(), mail, digest_window=600)
+    outbox.add('alice', 'task_assigned', 'first')
+    outbox.add('alice', 'user_mentioned', 'second')
+    assert outbox.flush(load_emails, build_messages) == 0
+    assert 0 < outbox.next_due_in() <= 600
+
+    outbox.collection.docs[0]['send_after'] = datetime.utcnow() - timedelta(seconds=1)
+    assert outbox.flush(load_emails, build_messages) == 1
+    assert mail.sent == [('alice@example.com', ['first', 'second'])]
+
+
+def test_failed_flush_releases_unsent_emails():
+    mail = FakeMail()
+    outbox = EmailOutbox(FakeCollection(), mail)
+    outbox.add('bob', 'task_assigned', 'hello')
+    mail.fail = True
+    try:
+        outbox.flush(load_emails, build_messages)
+        assert False, 'flush should raise'
+    except ConnectionError:
+        pass
+    assert outbox.collection.docs[0]['claim'] is None
+    mail.fail = False
+    assert outbox.flush(load_emails, build_messages) == 1
+
+
+def test_failed_address_lookup_releases_the_claim():
+    mail = FakeMail()
+    outbox = EmailOutbox(FakeCollection(), mail)
+    outbox.add('bob', 'task_assigned', 'hello')
+
+    def users_down(user_ids):
+        raise ConnectionError('users collection unreachable')
+
+    try:
+        outbox.flush(users_down, build_messages)
+        assert False, 'flush should raise'
+    except ConnectionError:
+        pass
+    assert outbox.collection.docs[0]['claim'] is None
+    assert outbox.flush(load_emails, build_messages) == 1
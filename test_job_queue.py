@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the durable job queue in job_queue.py (no MongoDB required)
+"""
+
+from datetime import datetime, timedelta
+
+from conftest import FakeCollection
+from job_queue import JobQueue, backoff_delay
+
+
+def make_queue(**kwargs):
+    return JobQueue(FakeCollection(), FakeCollection(), **kwargs)
+
+
+def test_successful_job_is_removed():
+    queue = make_queue()
+    seen = []
+    queue.register('echo', seen.append)
+    queue.enqueue('echo', {'n': 1})
+    assert queue.run_once() is True
+    assert seen == [{'n': 1}]
+    assert queue.collection.docs == []
+    assert queue.run_once() is False
+
+
+def test_failed_job_is_retried_with_backoff_then_dead_lettered():
+    queue = make_queue(max_attempts=3, base_delay=5)
+
+    def fail(payload):
+        raise RuntimeError('smtp down')
+
+    queue.register('email', fail)
+    queue.enqueue('email', {})
+    for attempt in range(1, 4):
+        assert queue.run_once() is True
+        if attempt < 3:
+            job = queue.collection.docs[0]
+            assert job['status'] == 'pending'
+            assert job['run_at'] > datetime.utcnow() + timedelta(seconds=backoff_delay(attempt, 5, 3600) - 1)
+            # Make the retry due now
+            job['run_at'] = datetime.utcnow()
+    assert queue.collection.docs == []
+    assert queue.dead_letter_collection.docs[0]['last_error'] == 'smtp down'
+    assert queue.dead_letter_collection.docs[0]['attempts'] == 3
+
+
+def test_expired_lock_is_reclaimed():
+    queue = make_queue(visibility_timeout=60)
+    queue.register('push', lambda payload: None)
+    queue.enqueue('push', {})
+    job = queue.claim('dead-worker')
+    assert queue.claim('other-worker') is None
+    queue.collection.docs[0]['locked_until'] = datetime.utcnow() - timedelta(seconds=1)
+    assert queue.run_once('other-worker') is True
+    assert queue.collection.docs == []
+    assert job['attempts'] == 1
+
+
+def test_backoff_is_exponential_and_capped():
+    assert [backoff_delay(n, 5, 60) for n in range(1, 6)] == [5, 10, 20, 40, 60]
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for job_runs.py run history (no MongoDB required)
+"""
+
+from datetime import datetime
+
+import pytest
+from apscheduler.events import (
+    EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, JobExecutionEvent, JobSubmissionEvent
+)
+
+from conftest import FakeDatabase
+from job_runs import FAILED, MISSED, SUCCEEDED, JobRunLog
+
+
+def test_runs_record_timing_counts_and_errors():
+    log = JobRunLog(FakeDatabase())
+
+    @log.track
+    def clean_up():
+        return {'deleted': 3}
+
+    @log.track
+    def broken():
+        raise RuntimeError('mongo down')
+
+    assert clean_up() == {'deleted': 3}
+    with pytest.raises(RuntimeError):
+        broken()
+    log.record_misfire('check_due_dates', datetime(2026, 1, 1), 'misfire')
+
+    ok, failed, missed = log.collection.docs
+    assert (ok['job'], ok['status'], ok['counts']) == ('clean_up', SUCCEEDED, {'deleted': 3})
+    assert ok['finished_at'] >= ok['started_at'] and ok['duration_seconds'] >= 0
+    assert (failed['status'], failed['error']) == (FAILED, 'RuntimeError: mongo down')
+    assert (missed['job'], missed['status']) == ('check_due_dates', MISSED)
+
+
+def test_recording_failures_do_not_break_the_job():
+    log = JobRunLog(FakeDatabase())
+    log.collection.insert_one = lambda doc: 1 / 0
+    assert log.track(lambda: 5, name='count')() == 5
+
+
+def test_missed_and_max_instances_events_are_recorded():
+    log = JobRunLog(FakeDatabase())
+    first, second = datetime(2026, 1, 1, 9), datetime(2026, 1, 1, 9, 5)
+    log.record_missed_event(JobExecutionEvent(EVENT_JOB_MISSED, 'check_due_dates', 'default', first))
+    log.record_missed_event(JobSubmissionEvent(EVENT_JOB_MAX_INSTANCES, 'clean_old_chat_messages', 'default',
+                                               [first, second]))
+
+    assert [(run['job'], run['scheduled_at'], run['reason']) for run in log.collection.docs] == [
+        ('check_due_dates', first, 'misfire'),
+        ('clean_old_chat_messages', first, 'max_instances'),
+        ('clean_old_chat_messages', second, 'max_instances'),
+    ]
+    assert {run['status'] for run in log.collection.docs} == {MISSED}
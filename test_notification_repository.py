@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for the canonical notification schema and its migration (no MongoDB required)
+"""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from conftest import FakeCollection
+from notification_repository import (
+    UNREAD_AGE_INDEX, NotificationRepository, archive_unread, migrate_notifications, parse_page_cursor, trim_per_user
+)
+
+
+def test_legacy_notifications_are_migrated_to_the_canonical_shape():
+    user_id = ObjectId()
+    sent_at = datetime(2026, 3, 1, 12, 0)
+    legacy = {'_id': ObjectId(), 'user_id': user_id, 'type': 'task_assigned', 'message': 'hi',
+              'read': False, 'timestamp': sent_at}
+    current = {'_id': ObjectId(), 'user_id': str(user_id), 'type': 'task_completed', 'message': 'done',
+               'read': True, 'created_at': datetime(2026, 3, 2)}
+    collection = FakeCollection([legacy, current])
+
+    assert migrate_notifications(collection, batch_size=1) == 1
+    assert collection.docs[0] == {'_id': legacy['_id'], 'user_id': str(user_id), 'type': 'task_assigned', 'message': 'hi',
+                      'read': False, 'created_at': sent_at}
+    # Re-running is a no-op
+    assert migrate_notifications(collection) == 0
+
+
+def test_readers_share_one_query_shape():
+    collection = FakeCollection()
+    repository = NotificationRepository(collection)
+    user_id = ObjectId()
+    repository.create(user_id, 'task_assigned', 'first')
+    collection.docs[0]['created_at'] = datetime(2026, 1, 1)
+    repository.create(str(user_id), 'project_invitation', 'second', project_id='p1')
+
+    notifications = list(repository.find_for_user(user_id))
+    assert [n['message'] for n in notifications] == ['second', 'first']
+    assert collection.queries()[-1] == {'user_id': str(user_id), 'read': {'$in': [False, True]}}
+    assert notifications[0]['project_id'] == 'p1'
+
+
+def test_pages_follow_the_keyset_cursor():
+    collection = FakeCollection()
+    repository = NotificationRepository(collection)
+    for day in range(1, 6):
+        collection.insert_one({'user_id': 'u1', 'read': False, 'message': str(day), 'created_at': datetime(2026, 1, day)})
+
+    page, cursor = repository.find_page('u1', limit=2)
+    assert [n['message'] for n in page] == ['5', '4']
+    assert parse_page_cursor(cursor) == (datetime(2026, 1, 4), page[-1]['_id'])
+
+    repository.find_page('u1', before=cursor, limit=2)
+    assert collection.queries()[-1]['$or'][0] == {'created_at': {'$lt': datetime(2026, 1, 4)}}
+
+
+def test_bulk_mark_read_is_one_update():
+    collection = FakeCollection()
+    repository = NotificationRepository(collection)
+    ids = [ObjectId(), ObjectId()]
+    repository.mark_many_read('u1', notification_ids=[str(i) for i in ids])
+    repository.mark_many_read('u1', before=datetime(2026, 1, 1))
+    updates = [(query, update) for method, query, update in collection.calls if method == 'update_many']
+    assert [query for query, update in updates] == [
+        {'user_id': 'u1', 'read': False, '_id': {'$in': ids}},
+        {'user_id': 'u1', 'read': False, 'created_at': {'$lte': datetime(2026, 1, 1)}},
+    ]
+    # read_at starts the TTL clock for read notifications
+    assert all(update['$set']['read'] and 'read_at' in update['$set'] for query, update in updates)
+
+
+def test_every_create_is_published():
+    published = []
+    repository = NotificationRepository(FakeCollection(), on_publish=published.append)
+    repository.create(ObjectId(), 'task_completed', 'done', project_id='p1')
+    assert published[0]['message'] == 'done'
+    assert isinstance(published[0]['user_id'], str)
+
+
+def test_stale_unread_notifications_are_archived_compactly():
+    old = {'_id': ObjectId(), 'user_id': 'u1', 'type': 'task_assigned', 'message': 'old', 'read': False,
+           'created_at': datetime(2020, 1, 1), 'project_title': 'dropped on archive'}
+    recent = dict(old, _id=ObjectId(), created_at=datetime.utcnow())
+    collection, archive = FakeCollection([old, recent]), FakeCollection()
+
+    assert archive_unread(collection, archive, older_than_days=90) == 1
+    assert [doc['_id'] for doc in collection.docs] == [recent['_id']]
+    assert archive.docs == [{'_id': old['_id'], 'user_id': 'u1', 'type': 'task_assigned', 'message': 'old',
+                             'created_at': datetime(2020, 1, 1)}]
+
+
+def test_archive_batches_have_an_unread_age_index():
+    collection = FakeCollection()
+    NotificationRepository(collection).ensure_indexes()
+    assert ([('created_at', 1)], {'name': UNREAD_AGE_INDEX, 'partialFilterExpression': {'read': False}}) \
+        in collection.indexes
+
+
+def test_trim_after_the_first_run_only_checks_users_with_new_notifications():
+    long_ago, now = datetime(2025, 1, 1), datetime.utcnow()
+
+    def notifications(user_id, created, count):
+        return [{'_id': ObjectId.from_datetime(created + timedelta(minutes=i)), 'user_id': user_id, 'read': True,
+                 'created_at': created + timedelta(minutes=i)} for i in range(count)]
+
+    collection = FakeCollection(notifications('quiet', long_ago, 5) + notifications('busy', long_ago + timedelta(days=1), 4)
+                                + notifications('busy', now, 1))
+    assert trim_per_user(collection, cap=3, since=now - timedelta(hours=1)) == 2
+    assert collection.queries('aggregate') == []
+    assert sorted(doc['user_id'] for doc in collection.docs) == ['busy'] * 3 + ['quiet'] * 5
+
+    repository = NotificationRepository(collection)
+    assert repository.apply_retention(user_cap=3) == {'archived': 0, 'trimmed': 2}
+    repository.apply_retention(user_cap=3)
+    assert len(collection.queries('aggregate')) == 1
+
+
+def test_bursts_coalesce_into_one_notification():
+    collection = FakeCollection()
+    published = []
+    repository = NotificationRepository(collection, on_publish=published.append)
+    for i in range(5):
+        notification = repository.create('creator', 'task_completed', f'Task {i} completed', coalesce_key='p1',
+                                          summary="{count} tasks completed in project 'X'")
+
+    assert len(collection.docs) == 1
+    assert notification['count'] == 5
+    assert notification['message'] == "5 tasks completed in project 'X'"
+    query = collection.queries('find_one_and_update')[0]
+    assert query['type'] == 'task_completed' and query['read'] is False
+    assert len(published) == 5
+
+
+def test_create_many_is_one_insert_and_publishes_each():
+    collection, published = FakeCollection(), []
+    repository = NotificationRepository(collection, on_publish=published.append)
+    repository.create_many([{'user_id': ObjectId(), 'type': 'due_date_approaching', 'message': f'task {i}'}
+                            for i in range(3)])
+    inserts = collection.queries('insert_many')
+    assert len(inserts) == 1 and len(collection.docs) == 3
+    assert all(isinstance(n['user_id'], str) and n['read'] is False and n['link'] is None for n in collection.docs)
+    assert [n['message'] for n in published] == ['task 0', 'task 1', 'task 2']
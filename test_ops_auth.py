@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for ops_auth.py access control on operational endpoints
+"""
+
+from flask import Flask
+from flask_login import AnonymousUserMixin, LoginManager, UserMixin, login_user
+
+from ops_auth import OPS_TOKEN_HEADER, is_ops_request, ops_required, parse_admin_emails
+
+
+class Member(UserMixin):
+    def __init__(self, user_id, email):
+        self.id = user_id
+        self.email = email
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', **config)
+    users = {'admin': Member('admin', 'Ops@Example.com'), 'member': Member('member', 'someone@example.com')}
+    login_manager = LoginManager(app)
+    login_manager.user_loader(users.get)
+
+    @app.route('/login/<user_id>')
+    def login(user_id):
+        login_user(users[user_id])
+        return 'ok'
+
+    @app.route('/api/jobs/stats')
+    @ops_required
+    def stats():
+        return {'pending': 3}
+
+    return app
+
+
+def test_only_admins_and_token_holders_are_allowed():
+    assert parse_admin_emails(' Ops@Example.com, ,b@x.io') == {'ops@example.com', 'b@x.io'}
+    assert not is_ops_request(None, AnonymousUserMixin())
+    # An unset token never matches, not even an empty header
+    assert not is_ops_request('', AnonymousUserMixin(), ops_token=None)
+
+    app = make_app(OPS_TOKEN='s3cret', ADMIN_EMAILS=parse_admin_emails('ops@example.com'))
+    client = app.test_client()
+    assert client.get('/api/jobs/stats').status_code == 403
+    assert client.get('/api/jobs/stats', headers={OPS_TOKEN_HEADER: 'wrong'}).status_code == 403
+    assert client.get('/api/jobs/stats', headers={OPS_TOKEN_HEADER: 's3cret'}).json == {'pending': 3}
+
+    client.get('/login/member')
+    assert client.get('/api/jobs/stats').status_code == 403
+    client.get('/login/admin')
+    assert client.get('/api/jobs/stats').status_code == 200
+
+
+def test_endpoints_are_closed_when_nothing_is_configured():
+    client = make_app().test_client()
+    client.get('/login/admin')
+    assert client.get('/api/jobs/stats').status_code == 403
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Tests for push_dispatcher.py against a local stand-in for the Expo push API
+"""
+
+import json
+import threading
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from conftest import FakeCollection
+from push_dispatcher import DEAD_LETTER, PushDispatcher
+
+
+class ExpoStandIn(BaseHTTPRequestHandler):
+    """Answers like Expo: one ticket per message, configurable failures"""
+    requests = []
+    fail_next = 0
+    fail_after = None
+    dead_tokens = set()
+    rejected_bodies = set()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        type(self).requests.append((self.path, body))
+        if type(self).fail_after is not None and len(type(self).requests) > type(self).fail_after:
+            self._reply(503, {'errors': [{'code': 'UNAVAILABLE'}]})
+        elif self.path.endswith('/send') and any(message['body'] in self.rejected_bodies for message in body):
+            self._reply(400, {'errors': [{'code': 'VALIDATION_ERROR'}]})
+        elif type(self).fail_next:
+            type(self).fail_next -= 1
+            self._reply(503, {'errors': [{'code': 'UNAVAILABLE'}]})
+        elif self.path.endswith('/send'):
+            tickets = []
+            for message in body:
+                if message['to'] in self.dead_tokens:
+                    tickets.append({'status': 'error', 'message': 'gone', 'details': {'error': 'DeviceNotRegistered'}})
+                else:
+                    tickets.append({'status': 'ok', 'id': f"{message['to']}-{uuid.uuid4().hex}"})
+            self._reply(200, {'data': tickets})
+        else:
+            receipts = {receipt_id: {'status': 'error', 'details': {'error': 'DeviceNotRegistered'}}
+                        for receipt_id in body['ids'] if receipt_id.startswith('ExponentPushToken[late')}
+            self._reply(200, {'data': receipts})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    ExpoStandIn.requests = []
+    ExpoStandIn.fail_next = 0
+    ExpoStandIn.fail_after = None
+    ExpoStandIn.dead_tokens = set()
+    ExpoStandIn.rejected_bodies = set()
+    ExpoStandIn.protocol_version = 'HTTP/1.1'
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ExpoStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_dispatcher(server, tokens):
+    return PushDispatcher(
+        FakeCollection(), FakeCollection(tokens), FakeCollection(),
+        push_url=f'http://127.0.0.1:{server.server_address[1]}/--/api/v2/push', backoff=0.01
+    )
+
+
+def test_messages_are_coalesced_into_expo_sized_chunks():
+    server = start_server()
+    tokens = [{'user_id': f'user{i}', 'token': f'ExponentPushToken[{i}]'} for i in range(250)]
+    dispatcher = make_dispatcher(server, tokens)
+    for i in range(250):
+        dispatcher.enqueue([f'user{i}'], 'Task', f'hello {i}')
+    assert dispatcher.flush() == 250
+    sizes = [len(body) for path, body in ExpoStandIn.requests]
+    assert sizes == [100, 100, 50]
+    assert dispatcher.outbox.docs == []
+    assert len(dispatcher.receipts.docs) == 250
+    server.shutdown()
+
+
+def test_transient_errors_are_retried():
+    server = start_server()
+    dispatcher = make_dispatcher(server, [{'user_id': 'a', 'token': 'ExponentPushToken[a]'}])
+    ExpoStandIn.fail_next = 2
+    dispatcher.enqueue(['a'], 'Task', 'hello')
+    assert dispatcher.flush() == 1
+    assert len(ExpoStandIn.requests) == 3
+    server.shutdown()
+
+
+def test_unregistered_tokens_are_pruned_from_tickets_and_receipts():
+    server = start_server()
+    tokens = [
+        {'user_id': 'a', 'token': 'ExponentPushToken[ok]'},
+        {'user_id': 'a', 'token': 'ExponentPushToken[dead]'},
+        {'user_id': 'b', 'token': 'ExponentPushToken[late]'},
+    ]
+    dispatcher = make_dispatcher(server, tokens)
+    ExpoStandIn.dead_tokens = {'ExponentPushToken[dead]'}
+    dispatcher.enqueue(['a', 'b'], 'Team', 'hi')
+    dispatcher.flush()
+    assert [doc['token'] for doc in dispatcher.tokens.docs] == ['ExponentPushToken[ok]', 'ExponentPushToken[late]']
+
+    assert dispatcher.check_receipts() == 0
+    assert dispatcher.check_receipts(now=datetime.utcnow() + timedelta(minutes=16)) == 2
+    assert [doc['token'] for doc in dispatcher.tokens.docs] == ['ExponentPushToken[ok]']
+    assert dispatcher.receipts.docs == []
+    server.shutdown()
+
+
+def test_chunks_sent_before_a_failure_are_not_sent_again():
+    server = start_server()
+    tokens = [{'user_id': f'user{i}', 'token': f'ExponentPushToken[{i}]'} for i in range(250)]
+    dispatcher = make_dispatcher(server, tokens)
+    dispatcher.enqueue([f'user{i}' for i in range(250)], 'Team', 'everyone')
+    dispatcher.enqueue(['user0'], 'Task', 'just one')
+    ExpoStandIn.fail_after = 1
+    with pytest.raises(requests.HTTPError):
+        dispatcher.flush()
+    assert all(entry['claim'] is None for entry in dispatcher.outbox.docs)
+
+    ExpoStandIn.fail_after = None
+    assert dispatcher.flush() == 151
+    delivered = [(message['to'], message['body']) for path, body in ExpoStandIn.requests[:1] + ExpoStandIn.requests[5:]
+                 for message in body]
+    assert len(delivered) == len(set(delivered)) == 251
+    assert dispatcher.outbox.docs == []
+    server.shutdown()
+
+
+def test_claims_of_a_crashed_flush_expire():
+    server = start_server()
+    dispatcher = make_dispatcher(server, [{'user_id': 'a', 'token': 'ExponentPushToken[a]'}])
+    dispatcher.enqueue(['a'], 'Task', 'hello')
+    dispatcher.outbox.docs[0].update(claim='dead-worker', claimed_at=datetime.utcnow() - timedelta(minutes=5))
+    assert dispatcher.flush() == 0
+    dispatcher.outbox.docs[0]['claimed_at'] = datetime.utcnow() - timedelta(minutes=11)
+    assert dispatcher.flush() == 1
+    server.shutdown()
+
+
+def test_rejected_entries_are_dead_lettered_instead_of_retried_forever():
+    server = start_server()
+    dispatcher = make_dispatcher(server, [{'user_id': user, 'token': f'ExponentPushToken[{user}]'} for user in 'abc'])
+    for user, body in (('a', 'fine'), ('b', 'poison'), ('c', 'also fine')):
+        dispatcher.enqueue([user], 'Task', body)
+    ExpoStandIn.rejected_bodies = {'poison'}
+
+    assert dispatcher.flush() == 2
+    assert [(entry['body'], entry['claim']) for entry in dispatcher.outbox.docs] == [('poison', DEAD_LETTER)]
+    # One rejected chunk, then each entry on its own; no retries of the 400
+    assert len(ExpoStandIn.requests) == 4
+
+    dispatcher.outbox.docs[0]['claimed_at'] = datetime.utcnow() - timedelta(hours=1)
+    assert dispatcher.flush() == 0
+    assert len(ExpoStandIn.requests) == 4
+    server.shutdown()
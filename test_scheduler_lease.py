@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests for scheduler_lease.py leader election (no MongoDB required)
+"""
+
+from datetime import datetime, timedelta
+
+from conftest import FakeCollection
+from scheduler_lease import SchedulerLease
+
+
+def test_only_one_process_holds_the_lease_and_it_fails_over():
+    leases = FakeCollection()
+    first, second = (SchedulerLease(leases, ttl=60, holder=name) for name in ('web-1', 'web-2'))
+    now = datetime.utcnow()
+    assert first.acquire(now)
+    assert not second.acquire(now)
+
+    ran = []
+    first_job, second_job = first.leader_only(lambda: ran.append('web-1')), second.leader_only(lambda: ran.append('web-2'))
+    first_job(), second_job()
+    assert ran == ['web-1']
+
+    # The leader renews; later, it stops renewing and the lease expires
+    assert first.acquire(now + timedelta(seconds=30))
+    assert not second.acquire(now + timedelta(seconds=80))
+    assert second.acquire(now + timedelta(seconds=91))
+    assert not first.acquire(now + timedelta(seconds=92))
+    assert leases.docs == [dict(leases.docs[0], _id='scheduler', holder='web-2')]
+
+
+def test_release_hands_over_immediately():
+    leases = FakeCollection()
+    first, second = SchedulerLease(leases, holder='web-1'), SchedulerLease(leases, holder='web-2')
+    assert first.acquire()
+    first.release()
+    assert not first.is_leader()
+    assert second.acquire(datetime.utcnow() + timedelta(seconds=1))
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Tests for the /api/search pipeline in search_engine.py (no MongoDB required)
+"""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from conftest import FakeCollection, FakeDatabase
+from search_engine import (
+    COMMENT_SEARCH_FIELDS, MESSAGE_SEARCH_INDEX, SEARCH_TERMS_FIELD, TASK_SEARCH_FIELDS, backfill_comment_search_terms,
+    backfill_search_terms, build_search_terms, build_term_filter, decode_cursor, ensure_search_indexes, make_snippet,
+    message_search_cursor, parse_query, parse_search_filters, search_discussions, search_user_content, stem
+)
+
+
+def make_db(project_count, tasks_per_project):
+    db = FakeDatabase()
+    for i in range(project_count):
+        project = {'_id': ObjectId(), 'title': f'Report project {i}', 'course': 'CS101', 'created_by': 'user-1'}
+        project['search_terms'] = build_search_terms(project, {'title': 1, 'course': 1})
+        db.projects.insert_one(project)
+        tasks = []
+        for j in range(tasks_per_project):
+            task = {'_id': ObjectId(), 'title': f'Write report {j}', 'status': 'Done' if j % 2 else 'To-do',
+                    'project_id': str(project['_id'])}
+            task['search_terms'] = build_search_terms(task, TASK_SEARCH_FIELDS)
+            tasks.append(task)
+        if tasks:
+            db.tasks.insert_many(tasks)
+    db.round_trips = 0
+    return db
+
+
+def test_query_count_is_constant():
+    """Search issues the same number of queries however many results match"""
+    counts = []
+    for project_count, tasks_per_project in ((1, 1), (20, 10), (100, 50)):
+        db = make_db(project_count, tasks_per_project)
+        projects, tasks, projects_by_id, progress, next_cursor, truncated = search_user_content(
+            db, 'user-1', 'repo', limit=100, candidate_limit=5000)
+        assert len(projects) == min(project_count, 100)
+        assert len(tasks) == min(project_count * tasks_per_project, 100)
+        counts.append(db.round_trips)
+    assert counts == [3, 3, 3]
+
+
+def test_regex_engine_query_count_is_constant():
+    db = make_db(30, 5)
+    search_user_content(db, 'user-1', 'report', engine='regex')
+    assert db.round_trips == 3
+
+
+def test_results_are_enriched_without_lookups():
+    db = make_db(2, 3)
+    projects, tasks, projects_by_id, progress, next_cursor, truncated = search_user_content(db, 'user-1', 'report')
+    for task in tasks:
+        assert projects_by_id[task['project_id']]['title'].startswith('Report project')
+    for project in projects:
+        assert progress[str(project['_id'])] == (3, 1)
+
+
+def test_term_filter_uses_stems_and_prefix():
+    assert stem('designing') == 'design'
+    assert stem('planning') == 'plan'
+    assert build_term_filter('designing rep') == {'$and': [
+        {'search_terms': {'$all': ['design']}},
+        {'search_terms': {'$regex': '^rep'}}
+    ]}
+    assert build_term_filter('the') is None
+
+
+def test_inflections_share_a_stem():
+    for forms in (('page', 'pages', 'paged'), ('note', 'notes', 'noted'), ('update', 'updates', 'updated', 'updating'),
+                  ('plan', 'plans', 'planned', 'planning'), ('box', 'boxes'), ('class', 'classes'),
+                  ('study', 'studies', 'studied'), ('agree', 'agrees', 'agreed', 'agreeing', 'agreement'),
+                  ('use', 'uses', 'used', 'using'), ('create', 'created', 'creating'), ('hope', 'hoped', 'hoping'),
+                  ('tie', 'ties', 'tied'), ('need', 'needs', 'needed')):
+        assert len({stem(form) for form in forms}) == 1, forms
+    # Restoring the "e" keeps distinct words apart
+    assert len({stem('note'), stem('noted'), stem('not')}) == 2
+    assert stem('hoping') != stem('hopping')
+    assert [stem(word) for word in ('string', 'shed', 'thing')] == ['string', 'shed', 'thing']
+    # A query for either form matches a document holding the other
+    stems, _ = parse_query('page ')
+    assert set(stems) <= set(build_search_terms({'title': 'Update pages'}, {'title': 1}))
+    stems, _ = parse_query('updates notes ')
+    assert set(stems) <= set(build_search_terms({'title': 'update the note'}, {'title': 1}))
+
+
+def test_rebuild_recomputes_existing_terms():
+    tasks = FakeCollection([
+        {'title': 'Update pages', 'search_terms': ['pag', 'pages', 'update', 'updat', 'upd']},
+        {'title': 'Notes', 'search_terms': ['notes'], 'comments': [{'text': 'see notes', 'search_terms': ['notes']}]},
+    ])
+    assert backfill_search_terms(tasks, TASK_SEARCH_FIELDS, batch_size=1) == 0
+    assert backfill_search_terms(tasks, TASK_SEARCH_FIELDS, batch_size=1, rebuild=True) == 2
+    assert tasks.docs[0]['search_terms'] == ['page', 'pages', 'updat', 'update']
+    assert backfill_comment_search_terms(tasks, rebuild=True) == 1
+    assert tasks.docs[1]['comments'][0]['search_terms'] == build_search_terms({'text': 'see notes'}, {'text': 1})
+
+
+def test_cursor_pages_through_ranked_results():
+    db = make_db(3, 10)
+    seen, cursor, pages = [], None, 0
+    while True:
+        projects, tasks, _, _, cursor, truncated = search_user_content(db, 'user-1', 'report', limit=7, cursor=cursor)
+        assert not truncated
+        seen.extend(str(task['_id']) for task in tasks)
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 5
+    assert len(seen) == len(set(seen)) == 30
+
+
+def test_matches_beyond_the_candidate_limit_are_flagged():
+    db = make_db(2, 15)
+    seen, cursor = [], None
+    while True:
+        projects, tasks, _, _, cursor, truncated = search_user_content(
+            db, 'user-1', 'report', limit=4, cursor=cursor, candidate_limit=20)
+        seen.extend(tasks)
+        assert truncated
+        if cursor is None:
+            break
+    # The 20 newest of the 30 matching tasks were ranked and paged; the rest are reported, not dropped silently
+    newest = sorted(db.tasks.docs, key=lambda task: task['_id'], reverse=True)[:20]
+    assert sorted(task['_id'] for task in seen) == sorted(task['_id'] for task in newest)
+
+    *_, truncated = search_user_content(db, 'user-1', 'report', candidate_limit=30)
+    assert not truncated
+
+
+def test_filters_are_pushed_into_the_task_query():
+    db = make_db(1, 1)
+    filters = parse_search_filters({'status': 'Done', 'due_from': '2026-01-01', 'due_to': '2026-01-31'})
+    projects, tasks, _, _, _, _ = search_user_content(db, 'user-1', 'report', filters=filters)
+    task_query = db.tasks.queries()[-1]['$and']
+    assert {'status': 'Done'} in task_query
+    assert any('due_date' in clause for clause in task_query)
+    assert projects == []
+
+
+def test_discussion_search_is_scoped_and_paged():
+    db = make_db(1, 1)
+    db.chat_messages.insert_many([{'message': f'deploy notes {i}', 'room_id': 'p1',
+                                   'search_terms': build_search_terms({'message': f'deploy notes {i}'}, {'message': 1})}
+                                  for i in range(3)])
+    db.round_trips = 0
+    messages, comments, next_cursor = search_discussions(db, ['p1'], 'deploy', limit=2)
+    assert db.round_trips == 2
+    assert len(messages) == 2
+    assert db.chat_messages.queries()[-1]['$and'][0] == {'room_id': {'$in': ['p1']}}
+    assert decode_cursor(next_cursor) == {'m': str(messages[-1]['_id']), 'c': 'end'}
+    # Newest first, and only the displayed fields leave the server
+    assert [m['message'] for m in messages] == ['deploy notes 2', 'deploy notes 1']
+    assert all(SEARCH_TERMS_FIELD not in message for message in messages)
+
+
+def test_message_search_pins_complete_words_to_the_ordered_index():
+    db = FakeDatabase()
+    ensure_search_indexes(db)
+    assert (MESSAGE_SEARCH_INDEX, {}) in db.chat_messages.indexes
+
+    found = message_search_cursor(db, ['p1', 'p2'], 'deploying frid')
+    assert found.hinted == MESSAGE_SEARCH_INDEX
+    # The stem equality gives each room a single, _id-ordered index range to merge
+    assert db.chat_messages.queries()[-1]['$and'][:2] == [{'room_id': {'$in': ['p1', 'p2']}},
+                                                         {SEARCH_TERMS_FIELD: 'deploy'}]
+    assert message_search_cursor(db, ['p1'], 'frid').hinted is None
+
+
+def test_comment_search_pages_newest_first_with_projected_rows():
+    db = FakeDatabase()
+    start = datetime(2026, 1, 1)
+    comments = [{'_id': ObjectId(), 'text': f'deploy step {i}', 'created_by': 'u1', 'created_at': start + timedelta(hours=i),
+                 'search_terms': build_search_terms({'text': f'deploy step {i}'}, COMMENT_SEARCH_FIELDS)}
+                for i in range(5)]
+    comments.append({'_id': ObjectId(), 'text': 'unrelated', 'created_at': start, 'search_terms': ['unrelated']})
+    db.tasks.insert_one({'title': 'Release', 'project_id': 'p1', 'comments': comments, 'description': 'x' * 1000})
+
+    seen, cursor = [], None
+    while True:
+        messages, page, cursor = search_discussions(db, ['p1'], 'deploy', limit=2, cursor=cursor)
+        seen += [row['text'] for row in page]
+        assert all(set(row) == {'task_id', 'task_title', 'project_id', 'comment_id', 'text', 'created_by', 'created_at'}
+                   for row in page)
+        if cursor is None:
+            break
+    assert seen == [f'deploy step {i}' for i in range(4, -1, -1)]
+
+
+def test_snippet_centres_on_first_match():
+    text = 'lorem ' * 40 + 'we agreed to deploy on friday ' + 'ipsum ' * 40
+    snippet = make_snippet(text, 'deploying', length=60)
+    assert 'deploy on friday' in snippet
+    assert snippet.startswith('...') and snippet.endswith('...')
+    assert make_snippet('short text', 'text') == 'short text'
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory trigram search index in search_index.py (no MongoDB required)
+"""
+
+from bson import ObjectId
+
+from search_index import SearchIndexCache, UserSearchIndex, trigrams
+
+
+def make_data():
+    design = {'_id': ObjectId(), 'title': 'Design review', 'description': 'UI mockups', 'course': 'CS101',
+              'created_by': 'alice', 'team_members': ['bob']}
+    thesis = {'_id': ObjectId(), 'title': 'Thesis', 'description': 'Chapter drafts', 'created_by': 'bob',
+              'team_members': []}
+    tasks = [
+        {'_id': ObjectId(), 'title': 'Draft wireframes', 'description': 'for the design review',
+         'project_id': str(design['_id']), 'status': 'To-do'},
+        {'_id': ObjectId(), 'title': 'Write chapter 2', 'description': '', 'project_id': str(thesis['_id']),
+         'status': 'In Progress'},
+    ]
+    return design, thesis, tasks
+
+
+def make_cache(**kwargs):
+    design, thesis, tasks = make_data()
+    projects = [design, thesis]
+
+    def loader(user_id):
+        visible = [project for project in projects
+                   if user_id == project['created_by'] or user_id in project['team_members']]
+        ids = {str(project['_id']) for project in visible}
+        return visible, [task for task in tasks if task['project_id'] in ids]
+
+    return SearchIndexCache(loader, **kwargs), design, thesis, tasks
+
+
+def titles(results):
+    projects, tasks = results
+    return [doc['title'] for doc in projects], [doc['title'] for doc in tasks]
+
+
+def test_trigrams_cover_words_and_keep_short_words_whole():
+    assert trigrams('Draft UI') == {'dra', 'raf', 'aft', 'ui'}
+
+
+def test_build_scopes_the_index_to_the_users_projects():
+    cache, design, thesis, tasks = make_cache()
+    assert cache.get('alice') is None
+    index = cache.build('alice')
+    assert cache.get('alice') is index
+    assert titles(index.search('review')) == (['Design review'], ['Draft wireframes'])
+    assert titles(index.search('chapter')) == ([], [])
+    assert titles(cache.build('bob').search('chapter')) == (['Thesis'], ['Write chapter 2'])
+
+
+def test_short_queries_fall_back_to_a_prefix_scan():
+    cache, design, thesis, tasks = make_cache()
+    index = cache.build('bob')
+    assert titles(index.search('de')) == (['Design review'], ['Draft wireframes'])
+    projects, tasks = titles(index.search('w'))
+    assert projects == [] and sorted(tasks) == ['Draft wireframes', 'Write chapter 2']
+    # Mixed queries use trigrams for the long word and prefixes for the short one
+    assert titles(index.search('chapter dr')) == (['Thesis'], [])
+    assert titles(index.search('wri ch')) == ([], ['Write chapter 2'])
+    assert titles(index.search('zz')) == ([], [])
+
+
+def test_writes_patch_and_invalidate_warm_indexes():
+    cache, design, thesis, tasks = make_cache()
+    cache.build('alice')
+    cache.build('bob')
+
+    task = {'_id': ObjectId(), 'title': 'Usability testing', 'project_id': str(design['_id'])}
+    cache.upsert_task(task)
+    assert titles(cache.get('alice').search('usability'))[1] == ['Usability testing']
+    assert titles(cache.get('bob').search('usability'))[1] == ['Usability testing']
+
+    cache.update_task(task['_id'], design['_id'], {'title': 'Accessibility audit'})
+    assert titles(cache.get('alice').search('usability')) == ([], [])
+    assert titles(cache.get('alice').search('audit'))[1] == ['Accessibility audit']
+
+    cache.remove_task(task['_id'], design['_id'])
+    assert titles(cache.get('bob').search('audit')) == ([], [])
+
+    cache.upsert_project(dict(design, title='Design sprint'))
+    assert titles(cache.get('alice').search('sprint'))[0] == ['Design sprint']
+    cache.remove_project(design['_id'])
+    assert titles(cache.get('alice').search('design')) == ([], [])
+    assert cache.get('bob').posting_count > 0
+
+    cache.invalidate_user('bob')
+    assert cache.get('bob') is None
+
+
+def test_removing_a_document_frees_its_postings():
+    index = UserSearchIndex('alice')
+    project = {'_id': ObjectId(), 'title': 'Robotics'}
+    index.add_project(project)
+    assert index.posting_count == len(trigrams('Robotics'))
+    index.remove_project(str(project['_id']))
+    assert index.posting_count == 0 and not index.postings
+
+
+def test_cold_and_stale_users_are_evicted():
+    cache, design, thesis, tasks = make_cache(max_users=1)
+    cache.build('alice')
+    cache.build('bob')
+    assert cache.get('alice') is None and cache.get('bob') is not None
+    assert cache.stats()['users'] == 1
+
+    cache, *_ = make_cache(max_postings=1)
+    cache.build('alice')
+    assert cache.get('alice') is None
+
+    cache, *_ = make_cache(max_age=-1)
+    cache.build('alice')
+    assert cache.get('alice') is None
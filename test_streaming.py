@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming.py JSON array responses (no MongoDB required)
+"""
+
+import json
+
+import pytest
+from flask import Flask
+
+from streaming import iter_json_array, stream_json_array
+
+
+def failing_cursor(count):
+    for number in range(count):
+        yield {'n': number}
+    raise RuntimeError('cursor died')
+
+
+def test_chunks_form_one_json_array():
+    chunks = list(iter_json_array(({'n': number} for number in range(5)), dict, chunk_size=2))
+    assert chunks == ['[', '{"n": 0},{"n": 1}', ',{"n": 2},{"n": 3}', ',{"n": 4}', ']']
+    assert json.loads(''.join(chunks)) == [{'n': number} for number in range(5)]
+    assert json.loads(''.join(iter_json_array([], dict))) == []
+
+
+def test_error_mid_stream_aborts_without_closing_the_array(caplog):
+    chunks = []
+    with pytest.raises(RuntimeError):
+        for chunk in iter_json_array(failing_cursor(3), dict, chunk_size=2):
+            chunks.append(chunk)
+    assert chunks == ['[', '{"n": 0},{"n": 1}']
+    assert 'aborted after 3 element(s)' in caplog.text
+
+
+def test_streamed_response_is_aborted_after_headers_are_sent():
+    app = Flask(__name__)
+
+    @app.route('/items')
+    def items():
+        return stream_json_array(failing_cursor(250), dict, batch_size=100)
+
+    response = app.test_client().get('/items', buffered=False)
+    assert response.status_code == 200 and response.is_streamed
+    body = iter(response.response)
+    assert next(body).startswith(b'[')
+    # The client never receives a complete (and misleadingly short) array
+    with pytest.raises(RuntimeError):
+        for _ in body:
+            pass
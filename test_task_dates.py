@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Tests for canonical task due dates and their backfill (no MongoDB required)
+"""
+
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from conftest import FakeCollection
+from task_dates import backfill_due_dates, format_due_date, parse_due_date
+
+
+def test_form_values_become_midnight_datetimes():
+    assert parse_due_date('2026-05-04') == datetime(2026, 5, 4)
+    assert parse_due_date('2026-05-04T17:30') == datetime(2026, 5, 4)
+    assert parse_due_date('') is None
+    assert format_due_date(datetime(2026, 5, 4)) == '2026-05-04'
+    assert format_due_date(None) == ''
+
+
+@pytest.mark.parametrize('value', ['tomorrow', '2026-13-40', '05-04-2026'])
+def test_malformed_form_values_raise_value_error(value):
+    # create_task and edit_task turn this into an "Invalid due date." flash
+    with pytest.raises(ValueError):
+        parse_due_date(value)
+
+
+def test_backfill_converts_strings_and_skips_garbage():
+    tasks = [
+        {'_id': ObjectId(), 'due_date': '2026-05-04'},
+        {'_id': ObjectId(), 'due_date': 'next week'},
+        {'_id': ObjectId(), 'due_date': ''},
+        {'_id': ObjectId(), 'due_date': datetime(2026, 6, 1)},
+    ]
+    collection = FakeCollection(tasks)
+    assert backfill_due_dates(collection, batch_size=1) == 2
+    assert [task['due_date'] for task in collection.docs] == [datetime(2026, 5, 4), 'next week', None, datetime(2026, 6, 1)]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for task_reminders.py lead-time planning (no MongoDB required)
+"""
+
+from datetime import datetime, timedelta
+
+from conftest import FakeDatabase
+from task_reminders import (DEFAULT_REMINDER_OFFSETS, claim_due_reminders, describe_offset, parse_offsets,
+                            plan_reminders, reminder_changes, reminder_fields)
+
+OFFSETS = parse_offsets('3d,1d,2h')
+DUE = datetime(2026, 5, 10, 17, 0)
+DUE_DATE_ONLY = datetime(2026, 5, 10)
+
+
+def make_db(task):
+    db = FakeDatabase()
+    project_id = db.projects.insert_one({'title': 'P'}).inserted_id
+    user_id = db.users.insert_one({'username': 'u1'}).inserted_id
+    db.tasks.insert_one(dict(task, project_id=str(project_id), assigned_to=str(user_id)))
+    return db
+
+
+def test_offsets_and_messages():
+    assert OFFSETS == [3 * 24 * 60, 24 * 60, 120]
+    assert [describe_offset(offset) for offset in OFFSETS] == ['in 3 days', 'tomorrow', 'in 2 hours']
+
+
+def test_each_lead_time_fires_once_in_order():
+    task = dict(title='Report', status='To-do', due_date=DUE, **reminder_fields(DUE, OFFSETS, now=DUE - timedelta(days=5)))
+    assert task['next_reminder_at'] == DUE - timedelta(days=3)
+    db = make_db(task)
+
+    fired = []
+    for hours_before in (80, 71, 70, 23, 1, 0.5):
+        claimed, reminders = claim_due_reminders(db.tasks, OFFSETS, now=DUE - timedelta(hours=hours_before))
+        fired += [reminder['offset'] for reminder in reminders]
+        assert all(reminder['project']['title'] == 'P' and reminder['assignee_id'] for reminder in reminders)
+    assert fired == OFFSETS
+    assert db.tasks.docs[0]['next_reminder_at'] is None
+
+
+def test_late_tasks_only_get_the_nearest_reminder():
+    assert plan_reminders(DUE, OFFSETS, now=DUE - timedelta(hours=5)) == (24 * 60, [3 * 24 * 60, 24 * 60],
+                                                                            DUE - timedelta(hours=2))
+    # A task created that close to its due date gets the nearest passed lead time once, on the next tick
+    assert reminder_fields(DUE, OFFSETS, now=DUE - timedelta(hours=5)) == {
+        'next_reminder_at': DUE - timedelta(days=1), 'reminders_sent': [3 * 24 * 60]}
+
+
+def test_task_created_the_day_before_gets_its_one_day_reminder():
+    created = DUE_DATE_ONLY - timedelta(hours=15)
+    db = make_db(dict(title='Report', status='To-do', due_date=DUE_DATE_ONLY,
+                      **reminder_fields(DUE_DATE_ONLY, parse_offsets(DEFAULT_REMINDER_OFFSETS), now=created)))
+
+    fired = []
+    for minutes_later in (5, 10, 60):
+        _, reminders = claim_due_reminders(db.tasks, parse_offsets(DEFAULT_REMINDER_OFFSETS),
+                                           now=created + timedelta(minutes=minutes_later))
+        fired += [reminder['offset'] for reminder in reminders]
+    assert fired == [24 * 60]
+    assert db.tasks.docs[0]['next_reminder_at'] is None
+
+
+def test_date_only_due_dates_skip_sub_day_lead_times():
+    task = dict(title='Report', status='To-do', due_date=DUE_DATE_ONLY,
+                **reminder_fields(DUE_DATE_ONLY, OFFSETS, now=DUE_DATE_ONLY - timedelta(days=5)))
+    db = make_db(task)
+
+    fired = []
+    for hours_before in (71, 23, 2, 1, 0):
+        _, reminders = claim_due_reminders(db.tasks, OFFSETS, now=DUE_DATE_ONLY - timedelta(hours=hours_before))
+        fired += [reminder['offset'] for reminder in reminders]
+    assert fired == [3 * 24 * 60, 24 * 60]
+    assert db.tasks.docs[0]['next_reminder_at'] is None
+
+
+def test_reopened_and_rescheduled_tasks_get_reminders_back():
+    now = DUE - timedelta(days=5)
+    done = dict(status='Done', due_date=DUE, next_reminder_at=None, reminders_sent=[3 * 24 * 60])
+    assert reminder_changes(done, {'status': 'In Progress'}, OFFSETS, now=now) == reminder_fields(DUE, OFFSETS, now=now)
+    assert reminder_changes(done, {'status': 'Done'}, OFFSETS, now=now) == {}
+
+    open_task = dict(done, status='To-do', reminders_sent=list(OFFSETS))
+    later = DUE + timedelta(days=7)
+    assert reminder_changes(open_task, {'due_date': later}, OFFSETS, now=now) == {
+        'next_reminder_at': later - timedelta(days=3), 'reminders_sent': []}
+    assert reminder_changes(open_task, {'due_date': DUE, 'title': 'Renamed'}, OFFSETS, now=now) == {}
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Background worker: runs scheduled jobs and drains the job queue without the
+web routes.
+
+Usage: RUN_BACKGROUND_JOBS=false on the web tier, then
+    python worker.py [queue_workers]
+Set SOCKETIO_MESSAGE_QUEUE on both tiers so notifications published here
+reach connected clients.
+"""
+import signal
+import sys
+import threading
+
+from core import app, logger, start_background_jobs
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else max(app.config["JOB_QUEUE_WORKERS"], 1)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    start_background_jobs(workers)
+    logger.info("Worker running; waiting for scheduled and queued jobs")
+    while not stop.wait(1):
+        pass
+    # atexit hooks stop the queue, shut down the scheduler and release the lease
+    logger.info("Worker shutting down")
+
+
+if __name__ == '__main__':
+    main()